@@ -1 +1,2 @@
-from .tcam import TCam
\ No newline at end of file
+from .tcam import TCam
+from .async_tcam import AsyncTCam
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+  tCam Python Package - automatic gain control
+
+  Turns the 16-bit radiometric data of a frame into an 8-bit image for display.  Every mode works the same
+  way: a histogram of the uint16 values is counted with np.bincount, a 65536 entry uint8 lookup table is
+  built from it, and the image comes out of a single gather through the table.  There is no floating point
+  image anywhere along the way, all the per-pixel work is integer.
+
+      linear       the range from the coldest to the hottest pixel is stretched over 0-255
+      clip-linear  like linear, but the coldest and hottest clip percent of the pixels are saturated so a few
+                   outliers can't squash the rest of the image
+      hist-eq      histogram equalization, every gray level gets about the same number of pixels
+      clahe-lite   contrast limited equalization: histogram bins are capped at clip_limit times the average
+                   bin and the excess spread evenly, so large uniform areas don't eat up the gray levels.
+                   Done over the whole frame rather than per tile.
+"""
+import numpy as np
+
+MODES = ("linear", "clip-linear", "hist-eq", "clahe-lite")
+
+
+def smooth(a):
+    """
+    smooth()
+
+    Integer 1-6-1 blur along both axes, close to a gaussian with a sigma of 0.5, with the edge pixels
+    repeated.  Returns a uint16 array.
+    """
+    for axis in (0, 1):
+        b = a.astype(np.uint32)
+        s = b * 6
+        lead = [slice(None)] * 2
+        lag = [slice(None)] * 2
+        lead[axis] = slice(1, None)
+        lag[axis] = slice(None, -1)
+        s[tuple(lead)] += b[tuple(lag)]
+        s[tuple(lag)] += b[tuple(lead)]
+        edge = [slice(None)] * 2
+        for i in (0, -1):
+            edge[axis] = i
+            s[tuple(edge)] += b[tuple(edge)]
+        a = ((s + 4) >> 3).astype(np.uint16)
+    return a
+
+
+def linear_table(lo, hi):
+    """
+    linear_table()
+
+    The 8-bit values of the raw values lo through hi, stretched linearly.
+    """
+    span = max(hi - lo, 1)
+    return (np.arange(hi - lo + 1, dtype=np.uint32) * 255 + span // 2) // span
+
+
+def equalize_table(hist):
+    """
+    equalize_table()
+
+    The 8-bit values that equalize a histogram, one for every bin.
+    """
+    cdf = np.cumsum(hist)
+    first = cdf[0]
+    total = cdf[-1] - first
+    if total <= 0:
+        return np.zeros(len(hist), dtype=np.uint32)
+    return ((cdf - first) * 255 + total // 2) // total
+
+
+def make_lut(a, mode="hist-eq", clip=1.0, clip_limit=4.0):
+    """
+    make_lut()
+
+    Build the 65536 entry lookup table that maps the raw uint16 values of a to 8-bit gray levels for an AGC
+    mode.  Only the histogram between the coldest and hottest pixel is counted.
+    """
+    mode = mode.lower()
+    if mode not in MODES:
+        raise ValueError(f"unknown AGC mode {mode}, use one of {', '.join(MODES)}")
+    flat = a.ravel()
+    lo = int(flat.min())
+    hi = int(flat.max())
+
+    lut = np.empty(65536, dtype=np.uint8)
+    lut[:lo] = 0
+    lut[hi + 1:] = 255
+
+    if mode == "linear":
+        lut[lo:hi + 1] = linear_table(lo, hi)
+        return lut
+
+    hist = np.bincount(flat - np.uint16(lo), minlength=hi - lo + 1)
+    if mode == "clip-linear":
+        cdf = np.cumsum(hist)
+        cut = flat.size * clip / 100.0
+        cold = lo + int(np.searchsorted(cdf, cut, side="right"))
+        hot = lo + int(np.searchsorted(cdf, flat.size - cut, side="left"))
+        hot = max(hot, cold)
+        lut[lo:cold] = 0
+        lut[cold:hot + 1] = linear_table(cold, hot)
+        lut[hot + 1:hi + 1] = 255
+        return lut
+
+    if mode == "clahe-lite":
+        # only the bins in use count towards the average, the range between pixels is often sparse
+        used = np.count_nonzero(hist)
+        limit = max(int(clip_limit * flat.size / max(used, 1)), 1)
+        excess = int(np.maximum(hist - limit, 0).sum())
+        hist = np.minimum(hist, limit)
+        hist[hist > 0] += excess // used
+    lut[lo:hi + 1] = equalize_table(hist)
+    return lut
+
+
+def agc(a, mode="hist-eq", clip=1.0, clip_limit=4.0, smoothing=False, out=None):
+    """
+    agc()
+
+    Convert a uint16 radiometric array into a uint8 image with one of the MODES.  clip is the percentage of
+    pixels saturated at each end by clip-linear, clip_limit the bin cap of clahe-lite as a multiple of the
+    average bin.  With smoothing the data is blurred first to hide sensor noise.  Pass out to reuse a uint8
+    array from a previous call.
+    """
+    a = np.asarray(a)
+    if a.dtype != np.uint16:
+        a = a.astype(np.uint16)
+    if smoothing:
+        a = smooth(a)
+    return np.take(make_lut(a, mode, clip, clip_limit), a, out=out, mode="clip")
@@ -0,0 +1,212 @@
+"""
+  tCam Python Package - asyncio interface
+
+  AsyncTCam speaks the same socket protocol as TCam but runs entirely on an asyncio event loop, so a single
+  loop can drive any number of cameras without a manager thread per camera.
+"""
+import json
+import asyncio
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from tcam import (
+    RESPONSE_KEYS,
+    TCamCommands,
+    TCamPacketFramer,
+    TCamResponseRouter,
+    decode_packet,
+    malformed_packet,
+)
+from thermal_frame import ThermalFrame
+
+
+class AsyncTCam(TCamCommands):
+    """
+    AsyncTCam - asyncio interface object for managing a network connected tCam device.
+
+    Every command method of TCam is available and returns a coroutine, so the calls read the same with an
+    await in front of them:
+
+        cam = AsyncTCam()
+        await cam.connect("192.168.4.1")
+        status = await cam.get_status()
+        await cam.start_stream()
+        async for frame in cam.frames():
+            ...
+
+    Responses are matched to requests the same way TCam does it, so concurrent tasks can have commands in
+    flight at the same time.  A timeout raises asyncio.TimeoutError where TCam would raise queue.Empty.  The
+    hardware interface isn't supported, use TCam(is_hw=True) for that.
+    """
+
+    def __init__(self, responseTimeout=10):
+        self.frameQueue = asyncio.Queue()
+        self.responseQueue = asyncio.Queue()
+        self.responseTimeout = responseTimeout
+        self.framer = TCamPacketFramer()
+        self.router = TCamResponseRouter(responseTimeout)
+        self.reader = None
+        self.writer = None
+        self.readerTask = None
+        self.connected = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.shutdown()
+
+    async def connect(self, ipaddress="192.168.4.1", port=5001, timeout=None):
+        """
+        connect()
+        """
+        if not timeout:
+            timeout = self.responseTimeout
+        try:
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(ipaddress, port), timeout)
+        except asyncio.TimeoutError:
+            return {"status": "disconnected", "message": "timeout"}
+        except OSError as e:
+            return {"status": "disconnected", "message": f"{e}"}
+        self.framer = TCamPacketFramer()
+        # the last connection left its disconnected sentinels on the queues, start over with empty ones
+        self.frameQueue = asyncio.Queue()
+        self.responseQueue = asyncio.Queue()
+        self.connected = True
+        self.readerTask = asyncio.create_task(self.read_responses())
+        return {"status": "connected"}
+
+    async def disconnect(self):
+        """
+        disconnect()
+        """
+        if self.readerTask is not None:
+            self.readerTask.cancel()
+            try:
+                await self.readerTask
+            except asyncio.CancelledError:
+                pass
+            self.readerTask = None
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = None
+            self.writer = None
+        self.connected = False
+        # wake up anybody still waiting on a response or on frames()
+        self.put_response({"status": "disconnected"})
+        self.frameQueue.put_nowait(None)
+        return {"status": "disconnected"}
+
+    async def shutdown(self):
+        """
+        shutdown()
+
+        There is no manager thread to stop, so this is the same as disconnect().
+        """
+        await self.disconnect()
+
+    async def read_responses(self):
+        """
+        read_responses()
+
+        The task that does what the manager thread does for TCam.  Reads the socket, splits the data into
+        responses and puts them on the frameQueue or responseQueue.
+        """
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                self.framer.feed(data)
+                for pkt in self.framer.packets():
+                    try:
+                        msg = decode_packet(pkt)
+                    except ValueError:
+                        self.put_response(malformed_packet(pkt))
+                        continue
+                    if isinstance(msg, ThermalFrame):
+                        self.frameQueue.put_nowait(msg)
+                    else:
+                        self.put_response(msg)
+        except OSError:
+            # a reset connection ends the same way as one the camera closed
+            pass
+
+        # the camera hung up, or the connection broke
+        self.connected = False
+        self.put_response({"status": "disconnected"})
+        self.frameQueue.put_nowait(None)
+
+    def put_response(self, msg):
+        """
+        put_response()
+
+        Hand a response to the request waiting for it, anything unsolicited goes on the responseQueue.
+        """
+        if not self.router.resolve(msg):
+            self.responseQueue.put_nowait(msg)
+
+    async def send_cmd(self, cmd, timeout=None, expect="response"):
+        """
+        send_cmd()
+
+        Send a command and wait for what it is expected to produce: its response ("response"), the next frame
+        ("frame") or nothing at all (None).
+        """
+        if not timeout:
+            timeout = self.responseTimeout
+        if self.writer is None:
+            return {"status": "disconnected", "msg": "Please call connect() first, refusing to write to empty interface."}
+
+        key = RESPONSE_KEYS.get(cmd["cmd"]) if expect == "response" else None
+        # nothing is awaited between registering the request and writing the command, so requests stay in the
+        # order the commands are sent
+        future = self.router.expect(key, timeout) if key is not None else None
+        self.writer.write(f"\x02{json.dumps(cmd)}\x03".encode())
+        await self.writer.drain()
+
+        if future is not None:
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except FutureTimeoutError:
+                # the router expired the request, the same as timing out here
+                raise asyncio.TimeoutError
+        if expect == "frame":
+            return await asyncio.wait_for(self.frameQueue.get(), timeout)
+        if expect == "response":
+            # nothing to match the response of an unknown command with, take whatever shows up
+            return await asyncio.wait_for(self.responseQueue.get(), timeout)
+
+    def get_frame(self):
+        """
+        get_frame()
+        Used for when you need to pull frames from the frameQueue without waiting.  Returns None if there
+        isn't one.
+        """
+        if not self.frameQueue.empty():
+            return self.frameQueue.get_nowait()
+        else:
+            return None
+
+    def frame_count(self):
+        """
+        frame_count()
+        Returns number of pending frames waiting in the queue
+        """
+        return self.frameQueue.qsize()
+
+    async def frames(self):
+        """
+        frames()
+
+        Asynchronous iterator over the frames as they arrive, usually after start_stream().  Ends when the
+        camera is disconnected.
+        """
+        while True:
+            frame = await self.frameQueue.get()
+            if frame is None:
+                return
+            yield frame
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the conversion of radiometric data into an 8-bit image.  The float pipeline the bridge used
+# (gaussian, percentile clipping, histogram equalization with np.interp) is timed against every mode of
+# agc.agc(), with and without smoothing.  JPEG encoding isn't included, it is the same for both.
+#
+# Needs scipy for the original pipeline.
+#
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from agc import MODES, agc
+
+parser = argparse.ArgumentParser()
+
+parser.prog = "bench_agc"
+parser.description = f"{parser.prog} - compare the original float AGC with the integer AGC modes\n"
+parser.usage = "bench_agc.py [--frames=<count>]"
+parser.add_argument("-f", "--frames", type=int, default=500, help="Number of frames to time")
+
+
+def make_frame():
+    """
+    A synthetic scene in centi-Kelvin: room temperature background, a warm blob and sensor noise.
+    """
+    rows, cols = np.mgrid[0:120, 0:160]
+    blob = 1500 * np.exp(-((rows - 60) ** 2 + (cols - 90) ** 2) / 400.0)
+    noise = np.random.normal(0, 8, (120, 160))
+    return (29500 + blob + noise).astype(np.uint16)
+
+
+def legacy_agc(a):
+    """
+    The original processing from bridge_app radiometric_to_jpeg()
+    """
+    a_smooth = ndimage.gaussian_filter(a.astype(np.float32), sigma=0.5)
+    a_clipped = np.clip(a_smooth, np.percentile(a_smooth, 2), np.percentile(a_smooth, 98))
+    mn = a_clipped.min()
+    mx = a_clipped.max()
+    if mx == mn:
+        mx = mn + 1
+    g = ((a_clipped - mn) * 255 / (mx - mn)).astype(np.uint8)
+    hist, bins = np.histogram(g.flatten(), 256, [0, 256])
+    cdf = hist.cumsum()
+    cdf_normalized = cdf * 255 / cdf[-1]
+    return np.interp(g.flatten(), bins[:-1], cdf_normalized).reshape(g.shape).astype(np.uint8)
+
+
+def time_agc(fn, frame, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(frame)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    frame = make_frame()
+    out = np.empty(frame.shape, dtype=np.uint8)
+    runs = [("legacy", legacy_agc)]
+    for mode in MODES:
+        runs.append((mode, lambda a, mode=mode: agc(a, mode, out=out)))
+        runs.append((f"{mode}+smooth", lambda a, mode=mode: agc(a, mode, smoothing=True, out=out)))
+
+    print(f"{args.frames} frames of {frame.shape[1]}x{frame.shape[0]}")
+    for name, fn in runs:
+        elapsed = time_agc(fn, frame, args.frames)
+        print(f"  {name:20s} {elapsed / args.frames * 1e6:8.1f} us/frame")
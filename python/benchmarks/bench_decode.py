@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+#
+# Benchmark of image packet deserialization.  The payload of an image packet is deserialized with the
+# generic json.loads() the manager thread used to run on every packet and with decode_packet(), which takes
+# the parse_image_packet() fast path, and the time per packet of both is printed.
+#
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tcam import decode_packet
+from bench_framer import make_image_packet
+
+parser = argparse.ArgumentParser()
+
+parser.prog = "bench_decode"
+parser.description = f"{parser.prog} - compare generic and fast path image packet deserialization\n"
+parser.usage = "bench_decode.py [--packets=<count>]"
+parser.add_argument("-p", "--packets", type=int, default=2000, help="Number of packets to time")
+
+
+def legacy_decode(pkt):
+    """
+    The original deserialization from TCamManagerThreadBase.find_responses()
+    """
+    return json.loads(bytes(pkt).decode())
+
+
+def time_decode(fn, pkt, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(pkt)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    # a memoryview of a bytearray, the way TCamPacketFramer hands packets out
+    pkt = memoryview(bytearray(make_image_packet()[1:-1]))
+    if decode_packet(pkt) != legacy_decode(pkt):
+        sys.exit("fast path result doesn't match json.loads()")
+
+    print(f"{args.packets} image packets of {len(pkt)} bytes")
+    for name, fn in (("legacy", legacy_decode), ("current", decode_packet)):
+        elapsed = time_decode(fn, pkt, args.packets)
+        print(f"  {name:8s} {elapsed / args.packets * 1e6:8.1f} us/packet")
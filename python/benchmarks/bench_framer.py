@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmark of the packet framing done by the manager thread.  Multi-frame bursts of image
+# packets are fed through the original bytes based find_responses() algorithm and through
+# TCamPacketFramer in read sized chunks, and the throughput of both is printed.
+#
+# By default the bursts are built from synthetic image packets the same size as the ones a
+# tCam-Mini sends.  A raw capture of the byte stream coming from a camera can be used instead
+# with --capture.
+#
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tcam import TCamPacketFramer
+
+parser = argparse.ArgumentParser()
+
+parser.prog = "bench_framer"
+parser.description = f"{parser.prog} - compare the old and new manager thread packet framing\n"
+parser.usage = "bench_framer.py [--frames=<frames per burst>] [--chunk=<read size>] [--bursts=<count>] [--capture=<file>]"
+parser.add_argument("-f", "--frames", type=int, default=8, help="Image packets per burst")
+parser.add_argument("-c", "--chunk", type=int, default=65536, help="Bytes handed to the framer per read")
+parser.add_argument("-b", "--bursts", type=int, default=50, help="Number of bursts to time")
+parser.add_argument("--capture", help="Raw tCam byte stream to use instead of synthetic packets")
+
+
+def make_image_packet(seq=0):
+    """
+    Build an STX/ETX wrapped image packet shaped like the ones sent by the camera firmware.
+    """
+    radiometric = os.urandom(160 * 120 * 2)
+    telemetry = os.urandom(3 * 80 * 2)
+    img = {
+        "metadata": {
+            "Camera": "tCam-Mini-BNCH",
+            "Model": 2,
+            "Version": "3.0",
+            "Sequence": seq,
+            "Time": "12:00:00.000",
+            "Date": "1/1/24",
+        },
+        "radiometric": base64.b64encode(radiometric).decode(),
+        "telemetry": base64.b64encode(telemetry).decode(),
+    }
+    return f"\x02{json.dumps(img)}\x03".encode()
+
+
+def legacy_find_responses(buf):
+    """
+    The original bytes based framing from TCamManagerThreadBase.find_responses()
+    """
+    pkts = []
+    idx = buf.find(3)
+    while idx != -1:
+        pkts.append(buf[: idx + 1])
+        buf = buf[idx + 1 :]
+        idx = buf.find(3)
+    return pkts, buf
+
+
+def run_legacy(chunks):
+    count = 0
+    scratch = b""
+    for chunk in chunks:
+        scratch += chunk
+        pkts, scratch = legacy_find_responses(scratch)
+        for pkt in pkts:
+            pkt.strip(b"\x02\x03")
+            count += 1
+    return count
+
+
+def run_framer(chunks):
+    count = 0
+    framer = TCamPacketFramer()
+    for chunk in chunks:
+        framer.feed(chunk)
+        for pkt in framer.packets():
+            count += 1
+    return count
+
+
+def chunk_stream(stream, size):
+    return [stream[i : i + size] for i in range(0, len(stream), size)]
+
+
+def time_framer(fn, bursts):
+    start = time.perf_counter()
+    frames = 0
+    for chunks in bursts:
+        frames += fn(chunks)
+    return frames, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, "rb") as f:
+            burst = f.read()
+    else:
+        burst = b"".join(make_image_packet(i) for i in range(args.frames))
+    bursts = [chunk_stream(burst, args.chunk)] * args.bursts
+    total = len(burst) * args.bursts
+
+    print(f"{args.bursts} bursts of {len(burst)} bytes, {args.chunk} bytes per read")
+    for name, fn in (("legacy", run_legacy), ("framer", run_framer)):
+        frames, elapsed = time_framer(fn, bursts)
+        print(f"  {name:8s} {frames:6d} packets  {total / elapsed / 1e6:9.1f} MB/s  "
+              f"{elapsed / max(frames, 1) * 1e6:8.1f} us/packet")
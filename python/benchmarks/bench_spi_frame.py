@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the hardware interface's SPI frame handling.  Frames the size of a tCam-Mini image are run
+# through the original get_spi_frame() (read a new bytes object, checksum in a python loop) and through
+# TCamHwManagerThread.get_spi_frame() (readinto a reusable buffer, vectorized checksum) from an in-memory
+# stand-in for the SPI device, and the frames per second of both are printed.
+#
+# Needs pyserial installed, like the hardware interface itself.
+#
+
+import argparse
+import json
+import os
+import sys
+import time
+from queue import Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tcam import TCamHwManagerThread
+from bench_framer import make_image_packet
+
+parser = argparse.ArgumentParser()
+
+parser.prog = "bench_spi_frame"
+parser.description = f"{parser.prog} - compare the old and new hardware interface SPI frame handling\n"
+parser.usage = "bench_spi_frame.py [--frames=<count>]"
+parser.add_argument("-f", "--frames", type=int, default=200, help="Number of frames to time")
+
+
+class FakeSpi:
+    """
+    Hands out the same SPI frame every read, the way /dev/spidev does after an image_ready message.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def read(self, length):
+        return self.frame[:length]
+
+    def readinto(self, buf):
+        length = min(len(buf), len(self.frame))
+        buf[:length] = self.frame[:length]
+        return length
+
+
+def make_spi_frame():
+    pkt = make_image_packet()
+    return pkt + sum(pkt).to_bytes(4, "big")
+
+
+def legacy_get_spi_frame(spi, frameLength):
+    """
+    The original TCamHwManagerThread.get_spi_frame()
+    """
+    frame = spi.read(frameLength)
+    cs = int.from_bytes(frame[-4:], 'big')
+    sum = 0
+    for i in frame[:-4]:
+        sum += i
+    if sum != cs:
+        return frame
+    return json.loads(frame[1:-5].decode())
+
+
+def time_frames(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    frame = make_spi_frame()
+    spi = FakeSpi(frame)
+    manager = TCamHwManagerThread(Queue(), Queue(), Queue(), 1)
+    manager.spi = spi
+
+    print(f"{args.frames} SPI frames of {len(frame)} bytes")
+    runs = (
+        ("legacy", lambda: legacy_get_spi_frame(spi, len(frame))),
+        ("current", lambda: manager.get_spi_frame(len(frame))),
+    )
+    for name, fn in runs:
+        elapsed = time_frames(fn, args.frames)
+        print(f"  {name:8s} {args.frames / elapsed:9.1f} frames/s  {elapsed / args.frames * 1e3:8.3f} ms/frame")
+    if not manager.responseQueue.empty():
+        print(f"  checksum mismatch: {manager.responseQueue.get()}")
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+#
+# Benchmark suite for the whole frame pipeline, from the bytes coming off the socket to JPEGs arriving
+# at an MJPEG client:
+#
+#   framer   TCamPacketFramer splitting bursts of image packets, MB/s
+#   decode   decode_packet() plus the base64 decode of the radiometric and telemetry data, frames/s
+#   agc      agc() with smoothing and a palette applied, frames/s for every AGC mode
+#   jpeg     JPEG encoding of a palette image the way the bridge does it, frames/s and size per quality
+#   e2e      latency from a simulated camera (tcam_sim.py) sending a frame to MJPEG clients of the bridge
+#            receiving it, milliseconds
+#
+# Results are written as json with the commit, python and library versions, so runs on different commits
+# can be compared with --compare.  The e2e benchmark needs the bridge's requirements (flask, pillow), the
+# jpeg one pillow; they are skipped if those aren't installed.
+#
+
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tcam import decode_packet
+from agc import MODES, agc
+from palettes import apply
+from tcam_sim import SyntheticSource, TCamSimulator
+from bench_framer import make_image_packet, run_framer, chunk_stream
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+parser = argparse.ArgumentParser()
+
+parser.prog = "bench_suite"
+parser.description = f"{parser.prog} - benchmark every stage of the frame pipeline and write the results as json\n"
+parser.usage = "bench_suite.py [--out=<file>] [--compare=<file>] [--only=<benchmark,...>] [--duration=<seconds>]"
+parser.add_argument("-o", "--out", default="bench_results.json", help="File the json results are written to")
+parser.add_argument("-c", "--compare", help="Results of an earlier run to compare with")
+parser.add_argument("--only", help="Comma separated benchmarks to run, of framer, decode, agc, jpeg and e2e")
+parser.add_argument("-d", "--duration", type=float, default=2.0, help="Seconds each measurement runs for")
+parser.add_argument("--palette", default="ironblack", help="Palette for the agc and jpeg benchmarks")
+parser.add_argument("--clients", type=int, default=4, help="MJPEG clients in the e2e benchmark")
+parser.add_argument("--fps", type=float, default=8.7, help="Frame rate of the simulated camera in the e2e benchmark")
+
+BENCHMARKS = ("framer", "decode", "agc", "jpeg", "e2e")
+JPEG_QUALITIES = (50, 75, 90, 95)
+
+
+def measure(fn, duration):
+    """
+    Call fn() over and over for duration seconds, returns (calls, seconds).
+    """
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        fn()
+        calls += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls, now - start
+
+
+def percentiles(samples):
+    s = np.sort(np.asarray(samples, dtype=np.float64))
+    if len(s) == 0:
+        return {}
+    return {
+        "count": int(len(s)),
+        "mean": round(float(s.mean()), 3),
+        "p50": round(float(np.percentile(s, 50)), 3),
+        "p90": round(float(np.percentile(s, 90)), 3),
+        "p99": round(float(np.percentile(s, 99)), 3),
+        "max": round(float(s[-1]), 3),
+    }
+
+
+def bench_framer(args):
+    burst = b"".join(make_image_packet(i) for i in range(8))
+    chunks = chunk_stream(burst, 65536)
+    calls, elapsed = measure(lambda: run_framer(chunks), args.duration)
+    return {
+        "mb_per_s": round(calls * len(burst) / elapsed / 1e6, 1),
+        "packets_per_s": round(calls * 8 / elapsed, 1),
+    }
+
+
+def bench_decode(args):
+    pkt = memoryview(bytearray(make_image_packet()[1:-1]))
+
+    def decode():
+        frame = decode_packet(pkt)
+        frame.radiometric
+        frame.telemetry
+
+    calls, elapsed = measure(decode, args.duration)
+    return {"frames_per_s": round(calls / elapsed, 1), "us_per_frame": round(elapsed / calls * 1e6, 1)}
+
+
+def bench_agc(args):
+    radiometric, _ = SyntheticSource(seed=0).next_frame()
+    out = np.empty(radiometric.shape, dtype=np.uint8)
+    results = {}
+    for mode in MODES:
+        calls, elapsed = measure(lambda: apply(agc(radiometric, mode, smoothing=True, out=out), args.palette),
+                                 args.duration)
+        results[mode] = {"frames_per_s": round(calls / elapsed, 1), "us_per_frame": round(elapsed / calls * 1e6, 1)}
+    return results
+
+
+def bench_jpeg(args):
+    if Image is None:
+        return {"skipped": "pillow is not installed"}
+    import io
+
+    radiometric, _ = SyntheticSource(seed=0).next_frame()
+    img = Image.fromarray(apply(agc(radiometric, "hist-eq", smoothing=True), args.palette), mode="RGB")
+    results = {}
+    for quality in JPEG_QUALITIES:
+        size = 0
+
+        def encode():
+            nonlocal size
+            buf = io.BytesIO()
+            # the bridge's settings
+            img.save(buf, format="JPEG", quality=quality, optimize=True)
+            size = buf.tell()
+
+        calls, elapsed = measure(encode, args.duration)
+        results[f"q{quality}"] = {"frames_per_s": round(calls / elapsed, 1), "bytes": size}
+    return results
+
+
+def mjpeg_client(host, port, path, sim, latencies, stop):
+    """
+    Read an MJPEG stream and record how long after the camera sent the newest frame each JPEG arrives.
+    At the simulated camera's frame rate frames are far enough apart that the newest one sent is the one
+    that arrived.
+    """
+    conn = http.client.HTTPConnection(host, port)
+    conn.request("GET", path)
+    rsp = conn.getresponse()
+    buf = b""
+    while not stop.is_set():
+        data = rsp.read1(65536)
+        if not data:
+            break
+        buf += data
+        # a part ends with the JPEG's EOI marker, which can't appear inside the JPEG data
+        while True:
+            end = buf.find(b"\xff\xd9\r\n")
+            if end == -1:
+                break
+            buf = buf[end + 4:]
+            sent = sim.lastFrameSent
+            if sent is not None:
+                latencies.append((time.monotonic() - sent) * 1000)
+    conn.close()
+
+
+def bench_e2e(args):
+    try:
+        from werkzeug.serving import make_server
+        # the bridge is a flat set of modules in bridge_app, like it is run
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bridge_app"))
+        import bridge
+        import app
+    except ImportError as e:
+        return {"skipped": f"the bridge's requirements aren't installed: {e}"}
+
+    with TCamSimulator(port=0, fps=args.fps, seed=0) as sim, contextlib.redirect_stdout(sys.stderr):
+        camera = bridge.Camera("bench", *sim.address, fps_limit=1000)
+        bridge.cameras[camera.id] = camera
+        server = make_server("127.0.0.1", 0, app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        camera.start()
+
+        # let the camera connect before anybody starts measuring
+        deadline = time.monotonic() + 10
+        while camera.frames.latest()[1] is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        latencies = []
+        stop = threading.Event()
+        clients = [
+            threading.Thread(target=mjpeg_client, daemon=True,
+                             args=("127.0.0.1", server.server_port, f"/cam/bench/mjpeg?palette={args.palette}",
+                                   sim, latencies, stop))
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        # the first frames carry connection setup, don't count them
+        time.sleep(1)
+        del latencies[:]
+        time.sleep(max(args.duration, 10 / args.fps))
+        measured = list(latencies)
+        stats = bridge.pipeline_stats()
+
+        stop.set()
+        bridge.stop_flag = True
+        server.shutdown()
+
+    return {
+        "clients": args.clients,
+        "camera_fps": args.fps,
+        "latency_ms": percentiles(measured),
+        "renders": stats["render"]["completed"],
+    }
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pillow": Image.__version__ if Image is not None else None,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(old, new):
+    """
+    Print every number in new next to the one in old.
+    """
+    before = dict(flatten(old["results"]))
+    print(f"compared with {old['meta'].get('commit')} from {old['meta'].get('time')}")
+    for key, value in flatten(new["results"]):
+        if key in before and before[key]:
+            print(f"  {key:40s} {before[key]:>12} -> {value:>12}  {(value / before[key] - 1) * 100:+7.1f}%")
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        sys.exit(f"unknown benchmarks {', '.join(sorted(unknown))}, use some of {', '.join(BENCHMARKS)}")
+
+    report = {"meta": metadata(), "results": {}}
+    for name in BENCHMARKS:
+        if name in selected:
+            print(f"running {name}...", file=sys.stderr)
+            report["results"][name] = globals()[f"bench_{name}"](args)
+            print(f"  {json.dumps(report['results'][name])}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
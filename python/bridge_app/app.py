@@ -1,34 +1,36 @@
-import io
 import time
-import base64
-import array
-import threading
 
-import numpy as np
 from flask import Flask, Response, jsonify, request
-from PIL import Image
-from scipy import ndimage
 
+# the WebSocket stream is only served when flask-sock is installed
 try:
-    import tomllib  # py3.11+
-except Exception:  # pragma: no cover
-    import tomli as tomllib
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+from bridge import (
+    AGC_MODES,
+    MJPEG_BOUNDARY,
+    MJPEG_KEEPALIVE,
+    RAW_FORMATS,
+    RAW_POLL_TIMEOUT,
+    cameras,
+    check_view,
+    default_camera,
+    parse_coords,
+    pipeline_stats,
+    prometheus_metrics,
+    raw_encodings,
+    render_latest,
+    roi_reading,
+    start_cameras,
+    temperature_reading,
+    ws_encodings,
+)
+from palettes import palettes, get_lut
+from ws_frames import ENCODINGS, ENCODING_DELTA
 
-from pathlib import Path
-import sys
 
-# Ensure we can import tcam.py from parent folder (python/)
-this_dir = Path(__file__).resolve().parent
-python_root = this_dir.parent
-if str(python_root) not in sys.path:
-    sys.path.insert(0, str(python_root))
-
-from tcam import TCam
-from palettes import palettes
-
-
-with open(this_dir / "config.toml", "rb") as f:
-    cfg = tomllib.load(f)
 app = Flask(__name__)
 
 # Add CORS headers manually
@@ -39,196 +41,274 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
-latest_jpeg = {"bytes": None}
-stop_flag = False
-current_palette = "gray"  # Default palette
 
+def get_camera(cam_id):
+    """The camera a /cam/<id> route is for, the default camera for the others, or an error response"""
+    if cam_id is None:
+        return default_camera, None
+    camera = cameras.get(cam_id)
+    if camera is None:
+        return None, (jsonify({"error": f"Camera '{cam_id}' not found"}), 404)
+    return camera, None
 
-def radiometric_to_jpeg(img_json: dict, palette_name: str = "gray") -> bytes:
-    dec = base64.b64decode(img_json["radiometric"])  # 160x120 uint16
-    ra = array.array("H", dec)
-    a = np.frombuffer(ra, dtype=np.uint16).reshape(120, 160)
-    
-    # Apply Gaussian smoothing to reduce noise
-    a_smooth = ndimage.gaussian_filter(a.astype(np.float32), sigma=0.5)
-    
-    # Apply histogram equalization for better contrast
-    # Clip extreme values to avoid noise amplification
-    a_clipped = np.clip(a_smooth, np.percentile(a_smooth, 2), np.percentile(a_smooth, 98))
-    
-    # Normalize to 0-255 range
-    mn = a_clipped.min()
-    mx = a_clipped.max()
-    if mx == mn:
-        mx = mn + 1
-    
-    # Convert to 8-bit with improved normalization
-    g = ((a_clipped - mn) * 255 / (mx - mn)).astype(np.uint8)
-    
-    # Apply histogram equalization for better contrast distribution
-    hist, bins = np.histogram(g.flatten(), 256, [0, 256])
-    cdf = hist.cumsum()
-    cdf_normalized = cdf * 255 / cdf[-1]
-    g_eq = np.interp(g.flatten(), bins[:-1], cdf_normalized).reshape(g.shape).astype(np.uint8)
-    
-    # Apply palette if not grayscale using vectorized operations
-    if palette_name != "gray" and palette_name in palettes:
-        palette = palettes[palette_name]
-        # Convert palette to numpy array for vectorized operations
-        palette_array = np.array(palette, dtype=np.uint8)
-        # Use advanced indexing for much faster color mapping
-        rgb_array = palette_array[g_eq]
-        img = Image.fromarray(rgb_array, mode="RGB")
-        
-        # Keep original resolution
-    else:
-        # Use grayscale with smoothing
-        img = Image.fromarray(g_eq, mode="L")
-    
-    buf = io.BytesIO()
-    # Increase JPEG quality for better color reproduction
-    img.save(buf, format="JPEG", quality=95, optimize=True)
-    return buf.getvalue()
-
-
-def stream_thread():
-    while not stop_flag:
-        cam = None
-        try:
-            print("[tcam-bridge] Starting camera connection...")
-            cam = TCam()
-            stat = cam.connect(cfg["camera_host"], cfg.get("camera_port", 5001))
-            print(f"[tcam-bridge] Connect result: {stat}")
-            
-            if stat.get("status") != "connected":
-                print("[tcam-bridge] Connection failed, using mock thermal data...")
-                # Generate mock thermal data for testing
-                generate_mock_thermal_data()
-                time.sleep(5)
-                continue
-                
-            print("[tcam-bridge] Starting stream...")
-            cam.start_stream()
-            
-            frame_count = 0
-            while not stop_flag:
-                try:
-                    f = cam.get_frame()
-                    if f and "radiometric" in f:
-                        latest_jpeg["bytes"] = radiometric_to_jpeg(f, current_palette)
-                        frame_count += 1
-                        if frame_count % 10 == 0:
-                            print(f"[tcam-bridge] Processed {frame_count} frames")
-                    else:
-                        time.sleep(0.01)
-                except Exception as e:
-                    print(f"[tcam-bridge] Frame error: {e}")
-                    break
-                    
-        except Exception as e:
-            print(f"[tcam-bridge] Thread error: {e}")
-            # Generate mock thermal data when camera fails
-            generate_mock_thermal_data()
-            
-        finally:
-            if cam:
-                try:
-                    cam.shutdown()
-                except:
-                    pass
-                    
-        print("[tcam-bridge] Reconnecting in 5 seconds...")
-        time.sleep(5)
 
+def view_args(camera):
+    """The palette and AGC mode asked for in the query string, or an error response"""
+    view, error = check_view(camera, request.args.get("palette"), request.args.get("mode"))
+    if error:
+        return None, (jsonify({"error": error}), 400)
+    return view, None
 
-def generate_mock_thermal_data():
-    """Generate mock thermal data for testing when camera is not available"""
-    try:
-        print("[tcam-bridge] Generating mock thermal data...")
-        # Create a mock radiometric data structure
-        mock_radiometric = {
-            "radiometric": base64.b64encode(np.random.randint(20000, 30000, (120, 160), dtype=np.uint16).tobytes()).decode()
-        }
-        latest_jpeg["bytes"] = radiometric_to_jpeg(mock_radiometric, current_palette)
-        print("[tcam-bridge] Mock thermal data generated")
-    except Exception as e:
-        print(f"[tcam-bridge] Error generating mock data: {e}")
+
+def camera_health(camera):
+    seq, frame = camera.frames.latest()
+    return {"have_frame": frame is not None, "seq": seq, "current_palette": camera.palette}
 
 
 @app.get("/health")
 def health():
-    return jsonify({"ok": True, "have_frame": latest_jpeg["bytes"] is not None, "current_palette": current_palette})
+    status = {camera.id: camera_health(camera) for camera in cameras.values()}
+    return jsonify({"ok": True, **status[default_camera.id], "cameras": status})
+
+
+@app.get("/stats")
+def stats():
+    """Frames taken in, rendered and published, with the queue depth of every stage"""
+    return jsonify(pipeline_stats())
+
+
+@app.get("/metrics")
+def metrics():
+    """Counters, gauges and per-stage frame latencies for a Prometheus scrape"""
+    return Response(prometheus_metrics(), mimetype="text/plain; version=0.0.4")
 
 
 @app.get("/palettes")
-def get_palettes():
-    return jsonify({"palettes": list(palettes.keys()), "current": current_palette})
+@app.get("/cam/<cam_id>/palettes")
+def get_palettes(cam_id=None):
+    camera, error = get_camera(cam_id)
+    if error:
+        return error
+    return jsonify({"palettes": list(palettes.keys()), "current": camera.palette,
+                    "modes": list(AGC_MODES), "current_mode": camera.agc_mode})
+
+
+@app.get("/palettes/<name>")
+def get_palette_lut(name):
+    """A palette as its 256 r, g, b bytes, for clients rendering the WebSocket stream themselves"""
+    if name not in palettes:
+        return jsonify({"error": f"Palette '{name}' not found"}), 404
+    return Response(get_lut(name).rgb.tobytes(), mimetype="application/octet-stream",
+                    headers={"Cache-Control": "max-age=86400"})
 
 
 @app.post("/palette")
-def set_palette():
-    global current_palette
+@app.post("/cam/<cam_id>/palette")
+def set_palette(cam_id=None):
+    camera, error = get_camera(cam_id)
+    if error:
+        return error
     data = request.get_json()
     palette_name = data.get("palette", "gray")
     
     if palette_name in palettes:
-        current_palette = palette_name
-        return jsonify({"success": True, "palette": current_palette})
+        camera.palette = palette_name
+        return jsonify({"success": True, "palette": palette_name})
     else:
         return jsonify({"success": False, "error": f"Palette '{palette_name}' not found"}), 400
 
 
 @app.get("/mjpeg")
-def mjpeg():
-    boundary = "frame"
+@app.get("/cam/<cam_id>/mjpeg")
+def mjpeg(cam_id=None):
+    camera, error = get_camera(cam_id)
+    if error:
+        return error
+    view, error = view_args(camera)
+    if error:
+        return error
+    frames = camera.frames
 
     def gen():
-        last = None
+        seq = 0
         while True:
-            b = latest_jpeg["bytes"]
-            if b is not None and b is not last:
-                yield (
-                    b"--" + boundary.encode() + b"\r\n"
-                    + b"Content-Type: image/jpeg\r\n\r\n" + b + b"\r\n"
-                )
-                last = b
-            time.sleep(1.0 / max(cfg.get("fps_limit", 8), 1))
+            # wakes up once per new frame, a client that fell behind skips straight to the newest one
+            seq, frame = frames.wait(seq, MJPEG_KEEPALIVE)
+            if frame is not None:
+                try:
+                    part = render_latest(camera, seq, frame, view)[1]
+                except Exception:
+                    # the render pool counts the failure, the stream goes on with the next frame
+                    continue
+                camera.delivered(frame)
+                yield part
 
-    return Response(gen(), mimetype=f"multipart/x-mixed-replace; boundary={boundary}")
+    return Response(gen(), mimetype=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
 
 
 @app.get("/capture")
-def capture():
+@app.get("/cam/<cam_id>/capture")
+def capture(cam_id=None):
     """Capture a single image frame"""
-    if latest_jpeg["bytes"] is None:
+    camera, error = get_camera(cam_id)
+    if error:
+        return error
+    view, error = view_args(camera)
+    if error:
+        return error
+    seq, frame = camera.frames.latest()
+    if frame is None:
         return jsonify({"error": "No frame available"}), 404
-    
+    try:
+        jpeg = render_latest(camera, seq, frame, view)[0]
+    except Exception as e:
+        return jsonify({"error": f"Rendering the frame failed: {e}"}), 503
+
     return Response(
-        latest_jpeg["bytes"],
+        jpeg,
         mimetype="image/jpeg",
         headers={
-            "Content-Disposition": f"attachment; filename=thermal_capture_{int(time.time())}.jpg"
+            "Content-Disposition": f"attachment; filename=thermal_capture_{camera.id}_{int(time.time())}.jpg"
         }
     )
 
 
+def reading(cam_id, names, read):
+    """Answer a temperature query on the latest frame with read(seq, frame, *coordinates)"""
+    camera, error = get_camera(cam_id)
+    if error:
+        return error
+    coords, error = parse_coords(request.args, names)
+    if error:
+        return jsonify({"error": error}), 400
+    seq, frame = camera.frames.latest()
+    if frame is None:
+        return jsonify({"error": "No frame available"}), 404
+    try:
+        return jsonify(read(seq, frame, *coords))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.get("/temperature")
+@app.get("/cam/<cam_id>/temperature")
+def temperature(cam_id=None):
+    """The temperature of pixel ?x=&y= of the latest frame"""
+    return reading(cam_id, ("x", "y"), temperature_reading)
+
+
+@app.get("/roi")
+@app.get("/cam/<cam_id>/roi")
+def roi(cam_id=None):
+    """Min, max, mean and std temperature of the rectangle ?x0=&y0=&x1=&y1= (inclusive) of the latest frame"""
+    return reading(cam_id, ("x0", "y0", "x1", "y1"), roi_reading)
+
+
+@app.get("/raw")
+@app.get("/raw.<fmt>")
+@app.get("/cam/<cam_id>/raw")
+@app.get("/cam/<cam_id>/raw.<fmt>")
+def raw(cam_id=None, fmt=""):
+    """
+    The latest radiometric frame, as raw little-endian uint16 bytes, .npy or 16-bit PNG.  With ?after=<seq>
+    the request waits for a frame newer than seq (up to ?timeout= seconds) and gets a 204 if none comes.
+    """
+    if fmt not in RAW_FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}', use one of /raw, /raw.npy or /raw.png"}), 404
+    camera, error = get_camera(cam_id)
+    if error:
+        return error
+    frames = camera.frames
+    after = request.args.get("after", type=int)
+    if after is not None:
+        timeout = min(request.args.get("timeout", RAW_POLL_TIMEOUT, type=float), RAW_POLL_TIMEOUT)
+        seq, frame = frames.wait(after, timeout)
+        if seq <= after:
+            return Response(status=204, headers={"X-Frame-Seq": str(seq)})
+    else:
+        seq, frame = frames.latest()
+    if frame is None:
+        return jsonify({"error": "No frame available"}), 404
+
+    # sequence numbers are per camera
+    etag = f"{camera.id}.{seq}{'.' + fmt if fmt else ''}"
+    headers = {
+        "X-Frame-Seq": str(seq),
+        "X-Frame-Shape": "120,160",
+        "X-Frame-Dtype": "<u2",
+        "Cache-Control": "no-cache",
+    }
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(raw_encodings.get((camera.id, seq, fmt), frame, fmt), mimetype=RAW_FORMATS[fmt], headers=headers)
+    response.set_etag(etag)
+    return response
+
+
+if Sock is not None:
+    sock = Sock(app)
+
+    def ws_stream(ws, cam_id=None):
+        """
+        Push every new frame as a binary message for rendering on the client.  ?encoding= is raw, zlib or
+        delta (the default).  A delta is only sent to a client that got the frame before it, everybody else
+        gets a zlib keyframe.
+        """
+        camera = default_camera if cam_id is None else cameras.get(cam_id)
+        if camera is None:
+            ws.close(reason=1008, message=f"Camera '{cam_id}' not found")
+            return
+        frames = camera.frames
+        encoding = ENCODINGS.get(request.args.get("encoding", "delta"))
+        if encoding is None:
+            ws.close(reason=1003, message="encoding must be raw, zlib or delta")
+            return
+        seq = 0
+        sent = None
+        while ws.connected:
+            seq, frame = frames.wait(seq, MJPEG_KEEPALIVE)
+            if frame is None or seq == sent:
+                # nothing new to send.  The websocket's reader thread keeps watching the socket meanwhile and clears
+                # ws.connected once the client is gone, so an idle stream returns within one keepalive wait
+                continue
+            kind = encoding
+            if encoding == ENCODING_DELTA and sent != seq - 1:
+                kind = ENCODINGS["zlib"]
+            message = ws_encodings.get((camera.id, seq, kind), camera, seq, frame, kind)
+            camera.delivered(frame)
+            ws.send(message)
+            sent = seq
+
+    # Sock.route() returns None rather than the function, so the decorators can't be stacked, and each
+    # registration wraps it in a new view that needs an endpoint name of its own
+    sock.route("/ws", endpoint="ws_stream")(ws_stream)
+    sock.route("/cam/<cam_id>/ws", endpoint="cam_ws_stream")(ws_stream)
+
+
 @app.get("/")
 def index():
     # Minimal landing page with links to known endpoints
+    streams = "".join(f"<li><a href='/cam/{cam_id}/mjpeg'>/cam/{cam_id}/mjpeg</a></li>" for cam_id in cameras)
     return (
         "<html><body>"
         "<h3>tCam Bridge</h3>"
         "<ul>"
         "<li><a href='/health'>/health</a></li>"
+        "<li><a href='/stats'>/stats</a></li>"
+        "<li><a href='/metrics'>/metrics</a></li>"
         "<li><a href='/mjpeg'>/mjpeg</a></li>"
+        "<li><a href='/raw'>/raw</a> (<a href='/raw.npy'>.npy</a>, <a href='/raw.png'>.png</a>)</li>"
+        "<li><a href='/temperature?x=80&y=60'>/temperature?x=80&amp;y=60</a></li>"
+        "<li><a href='/roi?x0=70&y0=50&x1=89&y1=69'>/roi?x0=70&amp;y0=50&amp;x1=89&amp;y1=69</a></li>"
+        + streams +
         "</ul>"
         "</body></html>"
     )
 
 
 if __name__ == "__main__":
-    t = threading.Thread(target=stream_thread, daemon=True)
-    t.start()
+    start_cameras()
     app.run(host="0.0.0.0", port=8080, threaded=True, debug=False)
 
 
@@ -0,0 +1,340 @@
+"""
+  tCam bridge, ASGI server
+
+  The same bridge as app.py on Starlette and uvicorn.  Viewers are coroutines instead of threads: an idle
+  MJPEG viewer is a coroutine waiting on the AsyncFrameBroadcaster, and frames are encoded on worker
+  threads through the same render cache, so thousands of viewers can share one camera.
+
+      python bridge_app/asgi_app.py
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+import bridge
+from bridge import (
+    AGC_MODES,
+    MJPEG_BOUNDARY,
+    MJPEG_KEEPALIVE,
+    RAW_FORMATS,
+    RAW_POLL_TIMEOUT,
+    cameras,
+    check_view,
+    default_camera,
+    parse_coords,
+    pipeline_stats,
+    prometheus_metrics,
+    raw_encodings,
+    render_future,
+    roi_reading,
+    start_cameras,
+    temperature_reading,
+    ws_encodings,
+)
+from broadcast import AsyncFrameBroadcaster
+from palettes import palettes, get_lut
+from ws_frames import ENCODINGS, ENCODING_DELTA
+
+
+async def render_async(camera, seq, frame, view):
+    """
+    Like bridge.render_latest() without blocking the event loop.  The render runs on the render pool and
+    every viewer asking for the same one awaits the same future.
+    """
+    return await asyncio.wrap_future(render_future(camera, seq, frame, view))
+
+
+async def encode_async(cache, key, *args):
+    """
+    Like cache.get() without blocking the event loop, the encode runs on the render pool.
+    """
+    future, owner = cache.lookup(key)
+    if owner:
+        bridge.render_pool.submit(cache.fill, key, future, *args)
+    return await asyncio.wrap_future(future)
+
+
+def get_camera(request):
+    """The camera a /cam/{cam_id} route is for, the default camera for the others, or an error response"""
+    cam_id = request.path_params.get("cam_id")
+    if cam_id is None:
+        return default_camera, None
+    camera = cameras.get(cam_id)
+    if camera is None:
+        return None, JSONResponse({"error": f"Camera '{cam_id}' not found"}, status_code=404)
+    return camera, None
+
+
+def view_args(request, camera):
+    view, error = check_view(camera, request.query_params.get("palette"), request.query_params.get("mode"))
+    if error:
+        return None, JSONResponse({"error": error}, status_code=400)
+    return view, None
+
+
+def camera_health(camera):
+    seq, frame = camera.frames.latest()
+    return {"have_frame": frame is not None, "seq": seq, "current_palette": camera.palette}
+
+
+async def health(request):
+    status = {camera.id: camera_health(camera) for camera in cameras.values()}
+    return JSONResponse({"ok": True, **status[default_camera.id], "cameras": status})
+
+
+async def stats(request):
+    """Frames taken in, rendered and published, with the queue depth of every stage"""
+    return JSONResponse(pipeline_stats())
+
+
+async def metrics(request):
+    """Counters, gauges and per-stage frame latencies for a Prometheus scrape"""
+    return Response(prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def get_palettes(request):
+    camera, error = get_camera(request)
+    if error:
+        return error
+    return JSONResponse({"palettes": list(palettes.keys()), "current": camera.palette,
+                         "modes": list(AGC_MODES), "current_mode": camera.agc_mode})
+
+
+async def get_palette_lut(request):
+    """A palette as its 256 r, g, b bytes, for clients rendering the WebSocket stream themselves"""
+    name = request.path_params["name"]
+    if name not in palettes:
+        return JSONResponse({"error": f"Palette '{name}' not found"}, status_code=404)
+    return Response(get_lut(name).rgb.tobytes(), media_type="application/octet-stream",
+                    headers={"Cache-Control": "max-age=86400"})
+
+
+async def set_palette(request):
+    camera, error = get_camera(request)
+    if error:
+        return error
+    data = await request.json()
+    palette_name = data.get("palette", "gray")
+    if palette_name in palettes:
+        camera.palette = palette_name
+        return JSONResponse({"success": True, "palette": palette_name})
+    return JSONResponse({"success": False, "error": f"Palette '{palette_name}' not found"}, status_code=400)
+
+
+async def mjpeg(request):
+    camera, error = get_camera(request)
+    if error:
+        return error
+    view, error = view_args(request, camera)
+    if error:
+        return error
+    async_frames = request.app.state.frames[camera.id]
+
+    async def gen():
+        seq = 0
+        while True:
+            # wakes up once per new frame, a viewer that fell behind skips straight to the newest one
+            seq, frame = await async_frames.wait(seq, MJPEG_KEEPALIVE)
+            if frame is not None:
+                try:
+                    part = (await render_async(camera, seq, frame, view))[1]
+                except Exception:
+                    # the render pool counts the failure, the stream goes on with the next frame
+                    continue
+                camera.delivered(frame)
+                yield part
+
+    return StreamingResponse(gen(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
+
+
+async def capture(request):
+    """Capture a single image frame"""
+    camera, error = get_camera(request)
+    if error:
+        return error
+    view, error = view_args(request, camera)
+    if error:
+        return error
+    seq, frame = camera.frames.latest()
+    if frame is None:
+        return JSONResponse({"error": "No frame available"}, status_code=404)
+    try:
+        jpeg = (await render_async(camera, seq, frame, view))[0]
+    except Exception as e:
+        return JSONResponse({"error": f"Rendering the frame failed: {e}"}, status_code=503)
+    return Response(
+        jpeg,
+        media_type="image/jpeg",
+        headers={"Content-Disposition": f"attachment; filename=thermal_capture_{camera.id}_{int(time.time())}.jpg"},
+    )
+
+
+def reading(request, names, read):
+    camera, error = get_camera(request)
+    if error:
+        return error
+    coords, error = parse_coords(request.query_params, names)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+    seq, frame = camera.frames.latest()
+    if frame is None:
+        return JSONResponse({"error": "No frame available"}, status_code=404)
+    try:
+        # O(1) per query once the frame's integral images and extrema exist, cheap enough to run on the event loop
+        return JSONResponse(read(seq, frame, *coords))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+async def temperature(request):
+    """The temperature of pixel ?x=&y= of the latest frame"""
+    return reading(request, ("x", "y"), temperature_reading)
+
+
+async def roi(request):
+    """Min, max, mean and std temperature of the rectangle ?x0=&y0=&x1=&y1= (inclusive) of the latest frame"""
+    return reading(request, ("x0", "y0", "x1", "y1"), roi_reading)
+
+
+def etag_matches(request, etag):
+    tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    return f'"{etag}"' in tags or f'W/"{etag}"' in tags or "*" in tags
+
+
+async def raw(request):
+    """
+    The latest radiometric frame, as raw little-endian uint16 bytes, .npy or 16-bit PNG.  With ?after=<seq>
+    the request waits for a frame newer than seq (up to ?timeout= seconds) and gets a 204 if none comes.
+    """
+    fmt = request.path_params.get("fmt", "")
+    if fmt not in RAW_FORMATS:
+        return JSONResponse({"error": f"Unknown format '{fmt}', use one of /raw, /raw.npy or /raw.png"},
+                            status_code=404)
+    camera, error = get_camera(request)
+    if error:
+        return error
+    try:
+        after = int(request.query_params["after"]) if "after" in request.query_params else None
+        timeout = min(float(request.query_params.get("timeout", RAW_POLL_TIMEOUT)), RAW_POLL_TIMEOUT)
+    except ValueError:
+        return JSONResponse({"error": "'after' and 'timeout' must be numbers"}, status_code=400)
+    if after is not None:
+        seq, frame = await request.app.state.frames[camera.id].wait(after, timeout)
+        if seq <= after:
+            return Response(status_code=204, headers={"X-Frame-Seq": str(seq)})
+    else:
+        seq, frame = camera.frames.latest()
+    if frame is None:
+        return JSONResponse({"error": "No frame available"}, status_code=404)
+
+    # sequence numbers are per camera
+    etag = f"{camera.id}.{seq}{'.' + fmt if fmt else ''}"
+    headers = {
+        "X-Frame-Seq": str(seq),
+        "X-Frame-Shape": "120,160",
+        "X-Frame-Dtype": "<u2",
+        "Cache-Control": "no-cache",
+        "ETag": f'"{etag}"',
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(await encode_async(raw_encodings, (camera.id, seq, fmt), frame, fmt),
+                    media_type=RAW_FORMATS[fmt], headers=headers)
+
+
+async def ws_stream(websocket):
+    """
+    Push every new frame as a binary message for rendering on the client, the same stream as app.py's /ws.
+    """
+    await websocket.accept()
+    cam_id = websocket.path_params.get("cam_id")
+    camera = default_camera if cam_id is None else cameras.get(cam_id)
+    if camera is None:
+        await websocket.close(code=1008, reason=f"Camera '{cam_id}' not found")
+        return
+    encoding = ENCODINGS.get(websocket.query_params.get("encoding", "delta"))
+    if encoding is None:
+        await websocket.close(code=1003, reason="encoding must be raw, zlib or delta")
+        return
+    async_frames = websocket.app.state.frames[camera.id]
+
+    # a client that leaves is only seen by receiving, which the stream otherwise never does
+    async def receive_until_gone():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    gone = asyncio.create_task(receive_until_gone())
+    seq = 0
+    sent = None
+    try:
+        while not gone.done():
+            seq, frame = await async_frames.wait(seq, MJPEG_KEEPALIVE)
+            if frame is None or seq == sent:
+                continue
+            kind = encoding
+            if encoding == ENCODING_DELTA and sent != seq - 1:
+                kind = ENCODINGS["zlib"]
+            message = await encode_async(ws_encodings, (camera.id, seq, kind), camera, seq, frame, kind)
+            camera.delivered(frame)
+            await websocket.send_bytes(message)
+            sent = seq
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError is a send after the client's disconnect was received
+        pass
+    finally:
+        gone.cancel()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+    app.state.frames = {camera.id: AsyncFrameBroadcaster(camera.frames, loop) for camera in cameras.values()}
+    if app.state.start_camera:
+        start_cameras()
+    yield
+    bridge.stop_flag = True
+    bridge.render_pool.shutdown()
+
+
+# served for the default camera on their own and for every camera under /cam/{cam_id}
+camera_routes = [
+    Route("/palettes", get_palettes),
+    Route("/palette", set_palette, methods=["POST"]),
+    Route("/mjpeg", mjpeg),
+    Route("/capture", capture),
+    Route("/temperature", temperature),
+    Route("/roi", roi),
+    Route("/raw", raw),
+    Route("/raw.{fmt}", raw),
+    WebSocketRoute("/ws", ws_stream),
+]
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/stats", stats),
+        Route("/metrics", metrics),
+        Route("/palettes/{name}", get_palette_lut),
+        *camera_routes,
+        Mount("/cam/{cam_id}", routes=camera_routes),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_headers=["Content-Type", "Authorization"],
+                   allow_methods=["GET", "PUT", "POST", "DELETE", "OPTIONS"]),
+    ],
+    lifespan=lifespan,
+)
+app.state.start_camera = True
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,434 @@
+"""
+  tCam bridge core
+
+  Everything the bridge does apart from serving HTTP: the camera thread, the frame broadcaster and the
+  rendering and encoding of frames for clients.  app.py serves it with Flask and asgi_app.py with Starlette.
+"""
+import io
+import sys
+import time
+import base64
+import threading
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+from PIL import Image
+
+try:
+    import tomllib  # py3.11+
+except Exception:  # pragma: no cover
+    import tomli as tomllib
+
+# Ensure we can import tcam.py from parent folder (python/)
+this_dir = Path(__file__).resolve().parent
+python_root = this_dir.parent
+if str(python_root) not in sys.path:
+    sys.path.insert(0, str(python_root))
+
+from tcam import TCam
+from thermal_frame import ThermalFrame
+from palettes import palettes, apply
+from agc import MODES as AGC_MODES, agc
+from broadcast import FrameBroadcaster
+from render_cache import RenderCache
+from render_pool import RenderPool
+from metrics import Metrics, prometheus_text
+from ws_frames import ENCODING_DELTA, encode_frame
+
+
+with open(this_dir / "config.toml", "rb") as f:
+    cfg = tomllib.load(f)
+
+MJPEG_BOUNDARY = "frame"
+MJPEG_KEEPALIVE = 10  # seconds without a new frame before the last one is sent again
+stop_flag = False
+
+
+def radiometric_to_jpeg(frame: ThermalFrame, palette_name: str = "gray", mode: str = "hist-eq") -> bytes:
+    # Histogram based AGC straight from the 160x120 uint16 data, smoothed to reduce noise
+    g_eq = agc(frame.radiometric, mode, smoothing=True)
+    
+    # Apply palette if not grayscale, through its precompiled lookup table
+    if palette_name != "gray" and palette_name in palettes:
+        rgb_array = apply(g_eq, palette_name)
+        img = Image.fromarray(rgb_array, mode="RGB")
+        
+        # Keep original resolution
+    else:
+        # Use grayscale with smoothing
+        img = Image.fromarray(g_eq, mode="L")
+    
+    buf = io.BytesIO()
+    # Increase JPEG quality for better color reproduction
+    img.save(buf, format="JPEG", quality=95, optimize=True)
+    return buf.getvalue()
+
+
+def render(frame, palette_name, mode):
+    """Encode a frame as (jpeg, mjpeg part)"""
+    jpeg = radiometric_to_jpeg(frame, palette_name, mode)
+    part = (
+        b"--" + MJPEG_BOUNDARY.encode() + b"\r\n"
+        + b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+    )
+    return jpeg, part
+
+
+# every (camera, frame sequence, palette, AGC mode) is encoded once, however many clients want it, on one of
+# the render pool's workers
+renders = RenderCache(render, maxsize=cfg.get("render_cache_size", 64))
+render_pool = RenderPool(cfg.get("render_workers"))
+VIEW_IDLE = 5  # seconds a palette and AGC mode keeps getting rendered ahead after its last viewer asked for it
+
+
+def check_view(camera, palette_name, mode):
+    """
+    Validate the palette and AGC mode a client asked for, defaulting to the camera's, returns
+    ((palette, mode), None) or (None, error)
+    """
+    palette_name = palette_name or camera.palette
+    mode = (mode or camera.agc_mode).lower()
+    if palette_name not in palettes:
+        return None, f"Palette '{palette_name}' not found"
+    if mode not in AGC_MODES:
+        return None, f"AGC mode '{mode}' not found"
+    return (palette_name, mode), None
+
+
+def submit_render(camera, seq, frame, view):
+    """The Future of the (jpeg, mjpeg part) of a frame, submitting its render to the pool if nobody has yet"""
+    key = (camera.id, seq, *view)
+    future, owner = renders.lookup(key)
+    if owner:
+        published = frame.timestamps.get("published")
+        if published is not None:
+            future.add_done_callback(lambda f: camera.metrics.observe("render", time.monotonic() - published))
+        render_pool.submit(renders.fill, key, future, frame, *view)
+    return future
+
+
+def render_future(camera, seq, frame, view):
+    """Like submit_render(), for a client that is watching view, which keeps it rendered ahead"""
+    camera.views[view] = time.monotonic()
+    return submit_render(camera, seq, frame, view)
+
+
+def render_latest(camera, seq, frame, view):
+    return render_future(camera, seq, frame, view).result()
+
+
+def parse_coords(args, names):
+    """Read integer pixel coordinates from a query string, returns (coordinates, None) or (None, error)"""
+    coords = []
+    for name in names:
+        try:
+            coords.append(int(args[name]))
+        except (KeyError, ValueError):
+            return None, f"'{name}' must be given as an integer pixel coordinate"
+    return coords, None
+
+
+def raw_to_celsius(value, resolution):
+    """None when the camera has TLinear disabled and there is no resolution to convert at"""
+    if resolution is None:
+        return None
+    return round(value * resolution - 273.15, 2)
+
+
+def temperature_reading(seq, frame, x, y):
+    """The temperature of one pixel, raises ValueError if it is outside the frame"""
+    value = frame.temperature(x, y)
+    return {"seq": seq, "x": x, "y": y, "raw": value, "celsius": raw_to_celsius(value, frame.resolution)}
+
+
+def roi_reading(seq, frame, x0, y0, x1, y1):
+    """Temperature statistics of a rectangle, raises ValueError if it isn't inside the frame"""
+    stats = frame.roi_stats(x0, y0, x1, y1)
+    resolution = frame.resolution
+    celsius = None
+    if resolution is not None:
+        celsius = {k: raw_to_celsius(stats[k], resolution) for k in ("min", "max", "mean")}
+        celsius["std"] = round(stats["std"] * resolution, 2)
+    return {"seq": seq, "roi": [x0, y0, x1, y1], "count": stats.pop("count"), "raw": stats, "celsius": celsius}
+
+
+RAW_FORMATS = {
+    "": "application/octet-stream",
+    "npy": "application/x-npy",
+    "png": "image/png",
+}
+RAW_POLL_TIMEOUT = 30  # longest a ?after= request is held open, in seconds
+
+
+def encode_raw(frame, fmt):
+    """Encode the 120x160 uint16 radiometric data of a frame losslessly"""
+    a = frame.radiometric
+    if fmt == "npy":
+        buf = io.BytesIO()
+        np.save(buf, a, allow_pickle=False)
+        return buf.getvalue()
+    if fmt == "png":
+        buf = io.BytesIO()
+        Image.fromarray(a.astype("<u2", copy=False), mode="I;16").save(buf, format="PNG", compress_level=1)
+        return buf.getvalue()
+    return a.astype("<u2", copy=False).tobytes()
+
+
+# like renders, every frame is encoded once per format
+raw_encodings = RenderCache(encode_raw, maxsize=16)
+
+
+def encode_ws(camera, seq, frame, encoding):
+    """Encode a frame of a camera as a WebSocket message, see ws_frames.py"""
+    published = camera.frames.get(seq)
+    previous = camera.frames.get(seq - 1) if encoding == ENCODING_DELTA else None
+    return encode_frame(seq, published[1] if published else time.time(), frame, encoding,
+                        previous[0] if previous else None)
+
+
+# every frame is compressed once per encoding, whatever the number of WebSocket clients
+ws_encodings = RenderCache(encode_ws, maxsize=16)
+
+
+class Camera:
+    """
+    Camera - One camera served by the bridge.
+
+    Each camera has its own connection thread, frame broadcaster and default palette and AGC mode.  The
+    render caches are shared and keyed on the camera id, so one server process and one set of render
+    threads encode the frames of every camera.
+    """
+
+    def __init__(self, id, host, port=5001, fps_limit=8, frame_policy="latest", max_frames=8,
+                 agc="hist-eq", palette="gray"):
+        self.id = id
+        self.host = host
+        self.port = port
+        self.fps_limit = fps_limit
+        self.frame_policy = frame_policy
+        self.max_frames = max_frames
+        self.agc_mode = agc
+        self.palette = palette
+        # the newest frame from the camera, rendered for whichever palettes and AGC modes clients ask for
+        self.frames = FrameBroadcaster()
+        self.frames.add_listener(self.prerender)
+        # (palette, mode) -> when a client last asked for it
+        self.views = {}
+        self.thread = None
+        self.cam = None
+        # shared with every TCam the camera connects with, so counts carry over reconnects
+        self.metrics = Metrics()
+        self.metrics.gauge("clients_waiting", lambda: self.frames.waiting)
+        self.metrics.gauge("views", lambda: len(self.views))
+
+    def __repr__(self):
+        return f"Camera({self.id!r}, {self.host!r}, {self.port})"
+
+    def log(self, msg):
+        print(f"[tcam-bridge {self.id}] {msg}")
+
+    def start(self):
+        """
+        start()
+
+        Start the thread connecting to the camera and publishing its frames.
+        """
+        self.thread = threading.Thread(target=self.stream_thread, name=f"tcam-bridge-{self.id}", daemon=True)
+        self.thread.start()
+
+    def prerender(self, seq, frame):
+        """
+        prerender()
+
+        Called for every published frame.  Start rendering it for the views clients watched lately, so the
+        render pool works on the frame while it is on its way to the clients instead of after they ask.  The
+        camera thread only submits, it never renders.
+        """
+        now = time.monotonic()
+        for view, used in list(self.views.items()):
+            if now - used > VIEW_IDLE:
+                self.views.pop(view, None)
+            elif render_pool.busy():
+                # the workers are behind, clients will ask for the newest frame themselves
+                self.metrics.count("prerenders_skipped")
+            else:
+                submit_render(self, seq, frame, view)
+
+    def delivered(self, frame):
+        """
+        delivered()
+
+        Called by a client connection as it hands a frame over, records the time from publishing, and from
+        the camera, to the client.
+        """
+        now = time.monotonic()
+        self.metrics.count("frames_delivered")
+        timestamps = frame.timestamps
+        if "published" in timestamps:
+            self.metrics.observe("deliver", now - timestamps["published"])
+        if "received" in timestamps:
+            self.metrics.observe("end_to_end", now - timestamps["received"])
+
+    def stats(self):
+        """
+        stats()
+
+        The state of the camera's stages: frames taken in from the camera, and published to clients.
+        """
+        cam = self.cam
+        counters = self.metrics.snapshot()["counters"]
+        seq, frame = self.frames.latest()
+        history = list(self.frames.history)
+        fps = 0.0
+        if len(history) > 1 and history[-1][2] > history[0][2]:
+            fps = (len(history) - 1) / (history[-1][2] - history[0][2])
+        return {
+            "intake": {
+                "connected": cam is not None,
+                "received": counters.get("frames_out", 0),
+                "skipped": counters.get("frames_skipped", 0),
+                "dropped": counters.get("frames_dropped", 0),
+                "queued": cam.frame_count() if cam is not None else 0,
+                "reconnects": counters.get("reconnects", 0),
+            },
+            "publish": {
+                "seq": seq,
+                "fps": round(fps, 2),
+                "age": round(time.time() - history[-1][2], 3) if history else None,
+                "waiting": self.frames.waiting,
+                "views": len(self.views),
+                "prerenders_skipped": counters.get("prerenders_skipped", 0),
+            },
+        }
+
+    def stream_thread(self):
+        while not stop_flag:
+            cam = None
+            try:
+                self.log(f"Starting camera connection to {self.host}:{self.port}...")
+                # frames that come in while the camera thread is busy wait on the queue, only ever the newest
+                cam = TCam(frame_policy=self.frame_policy, max_frames=self.max_frames, metrics=self.metrics)
+                stat = cam.connect(self.host, self.port)
+                self.log(f"Connect result: {stat}")
+
+                if stat.get("status") != "connected":
+                    self.log("Connection failed, using mock thermal data...")
+                    # Generate mock thermal data for testing
+                    self.generate_mock_thermal_data()
+                    time.sleep(5)
+                    continue
+
+                self.log("Starting stream...")
+                cam.start_stream()
+                self.cam = cam
+
+                frame_count = 0
+                # fps_limit caps how many frames get rendered, on average, to save CPU
+                interval = 1.0 / max(self.fps_limit, 1)
+                next_render = 0
+                while not stop_flag:
+                    try:
+                        f = cam.frameQueue.get(timeout=1)
+                        if f and "radiometric" in f:
+                            now = time.monotonic()
+                            if now < next_render:
+                                self.metrics.count("frames_skipped")
+                                continue
+                            next_render = max(next_render + interval, now)
+                            f.timestamps["published"] = time.monotonic()
+                            self.metrics.count("frames_published")
+                            self.frames.publish(f)
+                            frame_count += 1
+                            if frame_count % 10 == 0:
+                                self.log(f"Processed {frame_count} frames, dropped {cam.dropped_frames()}")
+                    except Empty:
+                        pass
+                    except Exception as e:
+                        self.log(f"Frame error: {e}")
+                        break
+
+            except Exception as e:
+                self.log(f"Thread error: {e}")
+                # Generate mock thermal data when camera fails
+                self.generate_mock_thermal_data()
+
+            finally:
+                self.cam = None
+                if cam:
+                    try:
+                        cam.shutdown()
+                    except:
+                        pass
+
+            self.log("Reconnecting in 5 seconds...")
+            time.sleep(5)
+
+    def generate_mock_thermal_data(self):
+        """Generate mock thermal data for testing when camera is not available"""
+        try:
+            self.log("Generating mock thermal data...")
+            # Create a mock radiometric data structure
+            mock_radiometric = ThermalFrame(
+                radiometric=base64.b64encode(np.random.randint(20000, 30000, (120, 160), dtype=np.uint16).tobytes()).decode()
+            )
+            self.frames.publish(mock_radiometric)
+            self.log("Mock thermal data generated")
+        except Exception as e:
+            self.log(f"Error generating mock data: {e}")
+
+
+# settings a [[cameras]] table can override, the top level values are the defaults for every camera
+CAMERA_SETTINGS = ("port", "fps_limit", "frame_policy", "max_frames", "agc", "palette")
+
+
+def load_cameras(cfg):
+    """
+    load_cameras()
+
+    The cameras configured in config.toml by id, in order.  Without any [[cameras]] tables the top level
+    camera_host and camera_port are the one camera, with id "0".
+    """
+    defaults = {"port": cfg.get("camera_port", 5001)}
+    defaults.update({k: cfg[k] for k in CAMERA_SETTINGS if k in cfg})
+    tables = cfg.get("cameras") or [{"host": cfg["camera_host"]}]
+    cameras = {}
+    for n, table in enumerate(tables):
+        camera_id = str(table.get("id", n))
+        if camera_id in cameras:
+            raise ValueError(f"Camera id '{camera_id}' is used more than once in config.toml")
+        settings = dict(defaults)
+        settings.update({k: table[k] for k in CAMERA_SETTINGS if k in table})
+        cameras[camera_id] = Camera(camera_id, table["host"], **settings)
+    return cameras
+
+
+cameras = load_cameras(cfg)
+# the first camera is also served on the routes without a /cam/<id> prefix
+default_camera = next(iter(cameras.values()))
+
+
+def start_cameras():
+    for camera in cameras.values():
+        camera.start()
+
+
+def prometheus_metrics():
+    """Every camera's metrics and the render pool's in the Prometheus text format"""
+    sources = [({"camera": camera.id}, camera.metrics.snapshot()) for camera in cameras.values()]
+    pool = render_pool.stats()
+    sources.append(({}, {
+        "counters": {"renders": pool["completed"], "render_errors": pool["failed"],
+                     "render_cache_hits": renders.hits, "render_busy_seconds": pool["busy_seconds"]},
+        "gauges": {"render_workers": pool["workers"], "render_queued": pool["queued"],
+                   "render_active": pool["active"]},
+    }))
+    return prometheus_text(sources, prefix="tcam_bridge")
+
+
+def pipeline_stats():
+    """The stats of every camera and of the render pool they share"""
+    return {
+        "cameras": {camera.id: camera.stats() for camera in cameras.values()},
+        "render": {**render_pool.stats(), "renders": renders.renders, "cache_hits": renders.hits},
+    }
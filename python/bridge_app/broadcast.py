@@ -0,0 +1,158 @@
+"""
+  Frame broadcasting for the bridge
+
+  One producer publishes frames, any number of client threads wait for them.  Every published frame gets
+  the next sequence number and wakes all waiting clients once through a Condition, so a client sleeps until
+  there is something new and sees it right away.  A client only ever gets the newest frame: one that falls
+  behind skips whatever it missed instead of working through a backlog.
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+class FrameBroadcaster:
+    """
+    FrameBroadcaster - Hands the newest frame to every client waiting for it.
+
+        frames = FrameBroadcaster()
+
+        # producer
+        frames.publish(jpeg)
+
+        # each client
+        seq = 0
+        while True:
+            seq, jpeg = frames.wait(seq)
+            send(jpeg)
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        # the last few frames with their publish times, for clients that encode against the previous frame
+        self.history = deque(maxlen=4)
+        self.listeners = []
+        self.waiting = 0  # clients blocked in wait() right now
+
+    def publish(self, frame):
+        """
+        publish()
+
+        Make frame the newest one and wake every waiting client.  Returns its sequence number.
+        """
+        with self.cond:
+            self.seq += 1
+            self.frame = frame
+            self.history.append((self.seq, frame, time.time()))
+            self.cond.notify_all()
+            seq = self.seq
+        for listener in self.listeners:
+            listener(seq, frame)
+        return seq
+
+    def add_listener(self, listener):
+        """
+        add_listener()
+
+        Have listener(seq, frame) called from the publishing thread for every frame published from now on.
+        """
+        self.listeners.append(listener)
+
+    def latest(self):
+        """
+        latest()
+
+        The (sequence number, frame) of the newest frame, (0, None) before anything is published.
+        """
+        with self.cond:
+            return self.seq, self.frame
+
+    def get(self, seq):
+        """
+        get()
+
+        The (frame, publish time) of one of the last few frames by sequence number, None if it is gone.
+        """
+        with self.cond:
+            for s, frame, published in self.history:
+                if s == seq:
+                    return frame, published
+        return None
+
+    def wait(self, after=0, timeout=None):
+        """
+        wait()
+
+        Wait for a frame newer than sequence number after and return its (sequence number, frame).  If
+        there isn't one within timeout seconds the newest frame is returned again, so callers can use the
+        timeout to send keepalives.
+        """
+        with self.cond:
+            self.waiting += 1
+            try:
+                self.cond.wait_for(lambda: self.seq > after, timeout)
+            finally:
+                self.waiting -= 1
+            return self.seq, self.frame
+
+
+class AsyncFrameBroadcaster:
+    """
+    AsyncFrameBroadcaster - FrameBroadcaster for clients that are coroutines.
+
+    It follows a FrameBroadcaster, which publishes from the camera thread, on an event loop.  A waiting
+    client is only a coroutine parked on an asyncio.Event, so thousands of idle clients cost next to
+    nothing, and each published frame wakes every one of them once.
+
+        frames = AsyncFrameBroadcaster(source, loop)
+        seq = 0
+        while True:
+            seq, frame = await frames.wait(seq)
+    """
+
+    def __init__(self, source, loop):
+        self.seq, self.frame = source.latest()
+        self.event = asyncio.Event()
+        self.loop = loop
+        source.add_listener(self.publish_threadsafe)
+
+    def publish_threadsafe(self, seq, frame):
+        try:
+            self.loop.call_soon_threadsafe(self.publish, seq, frame)
+        except RuntimeError:
+            # the event loop is closed, the server is shutting down
+            pass
+
+    def publish(self, seq, frame):
+        """
+        publish()
+
+        Make frame the newest one and wake every waiting client.  Only call this on the event loop.
+        """
+        if seq <= self.seq:
+            return
+        self.seq = seq
+        self.frame = frame
+        # every waiter is woken by the old event, the next wait starts on a fresh one
+        event = self.event
+        self.event = asyncio.Event()
+        event.set()
+
+    def latest(self):
+        return self.seq, self.frame
+
+    async def wait(self, after=0, timeout=None):
+        """
+        wait()
+
+        Same as FrameBroadcaster.wait(), as a coroutine.
+        """
+        while self.seq <= after:
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        return self.seq, self.frame
@@ -0,0 +1,77 @@
+"""
+  Render cache for the bridge
+
+  Clients can each ask for their own palette and AGC mode, but a frame is only ever encoded once per
+  combination.  The first client to ask for a key renders it, any client asking for the same key meanwhile
+  waits for that render instead of starting its own, and the result is kept in a small LRU for everybody
+  after them.  N clients sharing K palettes cost K encodes per frame.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class RenderCache:
+    """
+    RenderCache - LRU of rendered outputs, keyed on whatever identifies a render, for example
+    (frame sequence number, palette, AGC mode).
+
+        cache = RenderCache(radiometric_to_jpeg)
+        jpeg = cache.get((seq, palette, mode), frame, palette, mode)
+    """
+
+    def __init__(self, render, maxsize=64):
+        self.render = render
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.renders = 0
+        self.hits = 0
+
+    def lookup(self, key):
+        """
+        lookup()
+
+        The (future, owner) for key.  owner is True for the caller that has to fill() the future, everybody
+        else just waits on it.  For callers that can't block, like coroutines.
+        """
+        with self.lock:
+            future = self.entries.get(key)
+            if future is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return future, False
+            future = Future()
+            self.entries[key] = future
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            self.renders += 1
+            return future, True
+
+    def fill(self, key, future, *args):
+        """
+        fill()
+
+        Render the output for a future lookup() made the caller the owner of.  Exceptions raised by render()
+        are passed on to everybody waiting for the key, the key isn't cached, and the exception is raised
+        again so whatever runs fill(), like the render pool, sees the failure.
+        """
+        try:
+            future.set_result(self.render(*args))
+        except Exception as e:
+            future.set_exception(e)
+            with self.lock:
+                if self.entries.get(key) is future:
+                    del self.entries[key]
+            raise
+
+    def get(self, key, *args):
+        """
+        get()
+
+        The output for key, calling render(*args) to make it only if nobody has already.
+        """
+        future, owner = self.lookup(key)
+        if owner:
+            self.fill(key, future, *args)
+        return future.result()
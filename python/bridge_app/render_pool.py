@@ -0,0 +1,101 @@
+"""
+  Render worker pool for the bridge
+
+  All JPEG encoding for every camera runs on a fixed number of worker threads (numpy and PIL release the
+  GIL while they work, so threads do run in parallel).  Camera threads only take frames off the socket and
+  publish them, client threads only wait for renders, so a slow encode never holds up frame intake and a
+  crowd of viewers can't start more encodes than there are workers.
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RenderPool:
+    """
+    RenderPool - A thread pool that keeps count of what it is doing.
+
+        pool = RenderPool(4)
+        future = pool.submit(render, frame, palette, mode)
+        jpeg = future.result()
+        pool.stats()
+    """
+
+    THROUGHPUT_WINDOW = 10  # seconds the throughput is averaged over
+
+    def __init__(self, workers=None, max_queued=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        # optional work is refused past this many waiting jobs, see busy()
+        self.max_queued = max_queued or 2 * self.workers
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="render")
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.finished = deque(maxlen=1000)  # monotonic completion times, for the throughput
+
+    def submit(self, fn, *args):
+        """
+        submit()
+
+        Run fn(*args) on a worker, returns its concurrent.futures.Future.
+        """
+        with self.lock:
+            self.queued += 1
+        return self.executor.submit(self._run, fn, args)
+
+    def busy(self):
+        """
+        busy()
+
+        True when more than max_queued jobs are waiting for a worker, so work that can be skipped should be.
+        """
+        return self.queued >= self.max_queued
+
+    def _run(self, fn, args):
+        with self.lock:
+            self.queued -= 1
+            self.active += 1
+        start = time.monotonic()
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            end = time.monotonic()
+            with self.lock:
+                self.active -= 1
+                self.busy_seconds += end - start
+                if ok:
+                    self.completed += 1
+                    self.finished.append(end)
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        """
+        stats()
+
+        A dict of the number of workers, jobs waiting and running, jobs completed and failed, the total time
+        spent rendering and the renders per second over the last THROUGHPUT_WINDOW seconds.
+        """
+        now = time.monotonic()
+        with self.lock:
+            recent = sum(1 for t in self.finished if now - t <= self.THROUGHPUT_WINDOW)
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "throughput": recent / self.THROUGHPUT_WINDOW,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#
+# Smoke test for the bridge: points the default camera at a simulated tCam-Mini (tcam_sim.py), serves the
+# Flask app and the ASGI app on free ports and checks that both answer every route, and that /ws and
+# /cam/<id>/ws both stream frames.  Needs the bridge's requirements plus websocket-client.  Exits with
+# status 1 if anything fails.
+#
+#   python bridge_app/smoke_test.py
+#
+
+import contextlib
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+import websocket
+from werkzeug.serving import make_server
+
+import bridge
+import app
+import asgi_app
+from tcam_sim import TCamSimulator
+
+failures = []
+
+
+def check(name, ok, detail=""):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}{f'  ({detail})' if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+
+def get(base, path):
+    try:
+        with urllib.request.urlopen(base + path, timeout=10) as rsp:
+            return rsp.status, rsp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def check_routes(base, cam_id):
+    for prefix in ("", f"/cam/{cam_id}"):
+        for path in ("/palettes", "/capture", "/temperature?x=80&y=60", "/roi?x0=70&y0=50&x1=89&y1=69",
+                     "/raw", "/raw.npy", "/raw.png"):
+            status, _ = get(base, prefix + path)
+            check(f"GET {prefix}{path}", status == 200, status)
+    for path in ("/health", "/stats", "/metrics", "/palettes/ironblack"):
+        status, _ = get(base, path)
+        check(f"GET {path}", status == 200, status)
+    status, _ = get(base, "/cam/nope/capture")
+    check("GET /cam/nope/capture is a 404", status == 404, status)
+
+
+def check_ws(url):
+    path = "/" + url.split("/", 3)[3]
+    try:
+        ws = websocket.create_connection(url, timeout=10)
+        try:
+            message = ws.recv()
+        finally:
+            ws.close()
+        check(f"WS {path}", isinstance(message, bytes) and len(message) > 24, repr(message)[:60])
+    except Exception as e:
+        check(f"WS {path}", False, e)
+
+
+def check_server(name, port, cam_id):
+    print(name)
+    check_routes(f"http://127.0.0.1:{port}", cam_id)
+    check_ws(f"ws://127.0.0.1:{port}/ws")
+    check_ws(f"ws://127.0.0.1:{port}/cam/{cam_id}/ws")
+
+
+def start_asgi():
+    # the camera is already running, the app only has to follow it
+    asgi_app.app.state.start_camera = False
+    server = uvicorn.Server(uvicorn.Config(asgi_app.app, host="127.0.0.1", port=0, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return server, server.servers[0].sockets[0].getsockname()[1]
+
+
+if __name__ == "__main__":
+
+    with TCamSimulator(port=0, fps=10, seed=0) as sim, contextlib.redirect_stderr(open(os.devnull, "w")):
+        camera = bridge.default_camera
+        camera.host, camera.port = sim.address
+        camera.start()
+
+        deadline = time.monotonic() + 10
+        while camera.frames.latest()[1] is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        flask_server = make_server("127.0.0.1", 0, app.app, threaded=True)
+        threading.Thread(target=flask_server.serve_forever, daemon=True).start()
+        check_server("flask bridge", flask_server.server_port, camera.id)
+        flask_server.shutdown()
+
+        asgi_server, port = start_asgi()
+        check_server("asgi bridge", port, camera.id)
+        asgi_server.should_exit = True
+
+        bridge.stop_flag = True
+
+    if failures:
+        sys.exit(f"{len(failures)} checks failed")
+    print("all checks passed")
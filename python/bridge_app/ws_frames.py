@@ -0,0 +1,66 @@
+"""
+  Binary frame messages for the bridge's WebSocket stream
+
+  Each message is a 24 byte little-endian header followed by the radiometric data of one frame:
+
+      offset  type     field
+      0       uint8    version (1)
+      1       uint8    encoding, see below
+      2       uint16   rows
+      4       uint16   columns
+      6       uint16   coldest raw value in the frame
+      8       uint16   hottest raw value in the frame
+      10      uint16   reserved, 0
+      12      uint32   frame sequence number
+      16      float64  time the bridge received the frame, seconds since the epoch
+
+  and the payload is one of
+
+      ENCODING_RAW    rows x columns little-endian uint16 values
+      ENCODING_ZLIB   zlib stream of the values split into byte planes, all the low bytes then all the high
+                      bytes, which compresses much better than the interleaved values
+      ENCODING_DELTA  like ENCODING_ZLIB, but of the difference from the previous frame (sequence - 1)
+                      modulo 65536, so only sent to a client that has that frame
+
+  Clients render the frames themselves, so the bridge does one compression per frame and encoding however
+  many clients are watching.
+"""
+import zlib
+import struct
+
+import numpy as np
+
+VERSION = 1
+ENCODING_RAW = 0
+ENCODING_ZLIB = 1
+ENCODING_DELTA = 2
+ENCODINGS = {"raw": ENCODING_RAW, "zlib": ENCODING_ZLIB, "delta": ENCODING_DELTA}
+
+HEADER = struct.Struct("<BBHHHHHId")
+ZLIB_LEVEL = 1  # higher levels cost several times the CPU for a few percent smaller frames
+
+
+def byte_planes(a):
+    return np.ascontiguousarray(a.astype("<u2", copy=False).view(np.uint8).reshape(-1, 2).T)
+
+
+def encode_frame(seq, published, frame, encoding, previous=None):
+    """
+    encode_frame()
+
+    Build the message for a frame.  ENCODING_DELTA needs the previous frame, without it the frame is sent as
+    ENCODING_ZLIB, which the header says.
+    """
+    a = frame.radiometric
+    if encoding == ENCODING_DELTA and previous is None:
+        encoding = ENCODING_ZLIB
+    if encoding == ENCODING_RAW:
+        payload = a.astype("<u2", copy=False).tobytes()
+    elif encoding == ENCODING_ZLIB:
+        payload = zlib.compress(byte_planes(a), ZLIB_LEVEL)
+    else:
+        # uint16 arithmetic wraps, the client adds the difference back the same way
+        payload = zlib.compress(byte_planes(a - previous.radiometric), ZLIB_LEVEL)
+    rows, cols = a.shape
+    header = HEADER.pack(VERSION, encoding, rows, cols, int(a.min()), int(a.max()), 0, seq, published)
+    return header + payload
@@ -0,0 +1 @@
+../agc.py
\ No newline at end of file
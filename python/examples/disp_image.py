@@ -8,8 +8,6 @@
 #
 
 import argparse
-import array
-import base64
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 import numpy as np
@@ -53,11 +51,10 @@ if __name__ == "__main__":
         sys.exit()
 
     #
-    # Get image and decode radiometric data into an array of uint16 values
+    # Get image and its radiometric data as a list of uint16 values
     #
-    img_json = cam.get_image()
-    dec_rad = base64.b64decode(img_json["radiometric"])
-    ra = array.array('H', dec_rad)
+    img = cam.get_image()
+    ra = img.radiometric.ravel().tolist()
 
     #
     # Determine minimum/maximum 16-bit values in radiometric data
@@ -4,9 +4,8 @@
 #
 
 import argparse
-import array
-import base64
 from tcam import TCam
+from telemetry import decode
 import sys
 
 parser = argparse.ArgumentParser()
@@ -40,11 +39,10 @@ if __name__ == "__main__":
         sys.exit()
 
     #
-    # Get image and decode telemetry into an array of uint16 values
+    # Get image and its telemetry as an array of uint16 values
     #
-    img_json = cam.get_image()
-    dec_tel = base64.b64decode(img_json["telemetry"])
-    ra = array.array('H', dec_tel)
+    img = cam.get_image()
+    ra = img.telemetry
 
     #
     # Shutdown the camera driver
@@ -53,46 +51,31 @@ if __name__ == "__main__":
 
     #
     # Lepton telemetry is comprised of 3 telemetry rows: A, B, and C.  Each
-    # row is 80 16-bit words long.  Some data from each row is decoded and
-    # displayed to demonstrate how to access the combined decoded array.
-    # See the Lepton Engineering Datasheet for a complete list of telemetry
-    # values.
+    # row is 80 16-bit words long.  decode() picks some of the words out of
+    # all three rows by name and converts them to physical units.  See
+    # telemetry.py for the word offsets and the Lepton Engineering Datasheet
+    # for a complete list of telemetry values.
     #
     print(f"Telemetry Array length = {len(ra)} words")
+    t = decode(ra)
 
     #
-    # Row A - offset 0 in the register array
-    #   Word 24 : FPA Temperature (Kelvin x 100)
-    #   Word 26 : Housing Temperature (Kelvin x 100)
+    # Row A
     #
-    t = (ra[24] / 100) - 273.15
-    print(f"  FPA Temp      = {t} C")
-    t = (ra[26] / 100) - 273.15
-    print(f"  Housing Temp  = {t} C")
+    print(f"  Frame Counter = {t['frame_counter']}")
+    print(f"  FPA Temp      = {t['fpa_temp']:.2f} C")
+    print(f"  Housing Temp  = {t['housing_temp']:.2f} C")
 
     #
-    # Row B - offset 80
-    #   Word 19 : Emissivity (scaled by 8192)
+    # Row B
     #
-    e = ra[99] / 8192
-    print(f"  Emissivity    = {e}")
+    print(f"  Emissivity    = {t['emissivity']:.3f}")
 
     #
-    # Row C - offset 160
-    #   Word  5 : Gain Mode (0 = High, 1 = Low, 2 = Auto)
-    #   Word  6 : Effective Gain Mode (0 = High, 1 = Low)
-    #   Word 48 : TLinear Enable State (0 = disabled, 1 = enabled)
-    #   Word 49 : T-Linear resolution (0 = 0.1, 1 = 0.01)
-    #   Word 50 : Spotmeter mean value (Kelvin scaled by T-Linear resolution)
-    #
-    print(f"  Gain Mode     = {ra[165]}")
-    print(f"  Eff Gain Mode = {ra[166]}")
-    print(f"  TLinear Mode  = {ra[208]}")
-    if ra[209] == 0:
-        res = 0.1
-    else:
-        res = 0.01
-    print(f"  TLinear Res   = {res}")
-    t = (ra[210] / (1 / res))  - 273.15
-    print(f"  Spotmeter     = {t} C")
-  
+    # Row C
+    #
+    print(f"  Gain Mode     = {t['gain_mode']}")
+    print(f"  Eff Gain Mode = {t['effective_gain_mode']}")
+    print(f"  TLinear Mode  = {int(t['tlinear_enabled'])}")
+    print(f"  TLinear Res   = {t['tlinear_resolution']:g}")
+    print(f"  Spotmeter     = {t['spotmeter_mean']:.2f} C")
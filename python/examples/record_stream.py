@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+'''
+record_stream is an example program that records the stream from a tCam-Mini to a recording file, then
+replays it with RecordingReader.
+'''
+
+import argparse
+import sys
+from tcam import TCam
+from recording import RecordingWriter, RecordingReader
+
+parser = argparse.ArgumentParser()
+
+parser.prog = "record_stream"
+parser.description = f"{parser.prog} - an example program to record a stream from tCam-mini and replay it\n"
+parser.usage = "record_stream.py --ip=<ip address of camera> [-n number of frames] [-o output file name]"
+parser.add_argument("-i", "--ip", help="IP address of the camera")
+parser.add_argument("-n", "--frames", type=int, default=100, help="Number of frames to record")
+parser.add_argument("-o", "--out", default="tcam_stream.rec", help="Path and name of the recording")
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    if not args.ip:
+        print("An IP address of the tCam is necessary.")
+        sys.exit(-1)
+
+    camera = TCam()
+    camera.connect(args.ip)
+    camera.start_stream(num_frames=args.frames)
+
+    with RecordingWriter(args.out) as rec:
+        for i in range(args.frames):
+            rec.write(camera.frameQueue.get(timeout=10))
+        print(f"{args.out} holds {len(rec)} frames")
+
+    camera.shutdown()
+
+    with RecordingReader(args.out) as rec:
+        print(f"recorded from {rec.times[0]:.3f} to {rec.times[-1]:.3f}")
+        hottest = rec.radiometric.max(axis=(1, 2))
+        print(f"hottest frame is frame {hottest.argmax()} with a raw value of {hottest.max()}")
@@ -0,0 +1 @@
+../recording.py
\ No newline at end of file
@@ -6,37 +6,17 @@ Streamtest is a simple utility to demonstrate streaming the frames from a tCam-M
 author: bitreaper
 '''
 
-import base64
 import argparse
-import numpy as np
 from tcam import TCam
+from palettes import apply
+from agc import agc
 from tkinter import *
-from array import array
 from PIL import Image, ImageTk
 from threading import Event
 
 def convert(img):
 
-    dimg = base64.b64decode(img["radiometric"])
-    ra = array('H', dimg)
-
-    imgmin = 65535
-    imgmax = 0
-    for i in ra:
-        if i < imgmin:
-            imgmin = i
-        if i > imgmax:
-            imgmax = i
-    delta = imgmax - imgmin
-    a = np.zeros((120,160,3), np.uint8)
-    for r in range(0, 120):
-        for c in range(0, 160):
-            val = int((ra[(r * 160) + c] - imgmin) * 255 / delta)
-            if val > 255:
-                a[r, c] = [255, 255, 255]
-            else:
-                a[r, c] = [val, val, val]
-    return a
+    return apply(agc(img.radiometric, "linear"), "gray")
 
 def update():
     if tcam.frameQueue.empty():
@@ -8,38 +8,17 @@ streamtest.py demo is to specify the hardware interface when the driver is insta
 original author: bitreaper (hacked to use the hw interface by Dan Julio)
 '''
 
-import base64
 import argparse
-import numpy as np
 from tcam import TCam
-from palettes import rainbow_palette
+from palettes import apply
+from agc import agc
 from tkinter import *
-from array import array
 from PIL import Image, ImageTk
 from threading import Event
 
 def convert(img):
 
-    dimg = base64.b64decode(img["radiometric"])
-    ra = array('H', dimg)
-
-    imgmin = 65535
-    imgmax = 0
-    for i in ra:
-        if i < imgmin:
-            imgmin = i
-        if i > imgmax:
-            imgmax = i
-    delta = imgmax - imgmin
-    a = np.zeros((120,160,3), np.uint8)
-    for r in range(0, 120):
-        for c in range(0, 160):
-            val = int((ra[(r * 160) + c] - imgmin) * 255 / delta)
-            if val > 255:
-                a[r, c] = rainbow_palette[255]
-            else:
-                a[r, c] = rainbow_palette[val]
-    return a
+    return apply(agc(img.radiometric, "linear"), "rainbow")
 
 def update():
     if tcam.frameQueue.empty():
@@ -0,0 +1 @@
+../tcam_sim.py
\ No newline at end of file
@@ -0,0 +1 @@
+../thermal_frame.py
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""
+  tCam Python Package - metrics
+
+  Counters and latency histograms for the stages a frame goes through, from the socket to whoever uses it.
+  TCam records into a Metrics object as it reads, parses and queues frames, applications like the bridge
+  add their own stages to the same object, and prometheus_text() formats any number of them for a
+  Prometheus scrape.
+
+  Latencies go into LatencyHistogram, which works like an HDR histogram: every power of two of
+  microseconds is split into 8 linear buckets, so a duration is counted to within 12.5% in a fixed set of
+  counters, whatever its size, with no allocation per value.  The histogram keeps the last minute in a
+  ring of slots, so percentiles follow what is happening now, and the count and sum of every value ever
+  recorded for rates.
+"""
+import time
+from threading import Lock
+
+
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+BUCKETS = SUB_BUCKETS * 40  # up to 2**40 microseconds, about 12 days
+
+
+def bucket_index(us):
+    """
+    bucket_index()
+
+    The bucket a duration in whole microseconds is counted in.
+    """
+    if us < 2 * SUB_BUCKETS:
+        return us
+    shift = us.bit_length() - 1 - SUB_BITS
+    return min(shift * SUB_BUCKETS + (us >> shift), BUCKETS - 1)
+
+
+def bucket_range(index):
+    """
+    bucket_range()
+
+    The (lowest, highest + 1) microseconds counted in a bucket.
+    """
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    low = (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+class LatencyHistogram:
+    """
+    LatencyHistogram - Rolling histogram of durations.
+
+        h = LatencyHistogram()
+        h.record(0.0042)
+        h.quantile(0.99)
+    """
+
+    def __init__(self, window=60, slots=6):
+        self.slotSeconds = window / slots
+        self.counts = [[0] * BUCKETS for _ in range(slots)]
+        self.maxima = [0.0] * slots
+        self.epochs = [-1] * slots
+        self.lock = Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        """
+        record()
+
+        Count one duration, in seconds.
+        """
+        if seconds < 0:
+            seconds = 0.0
+        index = bucket_index(int(seconds * 1e6))
+        epoch = int(time.monotonic() / self.slotSeconds)
+        slot = epoch % len(self.counts)
+        with self.lock:
+            if self.epochs[slot] != epoch:
+                # the slot held an older part of the window, start it over
+                self.counts[slot] = [0] * BUCKETS
+                self.maxima[slot] = 0.0
+                self.epochs[slot] = epoch
+            self.counts[slot][index] += 1
+            if seconds > self.maxima[slot]:
+                self.maxima[slot] = seconds
+            self.count += 1
+            self.sum += seconds
+
+    def window(self):
+        """
+        window()
+
+        The bucket counts and the maximum of the durations recorded within the window.
+        """
+        epoch = int(time.monotonic() / self.slotSeconds)
+        counts = [0] * BUCKETS
+        maximum = 0.0
+        with self.lock:
+            for slot, slotEpoch in enumerate(self.epochs):
+                if epoch - slotEpoch < len(self.epochs):
+                    counts = [a + b for a, b in zip(counts, self.counts[slot])]
+                    maximum = max(maximum, self.maxima[slot])
+        return counts, maximum
+
+    def quantile(self, q, counts=None):
+        """
+        quantile()
+
+        The duration, in seconds, q of the durations recorded within the window are at or below.  None
+        without any.
+        """
+        if counts is None:
+            counts = self.window()[0]
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if n and seen >= rank:
+                low, high = bucket_range(index)
+                return (low + high) / 2e6
+        return None
+
+    def snapshot(self):
+        """
+        snapshot()
+
+        A dict of the count and sum of every duration ever recorded, and the number, median, 90th and 99th
+        percentile and maximum of the ones within the window.
+        """
+        counts, maximum = self.window()
+        recent = sum(counts)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "window_count": recent,
+            "p50": self.quantile(0.5, counts),
+            "p90": self.quantile(0.9, counts),
+            "p99": self.quantile(0.99, counts),
+            "max": maximum if recent else None,
+        }
+
+
+class Metrics:
+    """
+    Metrics - Named counters, gauges and stage latencies.
+
+        metrics = Metrics()
+        metrics.count("bytes_read", len(data))
+        metrics.observe("parse", parsed - read)
+        metrics.gauge("frames_queued", frameQueue.qsize)
+        metrics.snapshot()
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self.lock = Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.latencies = {}
+
+    def count(self, name, n=1):
+        """
+        count()
+
+        Add n to a counter.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, fn):
+        """
+        gauge()
+
+        Have the value of a gauge read from fn() whenever a snapshot is taken.
+        """
+        self.gauges[name] = fn
+
+    def latency(self, stage):
+        """
+        latency()
+
+        The LatencyHistogram of a stage.
+        """
+        histogram = self.latencies.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.latencies.setdefault(stage, LatencyHistogram(self.window))
+        return histogram
+
+    def observe(self, stage, seconds):
+        """
+        observe()
+
+        Record how long a frame spent in a stage.
+        """
+        self.latency(stage).record(seconds)
+
+    def snapshot(self):
+        """
+        snapshot()
+
+        A dict of the counters, the gauges and the latency snapshot of every stage.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            latencies = dict(self.latencies)
+        return {
+            "counters": counters,
+            "gauges": {name: fn() for name, fn in list(self.gauges.items())},
+            "latency": {stage: h.snapshot() for stage, h in latencies.items()},
+        }
+
+
+# help text for the metrics TCam and the bridge record
+DESCRIPTIONS = {
+    "bytes_read": "Bytes read from the camera",
+    "frames_in": "Image packets parsed into frames",
+    "frames_out": "Frames taken off the frame queue",
+    "frames_dropped": "Frames thrown away by the frame queue policy",
+    "parse_errors": "Packets that could not be parsed",
+    "responses": "Responses other than frames",
+    "connects": "Successful connections to the camera",
+    "reconnects": "Successful connections after the first",
+    "frames_skipped": "Frames skipped to stay under the frame rate limit",
+    "frames_published": "Frames published to clients",
+    "frames_delivered": "Frames handed to client connections",
+    "frames_queued": "Frames waiting on the frame queue",
+    "prerenders_skipped": "Renders ahead of clients skipped because the render workers were behind",
+    "clients_waiting": "Clients waiting for the next frame",
+    "views": "Palette and AGC mode combinations being watched",
+    "renders": "Frames rendered",
+    "render_errors": "Renders that failed",
+    "render_cache_hits": "Renders served from the render cache",
+    "render_busy_seconds": "Time the render workers spent rendering",
+    "render_workers": "Render worker threads",
+    "render_queued": "Renders waiting for a worker",
+    "render_active": "Renders in progress",
+    "stage_latency_seconds": "Time a frame spent in a pipeline stage",
+}
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def prometheus_text(sources, prefix="tcam"):
+    """
+    prometheus_text()
+
+    Format metrics in the Prometheus text exposition format.  sources is a list of (labels, snapshot)
+    pairs, where a snapshot is what Metrics.snapshot() returns and labels a dict of the labels telling the
+    sources apart, for example {"camera": "lab"}.  Counters become <prefix>_<name>_total, gauges
+    <prefix>_<name> and stage latencies the summary <prefix>_stage_latency_seconds with a stage label.
+    """
+    families = {}
+
+    def add(name, kind, line):
+        families.setdefault(name, (kind, []))[1].append(line)
+
+    for labels, snapshot in sources:
+        for name, value in snapshot.get("counters", {}).items():
+            add(f"{prefix}_{name}_total", "counter", (name, labels, value, ""))
+        for name, value in snapshot.get("gauges", {}).items():
+            add(f"{prefix}_{name}", "gauge", (name, labels, value, ""))
+        for stage, h in snapshot.get("latency", {}).items():
+            stage_labels = {**labels, "stage": stage}
+            family = f"{prefix}_stage_latency_seconds"
+            for q in QUANTILES:
+                value = h.get(f"p{int(q * 100)}")
+                add(family, "summary", ("stage_latency_seconds", {**stage_labels, "quantile": q},
+                                        float("nan") if value is None else value, ""))
+            add(family, "summary", ("stage_latency_seconds", stage_labels, h["sum"], "_sum"))
+            add(family, "summary", ("stage_latency_seconds", stage_labels, h["count"], "_count"))
+
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# HELP {family} {DESCRIPTIONS.get(samples[0][0], samples[0][0].replace('_', ' '))}")
+        lines.append(f"# TYPE {family} {kind}")
+        for _, labels, value, suffix in samples:
+            lines.append(f"{family}{suffix}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,8 @@
+from .arctic import arctic_palette
 from .black_hot import black_hot_palette
 from .blue_red import blue_red_palette
 from .coldest import coldest_palette
+from .contrast import contrast_palette
 from .double_rainbow import double_rainbow_palette
 from .fusion import fusion_palette
 from .glowbow import glowbow_palette
@@ -14,9 +16,11 @@ from .rainbow import rainbow_palette
 from .wheel2 import wheel2_palette
 
 palettes = {
+    "arctic": arctic_palette,
     "black_hot": black_hot_palette,
     "blue_red": blue_red_palette,
     "coldest": coldest_palette,
+    "contrast": contrast_palette,
     "double_rainbow": double_rainbow_palette,
     "fusion": fusion_palette,
     "glowbow": glowbow_palette,
@@ -29,3 +33,6 @@ palettes = {
     "rainbow": rainbow_palette,
     "wheel2": wheel2_palette,
 }
+
+# the lookup tables are built from the palettes above
+from .lut import PaletteLUT, get_lut, apply
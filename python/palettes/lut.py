@@ -0,0 +1,75 @@
+"""
+  Palette lookup tables
+
+  The palettes are lists of 256 [r, g, b] lists, one for each 8-bit gray level.  Looking pixels up in them
+  one at a time, or turning a palette into an array for every frame, costs far more than the lookup itself.
+  Here each palette is compiled once, the first time it is used, into contiguous read-only numpy tables
+  that whole images are mapped through with a single vectorized take().
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from . import palettes
+
+# output formats of apply()
+FORMATS = ("rgb", "rgba", "packed")
+
+
+class PaletteLUT:
+    """
+    PaletteLUT - The lookup tables compiled from one palette.
+
+        rgb     (256, 3) uint8 r, g, b
+        rgba    (256, 4) uint8 r, g, b, 255
+        packed  (256,) uint32 0xRRGGBB
+    """
+
+    __slots__ = ("name", "rgb", "rgba", "packed")
+
+    def __init__(self, name, palette):
+        self.name = name
+        self.rgb = np.ascontiguousarray(palette, dtype=np.uint8)
+        if self.rgb.shape != (256, 3):
+            raise ValueError(f"palette {name} isn't 256 [r, g, b] entries")
+        self.rgba = np.empty((256, 4), dtype=np.uint8)
+        self.rgba[:, :3] = self.rgb
+        self.rgba[:, 3] = 255
+        rgb = self.rgb.astype(np.uint32)
+        self.packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        for table in (self.rgb, self.rgba, self.packed):
+            table.flags.writeable = False
+
+    def __repr__(self):
+        return f"PaletteLUT({self.name!r})"
+
+    def table(self, fmt="rgb"):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown palette format {fmt}, use one of {', '.join(FORMATS)}")
+        return getattr(self, fmt)
+
+
+@lru_cache(maxsize=None)
+def get_lut(name):
+    """
+    get_lut()
+
+    The PaletteLUT of the palette called name, compiled the first time it is asked for.  Raises KeyError for
+    an unknown palette.
+    """
+    return PaletteLUT(name, palettes[name])
+
+
+def apply(gray, name, fmt="rgb", out=None):
+    """
+    apply()
+
+    Map an array of 8-bit gray levels through a palette.  The result has the shape of gray plus a last axis
+    of 3 (rgb) or 4 (rgba) uint8 channels, or the same shape as gray for packed uint32 values.  Pass out to
+    reuse an array from a previous call instead of allocating a new one.
+    """
+    gray = np.asarray(gray)
+    if gray.dtype != np.uint8:
+        raise ValueError("palettes are applied to uint8 gray levels")
+    # uint8 indices can't be out of range, and "clip" lets take() write straight into out
+    return np.take(get_lut(name).table(fmt), gray, axis=0, out=out, mode="clip")
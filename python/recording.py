@@ -0,0 +1,263 @@
+"""
+  tCam Python Package - stream recording
+
+  Recordings store decoded frames in a binary file of fixed size records, so any frame can be found by
+  seeking, and a recording of any length can be replayed through a memory map without parsing a thing.
+
+  The file is a 64 byte header followed by one record per frame:
+
+      header  8s magic "TCAMREC1", then little-endian uint16 version, rows, columns, telemetry words and
+              uint32 record size, zero padded to 64 bytes
+      record  float64 time the frame was recorded (seconds since the epoch), rows x columns uint16
+              radiometric values and the uint16 telemetry words, all little-endian
+
+  Records are only ever appended, so the frame number of a record is its position in the file and the
+  record times always increase, which is what makes the file its own index.  A record cut short by a crash
+  is ignored by RecordingReader and overwritten by the next RecordingWriter.
+"""
+import os
+import mmap
+import time
+import struct
+
+import numpy as np
+
+from thermal_frame import FRAME_ROWS, FRAME_COLS, TELEMETRY_WORDS
+
+MAGIC = b"TCAMREC1"
+VERSION = 1
+HEADER = struct.Struct("<8sHHHHI")
+HEADER_SIZE = 64
+
+RECORD_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("radiometric", "<u2", (FRAME_ROWS, FRAME_COLS)),
+    ("telemetry", "<u2", (TELEMETRY_WORDS,)),
+])
+
+
+def pack_header():
+    return HEADER.pack(MAGIC, VERSION, FRAME_ROWS, FRAME_COLS, TELEMETRY_WORDS,
+                       RECORD_DTYPE.itemsize).ljust(HEADER_SIZE, b"\0")
+
+
+def check_header(data, path):
+    if len(data) < HEADER_SIZE or data[:HEADER_SIZE] != pack_header():
+        raise ValueError(f"{path} is not a recording of {FRAME_COLS}x{FRAME_ROWS} frames")
+
+
+class RecordingWriter:
+    """
+    RecordingWriter - Appends frames to a recording.
+
+        with RecordingWriter("stream.rec") as rec:
+            for frame in pool_or_cam_frames:
+                rec.write(frame)
+
+    An existing recording is appended to.  Writes go through a regular buffered file, call flush() to make
+    sure everything written so far is in the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a+b")
+        self.file.seek(0)
+        header = self.file.read(HEADER_SIZE)
+        if header:
+            check_header(header, path)
+        else:
+            self.file.write(pack_header())
+            self.file.flush()
+        # drop a record left incomplete by a crash so the records stay aligned
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if HEADER_SIZE + self.count * RECORD_DTYPE.itemsize != size:
+            self.file.truncate(HEADER_SIZE + self.count * RECORD_DTYPE.itemsize)
+        self.timePacker = struct.Struct("<d")
+        # readers search the record times, so they must never go backwards
+        self.lastTime = None
+        if self.count:
+            self.file.seek(HEADER_SIZE + (self.count - 1) * RECORD_DTYPE.itemsize)
+            self.lastTime = self.timePacker.unpack(self.file.read(self.timePacker.size))[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def write(self, frame, timestamp=None):
+        """
+        write()
+
+        Append a frame, either a ThermalFrame or anything with radiometric and telemetry arrays, recorded at
+        timestamp (now by default).  Returns the frame number of the record.  Raises ValueError for a
+        timestamp before the one of the last frame; if the clock is set back while recording with the default
+        timestamp, the frames keep the last frame's time until it catches up.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+            if self.lastTime is not None and timestamp < self.lastTime:
+                timestamp = self.lastTime
+        elif self.lastTime is not None and timestamp < self.lastTime:
+            raise ValueError(f"timestamp {timestamp} is before the last frame's {self.lastTime}")
+        radiometric = np.ascontiguousarray(frame.radiometric, dtype="<u2")
+        telemetry = np.ascontiguousarray(frame.telemetry, dtype="<u2")
+        if radiometric.size != FRAME_ROWS * FRAME_COLS or telemetry.size != TELEMETRY_WORDS:
+            raise ValueError(f"frame isn't {FRAME_COLS}x{FRAME_ROWS} with {TELEMETRY_WORDS} telemetry words")
+        # the arrays are written straight from their buffers, no record is assembled in between
+        self.file.write(self.timePacker.pack(timestamp))
+        self.file.write(radiometric)
+        self.file.write(telemetry)
+        self.lastTime = timestamp
+        self.count += 1
+        return self.count - 1
+
+    def flush(self):
+        """
+        flush()
+        """
+        self.file.flush()
+
+    def close(self):
+        """
+        close()
+        """
+        self.file.close()
+
+
+class RecordingReader:
+    """
+    RecordingReader - Replays a recording through a memory map.
+
+    Everything handed out is a read-only numpy view of the mapped file, so only the pages that are looked
+    at are read and nothing is copied.  Frames are found by frame number or by time:
+
+        rec = RecordingReader("stream.rec")
+        first = rec.radiometric[0]
+        t, radiometric, telemetry = rec.frame_at(rec.times[0] + 60)
+        peaks = rec.radiometric[1000:2000].max(axis=(1, 2))
+
+    The recording can keep growing while it is read, refresh() maps the frames written since it was opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = None
+        self.records = None
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, n):
+        return self.frame(n)
+
+    def __iter__(self):
+        for n in range(len(self.records)):
+            yield self.frame(n)
+
+    def refresh(self):
+        """
+        refresh()
+
+        Map the file again to pick up frames appended since the last time.  Returns the number of frames.
+        """
+        size = os.fstat(self.file.fileno()).st_size
+        self.file.seek(0)
+        check_header(self.file.read(HEADER_SIZE), self.path)
+        count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count == 0:
+            # an empty file can't be mapped
+            self.map = None
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        else:
+            self.map = mmap.mmap(self.file.fileno(), HEADER_SIZE + count * RECORD_DTYPE.itemsize,
+                                 access=mmap.ACCESS_READ)
+            self.records = np.ndarray((count,), dtype=RECORD_DTYPE, buffer=self.map, offset=HEADER_SIZE)
+        return count
+
+    @property
+    def times(self):
+        """
+        Recording time of every frame, seconds since the epoch.
+        """
+        return self.records["time"]
+
+    @property
+    def radiometric(self):
+        """
+        Radiometric data of every frame as a (frames, 120, 160) array of uint16 values.
+        """
+        return self.records["radiometric"]
+
+    @property
+    def telemetry(self):
+        """
+        Telemetry words of every frame as a (frames, 240) array of uint16 values.
+        """
+        return self.records["telemetry"]
+
+    def frame(self, n):
+        """
+        frame()
+
+        The (time, radiometric, telemetry) of frame number n.
+        """
+        record = self.records[n]
+        return float(record["time"]), record["radiometric"], record["telemetry"]
+
+    def index_at(self, timestamp):
+        """
+        index_at()
+
+        Frame number of the last frame recorded at or before timestamp, or -1 if there isn't one.
+        """
+        return int(np.searchsorted(self.times, timestamp, side="right")) - 1
+
+    def frame_at(self, timestamp):
+        """
+        frame_at()
+
+        The (time, radiometric, telemetry) of the frame being shown at timestamp.  Raises IndexError for a
+        time before the recording started.
+        """
+        n = self.index_at(timestamp)
+        if n < 0:
+            raise IndexError(f"no frame recorded at or before {timestamp}")
+        return self.frame(n)
+
+    def between(self, start, end):
+        """
+        between()
+
+        Slice of frame numbers recorded from start up to, but not including, end.  Use it to index the
+        arrays, for example rec.radiometric[rec.between(t0, t1)].
+        """
+        times = self.times
+        return slice(int(np.searchsorted(times, start)), int(np.searchsorted(times, end)))
+
+    def close(self):
+        """
+        close()
+
+        Views handed out keep the mapping alive until they are gone, the file is unmapped after that.
+        """
+        self.records = None
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass
+            self.map = None
+        self.file.close()
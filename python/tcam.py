@@ -22,12 +22,15 @@ import os
 import sys
 import abc
 import json
+import time
 import array
 import base64
 import socket
-from queue import Queue
-from json import JSONDecodeError
-from threading import Thread, Event
+import selectors
+from queue import Queue, Empty
+from collections import deque
+from threading import Thread, Event, Lock
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 # Guard Unix-only fcntl import for Windows; hardware path isn't used on Windows
 try:
@@ -35,104 +38,534 @@ try:
 except Exception:
     ioctl = None  # Only required for hardware SPI/UART path
 from ioctl_numbers import *
+from thermal_frame import ThermalFrame, parse_image_packet
+from metrics import Metrics
+
+# numpy speeds up the hardware interface's frame checksum, but isn't required
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Packet delimiters used by the tCam JSON protocol
+STX = 0x02
+ETX = 0x03
+
+
+class TCamPacketFramer:
+    """
+    TCamPacketFramer - Splits the STX/ETX delimited byte stream coming from the camera into packets.
+
+    Reads are appended to one reusable bytearray.  Each call to packets() only scans forward from where the
+    previous scan stopped, hands out packets as memoryview slices of the buffer, and compacts the consumed
+    bytes away once at the end, so the cost per packet stays the same no matter how many packets were
+    coalesced into a read or how many reads a single packet was spread across.
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.scanPos = 0
+
+    def feed(self, data):
+        """
+        feed()
+
+        Append the bytes from a read of the interface to the buffer.
+        """
+        self.buf += data
+
+    def packets(self):
+        """
+        packets()
+
+        Generator yielding a memoryview of the payload (STX and ETX removed) of every complete packet in the
+        buffer.  A view is released as soon as the next one is asked for, so anything that needs to outlive
+        the loop has to be copied out of it.
+        """
+        buf = self.buf
+        start = 0
+        # the end of the data known to hold no ETX, only the whole buffer once the loop has run out
+        scanned = 0
+        try:
+            idx = buf.find(ETX, self.scanPos)
+            while idx != -1:
+                # the packet starts after the last STX before its ETX, which skips anything in front of it,
+                # like the tail of a corrupted packet or a truncated one that never got its ETX
+                begin = buf.rfind(STX, start, idx) + 1 or start
+                with memoryview(buf) as mv:
+                    pkt = mv[begin:idx]
+                # the packet counts as consumed once it is handed out, even if the consumer stops here
+                start = idx + 1
+                try:
+                    yield pkt
+                finally:
+                    pkt.release()
+                idx = buf.find(ETX, start)
+            scanned = len(buf)
+        finally:
+            # the front of a bytearray can be deleted without moving the rest of the data
+            del buf[:start]
+            # a consumer that stopped early leaves packets behind, the next scan has to find them again
+            self.scanPos = max(scanned - start, 0)
+
+    def pending(self):
+        """
+        pending()
+
+        Number of bytes of a partial packet waiting for the rest of its data.
+        """
+        return len(self.buf)
+
+
+def decode_packet(pkt):
+    """
+    decode_packet()
+
+    Deserialize the payload of a packet from TCamPacketFramer into a python object.  Image responses come back
+    as a ThermalFrame, parsed by parse_image_packet() when they can be.  Raises ValueError if the payload isn't
+    valid JSON.
+    """
+    data = bytes(pkt)
+    frame = parse_image_packet(data)
+    if frame is not None:
+        return frame
+    obj = json.loads(data)
+    if isinstance(obj, dict) and "radiometric" in obj:
+        return ThermalFrame(obj)
+    return obj
+
+
+def malformed_packet(pkt):
+    """
+    malformed_packet()
+
+    The response reported in place of a packet decode_packet() couldn't deserialize.
+    """
+    return {
+        "error": "malformed json payload, json parser threw exception processing it",
+        "payload": bytes(pkt).decode(errors="replace"),
+    }
+
+
+# The response each command is answered with, keyed on the name of the response's top level object.  Connection
+# status comes from the manager thread, not the camera.  Commands mapped to None don't get a response.
+RESPONSE_KEYS = {
+    "connect": "connection",
+    "disconnect": "connection",
+    "stream_on": "cam_info",
+    "stream_off": "cam_info",
+    "run_ffc": "cam_info",
+    "get_status": "status",
+    "set_time": "cam_info",
+    "get_config": "config",
+    "set_config": "cam_info",
+    "get_lep_cci": "cci_reg",
+    "set_lep_cci": "cci_reg",
+    "set_spotmeter": "cam_info",
+    "get_wifi": "wifi",
+    "set_wifi": None,
+}
+
+
+def response_key(msg):
+    """
+    response_key()
+
+    The key a response is matched to a request with, or None if it doesn't answer any command.
+    """
+    if not isinstance(msg, dict) or not msg:
+        return None
+    status = msg.get("status")
+    if status is not None and not isinstance(status, dict):
+        # status strings are reported by the manager thread itself
+        return "connection" if status in ("connected", "disconnected") else None
+    return next(iter(msg))
+
+
+class TCamResponseRouter:
+    """
+    TCamResponseRouter - Matches responses from the camera with the requests waiting for them.
+
+    Each request registers a Future under the key of the response it expects before the command is sent.  The
+    camera answers commands in order, so requests waiting on the same key are answered first come, first
+    served, and requests waiting on different keys can be in flight at the same time.  A request that was
+    cancelled, or has waited longer than its timeout, is passed over, so a response that never came or
+    couldn't be parsed only costs the request it belonged to instead of shifting every later response on the
+    key.  An expired request's Future gets a TimeoutError.  A disconnect answers every pending request with the
+    disconnected status.
+    """
+
+    def __init__(self, timeout=10):
+        self.lock = Lock()
+        self.pending = {}
+        self.timeout = timeout
+
+    def expect(self, key, timeout=None):
+        """
+        expect()
+
+        Register a request for the next response with the given key, given up on after timeout seconds (the
+        router's timeout by default).  Returns the Future that will hold it.
+        """
+        future = Future()
+        deadline = time.monotonic() + (timeout or self.timeout)
+        with self.lock:
+            expired = self.expire(key)
+            self.pending.setdefault(key, deque()).append((deadline, future))
+        self.fail(expired)
+        return future
+
+    def expire(self, key):
+        """
+        expire()
+
+        Drop the cancelled and expired requests from the front of a key's line, returns the expired ones.
+        Called with the lock held.
+        """
+        futures = self.pending.get(key)
+        expired = []
+        now = time.monotonic()
+        while futures and (futures[0][1].cancelled() or futures[0][0] <= now):
+            _, future = futures.popleft()
+            if not future.cancelled():
+                expired.append(future)
+        if futures is not None and not futures:
+            del self.pending[key]
+        return expired
+
+    @staticmethod
+    def fail(expired):
+        for future in expired:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(FutureTimeoutError())
+
+    def resolve(self, msg):
+        """
+        resolve()
+
+        Hand a response to the oldest live request waiting for it.  Returns False if nobody was waiting for it.
+        """
+        key = response_key(msg)
+        with self.lock:
+            if key == "connection" and msg["status"] == "disconnected":
+                expired = []
+                waiters = [f for futures in self.pending.values() for _, f in futures]
+                self.pending.clear()
+            else:
+                expired = self.expire(key)
+                futures = self.pending.get(key)
+                if not futures:
+                    waiters = []
+                else:
+                    waiters = [futures.popleft()[1]]
+                    if not futures:
+                        del self.pending[key]
+        self.fail(expired)
+
+        answered = False
+        for future in waiters:
+            if future.set_running_or_notify_cancel():
+                future.set_result(msg)
+                answered = True
+        return answered
+
+
+def frame_checksum(data):
+    """
+    frame_checksum()
+
+    Sum of the byte values in data, a bytes-like object.  Vectorized with numpy when it is available.
+    """
+    if np is not None:
+        return int(np.frombuffer(data, dtype=np.uint8).sum(dtype=np.uint64))
+    return sum(data)
+
+
+def make_wakeup_pair():
+    """
+    make_wakeup_pair()
+
+    A connected pair of non-blocking sockets.  Writing a byte to the second one makes the first one readable,
+    which is how other threads wake up a thread waiting in a selector.
+    """
+    reader, writer = socket.socketpair()
+    reader.setblocking(False)
+    writer.setblocking(False)
+    return reader, writer
+
+
+def drain_wakeup(reader):
+    """
+    drain_wakeup()
+
+    Read away every pending wakeup so the selector goes back to sleep.
+    """
+    try:
+        while reader.recv(4096):
+            pass
+    except BlockingIOError:
+        pass
 
 
 class TCamManagerThreadBase(Thread, metaclass=abc.ABCMeta):
     """
     TCamManagerThreadBase - The background thread that manages the socket communication and the three queues.
 
-    Commands come in on the cmdQueue, responses to commands go to the responseQueue, and any frames that
-    come from get_image or set_stream_on commands go into frameQueue.
+    Commands come in on the cmdQueue, responses to commands go to the request waiting for them in the router
+    (or to the responseQueue if nobody is), and any frames that come from get_image or set_stream_on commands
+    go into frameQueue.
+
+    The thread sleeps in a selector until either the interface has data to read or wakeup() is called, which
+    is how TCam tells it a command was put on the cmdQueue.  Nothing is polled, so an idle connection doesn't
+    cost any CPU and a command is sent as soon as it is queued, even in the middle of a stream.
 
     For any time.sleep() calls, we should use the Event object's wait() method, because if we have to we can
     wake up the code that is sleeping by setting the event with self.event.set().
     """
 
-    def __init__(self, cmdQueue, responseQueue, frameQueue, timeout):
+    def __init__(self, cmdQueue, responseQueue, frameQueue, timeout, router=None, pool=None, cameraId=None,
+                 metrics=None):
         self.cmdQueue = cmdQueue
         self.responseQueue = responseQueue
+        self.router = router
         self.frameQueue = frameQueue
         self.internalQueue = Queue()
+        self.framer = TCamPacketFramer()
         self.timeout = timeout
         self.connected = False
         self.running = False
         self.event = Event()
+        self.interface = None
+        self.pool = pool
+        self.cameraId = cameraId
+        self.metrics = metrics if metrics is not None else Metrics()
+        # when the first byte of the packet the framer is collecting was read
+        self.packetStart = None
+        if pool is None:
+            self.selector = selectors.DefaultSelector()
+            self.wakeupReader, self.wakeupWriter = make_wakeup_pair()
+            self.selector.register(self.wakeupReader, selectors.EVENT_READ, self.process_wakeup)
+        else:
+            # the pool's thread does the waiting, this object only handles its own camera
+            self.selector = pool.selector
+            self.stopped = Event()
         super().__init__()
 
     def start(self):
         self.running = True
-        super().start()
+        if self.pool is None:
+            super().start()
 
     def stop(self):
         self.running = False
         self.event.set()
+        self.wakeup()
+
+    def join(self, timeout=None):
+        if self.pool is None:
+            super().join(timeout)
+        else:
+            self.stopped.wait(timeout)
+
+    def wakeup(self):
+        """
+        wakeup()
+
+        Interrupt the selector so the thread handles whatever is waiting on the cmdQueue.  Safe to call from
+        any thread.
+        """
+        if self.pool is not None:
+            self.pool.wakeup(self)
+            return
+        try:
+            self.wakeupWriter.send(b"\x00")
+        except OSError:
+            # a full socketpair already has a wakeup pending, a closed one means the thread is gone
+            pass
+
+    def put_response(self, msg):
+        """
+        put_response()
+
+        Hand a response to the request waiting for it, anything unsolicited goes on the responseQueue.
+        """
+        self.metrics.count("responses")
+        if self.router is None or not self.router.resolve(msg):
+            self.responseQueue.put(msg)
+
+    def put_frame(self, frame):
+        """
+        put_frame()
+
+        Put a frame on the frameQueue.  A pooled camera also lets the pool know it has a frame waiting.
+        """
+        if isinstance(frame, ThermalFrame):
+            frame.timestamps["queued"] = time.monotonic()
+        self.frameQueue.put(frame)
+        if self.pool is not None:
+            self.pool.frame_ready(self.cameraId)
+
+    def register_interface(self, fileobj):
+        """
+        register_interface()
+
+        Called by open_interface() to have the selector watch the interface for data to read.
+        """
+        self.selector.register(fileobj, selectors.EVENT_READ, self.process_events)
+        self.interface = fileobj
+        if self.metrics.counters.get("connects"):
+            self.metrics.count("reconnects")
+        self.metrics.count("connects")
+
+    def unregister_interface(self):
+        """
+        unregister_interface()
+
+        Called by close_interface() before the interface is closed.
+        """
+        if self.interface is not None:
+            self.selector.unregister(self.interface)
+            self.interface = None
 
     def run(self):
         """
         run( )
-        Check cmdQueue for any new commands to send down, read the interface for any response coming back, split
-        data into responses and deserialize them into python objects from JSON.
+        Wait for the interface or the cmdQueue to need attention and dispatch to the handler registered with
+        the selector for it.
         """
-        self.interface = None
-        scratch = b""
-
-        while self.running:
-            # The send part of the cycle
-            if not self.cmdQueue.empty():
-                cmd = self.cmdQueue.get()
-                cmdType = cmd.get("cmd", None)
-                if cmdType == "connect":
-                    self.open_interface(cmd)
-                elif cmdType == "disconnect":
-                    self.close_interface()
-                    continue
-                else:
-                    # format the string with the start and stop chars, and encode as a byte string before sending
-                    buf = f"\x02{json.dumps(cmd)}\x03".encode()
-                    self.write(buf)
+        try:
+            while self.running:
+                for key, mask in self.selector.select():
+                    key.data(mask)
+        finally:
+            self.selector.close()
+            self.wakeupReader.close()
+            self.wakeupWriter.close()
+
+    def process_wakeup(self, mask=selectors.EVENT_READ):
+        """
+        process_wakeup()
 
-            # The recv part of the cycle
-            if self.connected:
-                scratch += self.read()
-                scratch = self.find_responses(scratch)
+        Called when wakeup() was used, drains the wakeup socket and looks at the cmdQueue.
+        """
+        drain_wakeup(self.wakeupReader)
+        self.process_commands()
+
+    def process_commands(self):
+        """
+        process_commands()
 
-                # process any items in the internal queue
-                while not self.internalQueue.empty():
-                    msg = self.internalQueue.get()
-                    self.post_process(msg)
+        The send part of the cycle.  Send down every command on the cmdQueue.
+        """
+        while self.running and not self.cmdQueue.empty():
+            cmd = self.cmdQueue.get()
+            cmdType = cmd.get("cmd", None)
+            if cmdType == "connect":
+                self.open_interface(cmd)
+            elif cmdType == "connected":
+                self.connected_interface(cmd)
+            elif cmdType == "disconnect":
+                self.close_interface()
             else:
-                # If we're not connected we won't have a socket to timeout on.  Let's use an event to wait on instead.
-                # Why event.wait instead of time.sleep?  Because event.wait can be interrupted unlike time.sleep.
-                self.event.wait(self.timeout)
-                self.event.clear()
+                # format the string with the start and stop chars, and encode as a byte string before sending
+                buf = f"\x02{json.dumps(cmd)}\x03".encode()
+                try:
+                    self.write(buf)
+                except OSError:
+                    # only this interface is lost, not the thread, which a pool shares with other cameras
+                    self.close_interface()
+
+    def process_events(self, mask):
+        """
+        process_events()
+
+        Called by the selector when the interface is ready.  Sends what write() left over once it can be
+        written to and reads what came in.  An interface that fails is closed, which sends the usual
+        disconnect response, instead of the error ending the thread, which a pool shares with other cameras.
+        """
+        try:
+            if mask & selectors.EVENT_WRITE:
+                self.flush()
+            if mask & selectors.EVENT_READ and self.interface is not None:
+                self.process_interface()
+        except OSError:
+            self.close_interface()
+
+    def flush(self):
+        """
+        flush()
 
-    def find_responses(self, buf):
+        Send what write() could not send right away.  Only interfaces that are written to without blocking
+        leave anything over.
+        """
+        pass
+
+    def process_interface(self):
+        """
+        process_interface()
+
+        The recv part of the cycle.  Read what the interface has for us, split it into responses and
+        deserialize them into python objects from JSON.
+        """
+        pending = self.framer.pending()
+        data = self.read()
+        now = time.monotonic()
+        if data:
+            self.metrics.count("bytes_read", len(data))
+        if not pending:
+            # nothing was left over from the last read, the next packet starts in this one
+            self.packetStart = now
+        self.find_responses(data, now)
+
+        # process any items in the internal queue
+        while not self.internalQueue.empty():
+            msg = self.internalQueue.get()
+            self.post_process(msg)
+
+    def find_responses(self, data, readTime=None):
         """
         find_responses()
 
         This is how the manager thread stitches together packets across reads of the interface.  If you are streaming
-        and you have a high enough frame rate, you may end up with more than one response in your buffer.  You may
-        also have one stretched across reads.  This function attempts to extract complete ones and returns the
-        remainder to be added to by the next read.
-        """
-        pkts = []
-        idx = buf.find(3)
-        while idx != -1:
-            pkts.append(buf[: idx + 1])
-            buf = buf[idx + 1 :]
-            idx = buf.find(3)
-
-        for response in pkts:
+        and you have a high enough frame rate, you may end up with more than one response in a read.  You may
+        also have one stretched across reads.  The new data is added to the framer, every complete response is
+        deserialized, and the remainder is kept by the framer to be added to by the next read.
+
+        readTime is when data was read, every frame is stamped with it as the time it was received.
+        """
+        if readTime is None:
+            readTime = time.monotonic()
+        if data:
+            self.framer.feed(data)
+
+        for response in self.framer.packets():
             try:
-                respObj = json.loads(response.strip(b"\x02\x03").decode())
+                respObj = decode_packet(response)
+            except ValueError:
+                self.metrics.count("parse_errors")
+                self.put_response(malformed_packet(response))
+            else:
+                if isinstance(respObj, ThermalFrame):
+                    self.frame_parsed(respObj, readTime, self.packetStart)
                 self.internalQueue.put(respObj)
-            except JSONDecodeError:
-                respObj = {
-                    "error": "malformed json payload, json parser threw exception processing it",
-                    "payload": response.decode(),
-                }
-                self.responseQueue.put(respObj)
-        return buf
+            # whatever comes after this packet started in this read
+            self.packetStart = readTime
+
+    def frame_parsed(self, frame, received, started=None):
+        """
+        frame_parsed()
+
+        Stamp a frame read completely at time received and just deserialized, and record the time its
+        bytes took to come in (from started, the read its first byte came in) and to be parsed.
+        """
+        parsed = time.monotonic()
+        frame.timestamps["received"] = received
+        frame.timestamps["parsed"] = parsed
+        self.metrics.count("frames_in")
+        if started is not None:
+            self.metrics.observe("receive", received - started)
+        self.metrics.observe("parse", parsed - received)
 
     @abc.abstractmethod
     def open_interface(self, cmd):
@@ -189,54 +622,118 @@ class TCamManagerThread(TCamManagerThreadBase):
 
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tcamSocket = None
+        # bumped by every connect and disconnect, so the outcome of an abandoned connect is thrown away
+        self.connectAttempt = 0
+        # what write() could not send yet because the camera isn't reading
+        self.outgoing = bytearray()
+
     def open_interface(self, cmd):
+        # a connect blocks for up to the timeout, which would hold up every other camera sharing a pool's
+        # selector, so it runs on a thread of its own and hands the socket back through the cmdQueue
+        self.connectAttempt += 1
+        Thread(target=self.connect_socket, args=(cmd["ipaddress"], cmd["port"], self.connectAttempt),
+               name="tcam-connect", daemon=True).start()
+
+    def connect_socket(self, ipaddress, port, attempt):
+        """
+        connect_socket()
+
+        Runs on its own thread.  Connect to the camera and queue the outcome for the manager thread.
+        """
         tmpSock = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
         tmpSock.settimeout(self.timeout)
         try:
-            tmpSock.connect((cmd["ipaddress"], cmd["port"]))
-        except OSError as e:
-            self.responseQueue.put({"status": "disconnected", "message": f"{e}"})
-            self.tcamSocket = None
+            tmpSock.connect((ipaddress, port))
         except socket.timeout:
-            self.responseQueue.put({"status": "disconnected", "message": "timeout"})
-            self.tcamSocket = None
-        except ConnectionRefusedError as e:
-            self.responseQueue.put({"status": "disconnected", "message": f"{e}"})
-            self.tcamSocket = None
+            tmpSock.close()
+            result = {"status": "disconnected", "message": "timeout"}
+        except OSError as e:
+            tmpSock.close()
+            result = {"status": "disconnected", "message": f"{e}"}
         else:
-            self.responseQueue.put({"status": "connected"})
-        self.tcamSocket = tmpSock
+            result = tmpSock
+        self.cmdQueue.put({"cmd": "connected", "result": result, "attempt": attempt})
+        self.wakeup()
+
+    def connected_interface(self, cmd):
+        """
+        connected_interface()
+
+        Called on the manager thread with the outcome of connect_socket().  Starts using the socket unless a
+        disconnect or a newer connect came in while it was connecting.
+        """
+        result = cmd["result"]
+        if not isinstance(result, socket.socket):
+            if cmd["attempt"] == self.connectAttempt:
+                self.put_response(result)
+            return
+        if cmd["attempt"] != self.connectAttempt or not self.running:
+            result.close()
+            return
+        # a camera that stops reading must not hold up the thread, which a pool shares with other cameras,
+        # so the socket never blocks and what doesn't fit is sent when the selector says there is room
+        result.setblocking(False)
+        self.tcamSocket = result
+        self.register_interface(result)
         self.connected = True
-        return
+        self.put_response({"status": "connected"})
 
     def close_interface(self):
-        self.responseQueue.put({"status": "disconnected"})
-        if hasattr(self, 'tcamSocket'):
+        # a connect still in progress is abandoned
+        self.connectAttempt += 1
+        self.put_response({"status": "disconnected"})
+        self.unregister_interface()
+        if getattr(self, 'tcamSocket', None) is not None:
             # handle the case of a shutdown before it gets used, otherwise this becomes an execption in a background thread.
             self.tcamSocket.close()
         self.tcamSocket = None
+        self.outgoing.clear()
         self.connected = False
 
     def read(self):
         rbuf = b''
         try:
             rbuf = self.tcamSocket.recv(65536)
-        except socket.timeout as e:
+        except (socket.timeout, BlockingIOError):
             pass
+        except OSError:
+            self.close_interface()
+        else:
+            if not rbuf:
+                # the selector said the socket was readable, so an empty read means the camera hung up
+                self.close_interface()
         return rbuf
 
     def write(self, buf):
-        if not hasattr(self, 'tcamSocket'):
-            self.responseQueue.put({"status": "disconnected", "msg":"Please call connect() first, refusing to write to empty interface."})
+        if getattr(self, 'tcamSocket', None) is None:
+            self.put_response({"status": "disconnected", "msg":"Please call connect() first, refusing to write to empty interface."})
             self.frameQueue.put({"status": "disconnected", "msg":"Please call connect() first, refusing to write to empty interface."})
         else:
-            self.tcamSocket.send(buf)
+            self.outgoing += buf
+            self.flush()
+
+    def flush(self):
+        if self.tcamSocket is None:
+            return
+        if self.outgoing:
+            try:
+                sent = self.tcamSocket.send(self.outgoing)
+            except BlockingIOError:
+                sent = 0
+            del self.outgoing[:sent]
+        # only ask the selector about room to write while there is something left to send
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if self.outgoing else 0)
+        if self.selector.get_key(self.tcamSocket).events != events:
+            self.selector.modify(self.tcamSocket, events, self.process_events)
 
     def post_process(self, msg):
-        if "radiometric" in msg:
-            self.frameQueue.put(msg)
+        if isinstance(msg, ThermalFrame):
+            self.put_frame(msg)
         else:
-            self.responseQueue.put(msg)
+            self.put_response(msg)
 
 
 ################################################################################
@@ -246,11 +743,14 @@ class TCamHwManagerThread(TCamManagerThreadBase):
     """
     MODE = SPI_MODE_3  # this comes from ioctl_numbers.py
     BITS = 8
+    SPI_BUFSIZ = 65536  # the spidev.bufsiz the kernel is configured with
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         from serial import Serial
         self.SerialClass = Serial
+        # every frame is read into this same buffer
+        self.spiBuffer = bytearray(self.SPI_BUFSIZ)
 
     def open_interface(self, data):
         try: 
@@ -260,31 +760,34 @@ class TCamHwManagerThread(TCamManagerThreadBase):
             ioctl(self.spi, SPI_IOC_WR_BITS_PER_WORD, struct.pack("=B", self.BITS))
             ioctl(self.spi, SPI_IOC_WR_MAX_SPEED_HZ, struct.pack("=I", data['spiSpeed']))
         except Exception as e:
-            self.responseQueue.put({"status": "disconnected", "message": f"{e}"})
+            self.put_response({"status": "disconnected", "message": f"{e}"})
             self.connected = False
             return
+        self.register_interface(self.serial)
         self.connected = True
-        self.responseQueue.put({"status": "connected"})
+        self.put_response({"status": "connected"})
 
         
     def close_interface(self):
-        if hasattr(self, 'serial'):
+        self.unregister_interface()
+        if getattr(self, 'serial', None) is not None:
             # handle the case of a shutdown before it gets used, otherwise this becomes an execption in a background thread.
             self.serial.close()
             self.spi.close()
         self.serial = None
         self.spi = None
         self.connected = False
-        self.responseQueue.put({"status": "disconnected"})
+        self.put_response({"status": "disconnected"})
 
         
     def read(self):
-        return self.serial.read(256)
+        # only ask for what has already arrived so the read doesn't sit out the serial timeout
+        return self.serial.read(max(self.serial.in_waiting, 1))
     
 
     def write(self, buf):
-        if not hasattr(self, 'serial'):
-            self.responseQueue.put({"status": "disconnected", "msg":"Please call connect() first, refusing to write to empty interface."})
+        if getattr(self, 'serial', None) is None:
+            self.put_response({"status": "disconnected", "msg":"Please call connect() first, refusing to write to empty interface."})
             self.frameQueue.put({"status": "disconnected", "msg":"Please call connect() first, refusing to write to empty interface."})
         else:
             self.serial.write(buf)
@@ -293,186 +796,146 @@ class TCamHwManagerThread(TCamManagerThreadBase):
         
     def post_process(self, msg):
         if "image_ready" in msg:
-            self.frameQueue.put(self.get_spi_frame(msg['image_ready']))
+            self.put_frame(self.get_spi_frame(msg['image_ready']))
         else:
-            self.responseQueue.put(msg)
+            self.put_response(msg)
 
             
     def get_spi_frame(self, frameLength):
-        frame = self.spi.read(frameLength)
-        cs = int.from_bytes(frame[-4:], 'big')
-        sum = 0
-        for i in frame[:-4]:
-            sum += i
-        if sum != cs:
-            # if a bogus frame comes in, since this is a thread and not the main thread, we need
-            # to signal that it was bad, but we also want to put the bogus data on the frameQueue
-            # so that we can debug what happened.
-            self.responseQueue.put({"status": f"Bad frame! Sums don't match: Frame:{cs} Calc:{sum}"})
-            return frame
-        frameObj = json.loads(frame[1:-5].decode())
-        return frameObj
+        """
+        get_spi_frame()
 
+        Read a frame of frameLength bytes from SPI into the receive buffer, check its checksum and deserialize
+        it.  A frame is the json packet, STX and ETX included, followed by the 32-bit big-endian sum of all of
+        its bytes.
+        """
+        if frameLength > len(self.spiBuffer):
+            self.spiBuffer = bytearray(frameLength)
+        with memoryview(self.spiBuffer)[:frameLength] as frame:
+            started = time.monotonic()
+            length = self.spi.readinto(frame) or 0
+            received = time.monotonic()
+            self.metrics.count("bytes_read", length)
+            cs = int.from_bytes(frame[-4:], 'big')
+            sum = frame_checksum(frame[:-4])
+            if length != frameLength or sum != cs:
+                self.metrics.count("parse_errors")
+                # if a bogus frame comes in, since this is a thread and not the main thread, we need
+                # to signal that it was bad, but we also want to put the bogus data on the frameQueue
+                # so that we can debug what happened.
+                self.put_response({"status": f"Bad frame! Sums don't match: Frame:{cs} Calc:{sum}"})
+                return bytes(frame[:length])
+            msg = decode_packet(frame[1:-5])
+            if isinstance(msg, ThermalFrame):
+                self.frame_parsed(msg, received, started)
+            return msg
 
 
 ################################################################################
-class TCam:
-    """
-    TCam - Interface object for managing a tCam device.
+class TCamFrameQueue(Queue):
     """
+    TCamFrameQueue - The frameQueue, with a policy for what happens when frames come in faster than they are
+    taken out.
 
-    def __init__(self, timeout=1, responseTimeout=10, is_hw=False):
-        self.frameQueue = Queue()
-        self.cmdQueue = Queue()
-        self.responseQueue = Queue()
-        self.responseTimeout = responseTimeout
-        self.timeout = timeout
-        self.is_hw = is_hw
+        "unbounded"    Keep every frame, however many pile up.  The default.
+        "block"        Hold at most maxsize frames.  The manager thread waits for room, which also holds up
+                       reading responses, so only use this when every frame has to be seen.
+        "drop_oldest"  Hold at most maxsize frames, throwing the oldest one away to make room for a new one.
+        "latest"       Hold only the newest frame.
 
-        if is_hw:
-            self.hwChecks()
-            self.managerThread = TCamHwManagerThread(
-                responseQueue=self.responseQueue,
-                cmdQueue=self.cmdQueue,
-                frameQueue=self.frameQueue,
-                timeout=self.timeout,
-            )
-        else:
-            self.managerThread = TCamManagerThread(
-                responseQueue=self.responseQueue,
-                cmdQueue=self.cmdQueue,
-                frameQueue=self.frameQueue,
-                timeout=self.timeout,
-            )
-
-        self.managerThread.start()
-        
-
-    def hwChecks(self):
-        try:
-            from serial import Serial
-        except ImportError as e:
-            print("Attempting to use hardware interface without the pyserial module installed!")
-            sys.exit(-42)
-        if not os.path.exists('/dev/spidev0.0') or not os.path.exists('/dev/spidev0.1'):
-            print("Do you have SPI turned on?  Didn't find the SPI device files in /dev")
-            sys.exit(-43)
-        if not os.path.exists('/dev/serial0'):
-            print("Do you have the UART turned on?  Didn't find the serial device file in /dev")
-            sys.exit(-44)
-        with open('/proc/cmdline', 'r') as f:
-            cmdline = f.read()
-            if 'spidev.bufsiz=65536' not in cmdline:
-                print(f"You will need to add 'spidev.bufsiz=65536' to the kernel cmdline in /boot/cmdline.txt")
-                sys.exit(-45)
-                
-            
-    def connect(self, ipaddress="192.168.4.1", port=5001,
-                spiFile='/dev/spidev0.0',
-                serialFile='/dev/serial0',
-                baudrate=230400,
-                serialTimeout=.01,
-                spiSpeed=7000000
-                ):
-        """
-        connect()
-        """
-        if self.is_hw:
-            cmd = {"cmd": "connect",
-                   "spiFile": spiFile,
-                   "serialFile": serialFile,
-                   "baudrate": baudrate,
-                   "timeout": serialTimeout,
-                   "spiSpeed": spiSpeed,
-                   }
-        else:
-            cmd = {"cmd": "connect", "ipaddress": ipaddress, "port": port}
+    dropped counts the frames thrown away.  With metrics, a Metrics object, the frames taken out and thrown
+    away are counted there too, along with the time frames spent waiting in the queue.
+    """
+    POLICIES = ("unbounded", "block", "drop_oldest", "latest")
+
+    def __init__(self, policy="unbounded", maxsize=8, metrics=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown frame policy '{policy}', use one of {', '.join(self.POLICIES)}")
+        if policy == "unbounded":
+            maxsize = 0
+        elif policy == "latest":
+            maxsize = 1
+        elif maxsize < 1:
+            raise ValueError(f"The '{policy}' frame policy needs a maxsize of at least 1")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.metrics = metrics
+
+    def put(self, item, block=True, timeout=None):
+        if self.policy not in ("drop_oldest", "latest"):
+            return super().put(item, block, timeout)
+        with self.not_full:
+            while self._qsize() >= self.maxsize:
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+                if self.metrics is not None:
+                    self.metrics.count("frames_dropped")
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def get(self, block=True, timeout=None):
+        item = super().get(block, timeout)
+        if self.metrics is not None and isinstance(item, ThermalFrame):
+            now = time.monotonic()
+            item.timestamps["dequeued"] = now
+            self.metrics.count("frames_out")
+            queued = item.timestamps.get("queued")
+            if queued is not None:
+                self.metrics.observe("queue", now - queued)
+        return item
 
 
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=self.responseTimeout)
+################################################################################
+class TCamCommands(metaclass=abc.ABCMeta):
+    """
+    TCamCommands - The tCam command set, shared by TCam and AsyncTCam.
 
-    def disconnect(self):
-        """
-        disconnect()
-        """
-        cmd = {"cmd": "disconnect"}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=self.responseTimeout)
+    Each method builds the command and hands it to send_cmd(), returning whatever that returns.  For TCam
+    that is the response itself, for AsyncTCam it is a coroutine to await.
+    """
 
-    def shutdown(self):
-        """
-        shutdown()
+    @abc.abstractmethod
+    def send_cmd(self, cmd, timeout=None, expect="response"):
+        '''
+        send_cmd()
 
-        Use this to not only disconnect the socket, but also shut down the manager thread.  If you are using
-        this object in an ipython session, you may find that the session won't exit until you ctrl+c.  This is
-        because the manager thread is still alive in the background.  Calling stop and join on it will clean it up.
-        """
-        self.disconnect()
-        self.managerThread.stop()
-        self.managerThread.join()
+        How the command is sent and what it produces is waited for: its response ("response"), the next
+        frame ("frame") or nothing at all (None).
+        '''
+        pass
 
     ##########################################################################################
     # Image/sensor array commands
     def start_stream(self, delay_msec=0, num_frames=0, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "stream_on",
             "args": {"delay_msec": delay_msec, "num_frames": num_frames},
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def stop_stream(self, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "stream_off"}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def get_image(self, timeout=None):
         """get_image()
         Used for when you are needing only one frame.
         """
         cmd = {"cmd": "get_image"}
-        self.cmdQueue.put(cmd)
-        if not timeout:
-            timeout = self.responseTimeout
-        return self.frameQueue.get(block=True, timeout=timeout)
-
-    def get_frame(self):
-        """
-        get_frame()
-        Used for when you need to pull frames from the frameQueue, usually when you are streaming.
-        """
-        if not self.frameQueue.empty():
-            return self.frameQueue.get()
-        else:
-            return None
-
-    def frame_count(self):
-        """
-        frame_count()
-        Returns number of pending frames waiting in the queue
-        """
-        return self.frameQueue.qsize()
+        return self.send_cmd(cmd, timeout, expect="frame")
 
     def run_ffc(self, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "run_ffc"}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     ##########################################################################################
     # all of the set and get functions
     def get_status(self, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "get_status"}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_time(
         self,
@@ -485,8 +948,6 @@ class TCam:
         year=None,
         timeout=None
     ):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_time",
             "args": {
@@ -499,19 +960,13 @@ class TCam:
                 "year": year,
             },
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def get_config(self, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "get_config"}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_config(self, agc_enabled=1, emissivity=98, gain_mode=2, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_config",
             "args": {
@@ -520,44 +975,34 @@ class TCam:
                 "gain_mode": gain_mode,
             },
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_config_agc(self, agc_enabled=1, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_config",
             "args": {
                 "agc_enabled": agc_enabled,
             },
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_config_emissivity(self, emissivity=98, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_config",
             "args": {
                 "emissivity": emissivity,
             },
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_config_gain_mode(self, gain_mode=2, timeout=None):
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_config",
             "args": {
                 "gain_mode": gain_mode,
             },
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def get_lep_cci(self, command=0x4ECC, length=4, timeout=None):
         """
@@ -565,8 +1010,6 @@ class TCam:
         
         Default values are Command: RAD Spotmeter Region of Interest, Length: 4 DWORDS
         """
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "get_lep_cci",
             "args": {
@@ -574,8 +1017,7 @@ class TCam:
                 "length": length
             }
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
 
     def set_lep_cci(self, command, data, timeout=None):
@@ -583,8 +1025,6 @@ class TCam:
             dataArray = array.array('H', data)
         except OverflowError as e:
             raise ValueError(f"A value in data list is not within the 0-65535 bounds of a 16 bit UInt. {e}")
-        if not timeout:
-            timeout = self.responseTimeout
         encodedData = base64.b64encode(dataArray.tobytes()).decode('ascii')
         cmd = {
             "cmd": "set_lep_cci",
@@ -594,8 +1034,7 @@ class TCam:
                 "data": encodedData
              }
         }
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_spotmeter(self, c1=79, c2=80, r1=59, r2=60, timeout=None):
         """
@@ -608,22 +1047,16 @@ class TCam:
         r1 == Spotmeter row 1: Top Y-axis spotmeter box coordinate (0-119)
         r2 == Spotmeter row 2: Bottom Y-axis spotmeter box coordinate (0-119)
         """
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "set_spotmeter", "args": {"c1": c1, "c2": c2, "r1": r1, "r2": r2}}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def get_wifi(self, timeout=None):
         """
         get_wifi()
         Returns wifi data
         """
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "get_wifi"}
-        self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        return self.send_cmd(cmd, timeout)
 
     def set_wifi(
         self,
@@ -640,8 +1073,6 @@ class TCam:
         """
         set_wifi() - Deprecated.  Use set_wifi_ap, set_wifi_sta or set_network instead.
         """
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_wifi",
             "args": {
@@ -655,7 +1086,7 @@ class TCam:
                 "sta_netmask": sta_netmask,
             },
         }
-        self.cmdQueue.put(cmd)
+        return self.send_cmd(cmd, timeout, expect=None)
 
     def set_wifi_ap(self, ap_ssid, ap_pw, timeout=None):
         """
@@ -664,8 +1095,6 @@ class TCam:
         Configure the camera as a WiFi access point.  Note that the camera will be
         disconnected.  You should call disconnect() after issuing this call.
         """
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {
             "cmd": "set_wifi",
             "args": {
@@ -674,7 +1103,7 @@ class TCam:
                 "flags": 1,
             },
         }
-        self.cmdQueue.put(cmd)
+        return self.send_cmd(cmd, timeout, expect=None)
 
     def set_wifi_sta(
         self,
@@ -694,8 +1123,6 @@ class TCam:
         a static IP address.  Setting is_static to False configured a DHCP served
         address (and doesn't require the stat_ip_addr or sta_ip_netmask arguments).
         """
-        if not timeout:
-            timeout = self.responseTimeout
         if is_static:
             cmd = {
                 "cmd": "set_wifi",
@@ -716,7 +1143,7 @@ class TCam:
                     "flags": 129,
                 },
             }
-        self.cmdQueue.put(cmd)
+        return self.send_cmd(cmd, timeout, expect=None)
 
     def set_static_ip(
         self,
@@ -736,8 +1163,6 @@ class TCam:
         a static IP address.  Setting is_static to False configured a DHCP served
         address (and doesn't require the stat_ip_addr or sta_ip_netmask arguments).
         """
-        if not timeout:
-            timeout = self.responseTimeout
         if is_static:
             cmd = {
                 "cmd": "set_wifi",
@@ -754,7 +1179,7 @@ class TCam:
                     "flags": 129,
                 },
             }
-        self.cmdQueue.put(cmd)
+        return self.send_cmd(cmd, timeout, expect=None)
 
     def send_raw(self, payload: bytes, timeout=None):
         """
@@ -765,8 +1190,374 @@ class TCam:
         Meant as a developer tool to enable writing new command/response pairs in the tCam firmware as well
         as writing regression tests for the firmware.
         """
-        if not timeout:
-            timeout = self.responseTimeout
         cmd = {"cmd": "raw", "payload": payload}
+        return self.send_cmd(cmd, timeout)
+
+
+################################################################################
+class TCam(TCamCommands):
+    """
+    TCam - Interface object for managing a tCam device.
+    """
+
+    def __init__(self, timeout=1, responseTimeout=10, is_hw=False, pool=None, cameraId=None,
+                 frame_policy="unbounded", max_frames=8, metrics=None):
+        # counters and stage latencies, see stats().  Pass a Metrics to keep counting across TCam objects,
+        # for example over reconnects.
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.metrics.gauge("frames_queued", lambda: self.frameQueue.qsize())
+        self.frameQueue = TCamFrameQueue(frame_policy, max_frames, self.metrics)
+        self.cmdQueue = Queue()
+        self.responseQueue = Queue()
+        self.router = TCamResponseRouter(responseTimeout)
+        self.cmdLock = Lock()
+        self.responseTimeout = responseTimeout
+        self.timeout = timeout
+        self.is_hw = is_hw
+        self.cameraId = cameraId
+
+        if is_hw:
+            if pool is not None:
+                raise ValueError("The hardware interface can't be used with a TCamPool")
+            self.hwChecks()
+            self.managerThread = TCamHwManagerThread(
+                responseQueue=self.responseQueue,
+                cmdQueue=self.cmdQueue,
+                frameQueue=self.frameQueue,
+                timeout=self.timeout,
+                router=self.router,
+                metrics=self.metrics,
+            )
+        else:
+            self.managerThread = TCamManagerThread(
+                responseQueue=self.responseQueue,
+                cmdQueue=self.cmdQueue,
+                frameQueue=self.frameQueue,
+                timeout=self.timeout,
+                router=self.router,
+                pool=pool,
+                cameraId=cameraId,
+                metrics=self.metrics,
+            )
+
+        self.managerThread.start()
+        
+
+    def hwChecks(self):
+        try:
+            from serial import Serial
+        except ImportError as e:
+            print("Attempting to use hardware interface without the pyserial module installed!")
+            sys.exit(-42)
+        if not os.path.exists('/dev/spidev0.0') or not os.path.exists('/dev/spidev0.1'):
+            print("Do you have SPI turned on?  Didn't find the SPI device files in /dev")
+            sys.exit(-43)
+        if not os.path.exists('/dev/serial0'):
+            print("Do you have the UART turned on?  Didn't find the serial device file in /dev")
+            sys.exit(-44)
+        with open('/proc/cmdline', 'r') as f:
+            cmdline = f.read()
+            if 'spidev.bufsiz=65536' not in cmdline:
+                print(f"You will need to add 'spidev.bufsiz=65536' to the kernel cmdline in /boot/cmdline.txt")
+                sys.exit(-45)
+                
+            
+    def queue_cmd(self, cmd):
+        """
+        queue_cmd()
+
+        Put a command on the cmdQueue and wake the manager thread up to send it.
+        """
         self.cmdQueue.put(cmd)
-        return self.responseQueue.get(block=True, timeout=timeout)
+        self.managerThread.wakeup()
+
+    def submit_cmd(self, cmd, timeout=None):
+        """
+        submit_cmd()
+
+        Queue a command without waiting for it.  Returns a concurrent.futures.Future that will hold the
+        response, or None if the command doesn't get one.  Use this to have several commands in flight at
+        once.  If no response arrives within timeout seconds (responseTimeout by default) the Future gets a
+        TimeoutError.
+        """
+        key = RESPONSE_KEYS.get(cmd["cmd"])
+        if key is None:
+            self.queue_cmd(cmd)
+            return None
+        # register and queue under one lock so requests are lined up in the order the commands are sent
+        with self.cmdLock:
+            future = self.router.expect(key, timeout)
+            self.queue_cmd(cmd)
+        return future
+
+    def send_cmd(self, cmd, timeout=None, expect="response"):
+        """
+        send_cmd()
+
+        Queue a command and wait for what it is expected to produce: its response ("response"), the next
+        frame ("frame") or nothing at all (None).  Raises queue.Empty if nothing arrives within the timeout.
+        Safe to call from several threads at once, each caller gets the response to its own command.
+        """
+        if not timeout:
+            timeout = self.responseTimeout
+        if expect == "frame":
+            self.queue_cmd(cmd)
+            return self.frameQueue.get(block=True, timeout=timeout)
+        if expect is None:
+            self.queue_cmd(cmd)
+            return None
+        if cmd["cmd"] not in RESPONSE_KEYS:
+            # nothing to match the response of an unknown command with, take whatever shows up
+            self.queue_cmd(cmd)
+            return self.responseQueue.get(block=True, timeout=timeout)
+
+        future = self.submit_cmd(cmd, timeout)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # either the wait timed out or the router expired the request, unless the response showed up
+            # in the meantime
+            if future.cancel() or future.exception() is not None:
+                raise Empty
+            return future.result()
+
+    def connect(self, ipaddress="192.168.4.1", port=5001,
+                spiFile='/dev/spidev0.0',
+                serialFile='/dev/serial0',
+                baudrate=230400,
+                serialTimeout=.01,
+                spiSpeed=7000000
+                ):
+        """
+        connect()
+        """
+        if self.is_hw:
+            cmd = {"cmd": "connect",
+                   "spiFile": spiFile,
+                   "serialFile": serialFile,
+                   "baudrate": baudrate,
+                   "timeout": serialTimeout,
+                   "spiSpeed": spiSpeed,
+                   }
+        else:
+            cmd = {"cmd": "connect", "ipaddress": ipaddress, "port": port}
+
+
+        return self.send_cmd(cmd)
+
+    def disconnect(self):
+        """
+        disconnect()
+        """
+        cmd = {"cmd": "disconnect"}
+        return self.send_cmd(cmd)
+
+    def shutdown(self):
+        """
+        shutdown()
+
+        Use this to not only disconnect the socket, but also shut down the manager thread.  If you are using
+        this object in an ipython session, you may find that the session won't exit until you ctrl+c.  This is
+        because the manager thread is still alive in the background.  Calling stop and join on it will clean it up.
+        """
+        self.disconnect()
+        self.managerThread.stop()
+        self.managerThread.join()
+
+    def get_frame(self):
+        """
+        get_frame()
+        Used for when you need to pull frames from the frameQueue, usually when you are streaming.
+        """
+        if not self.frameQueue.empty():
+            return self.frameQueue.get()
+        else:
+            return None
+
+    def frame_count(self):
+        """
+        frame_count()
+        Returns number of pending frames waiting in the queue
+        """
+        return self.frameQueue.qsize()
+
+    def dropped_frames(self):
+        """
+        dropped_frames()
+        Returns the number of frames the frame_policy threw away because nobody took them out in time
+        """
+        return self.frameQueue.dropped
+
+    def stats(self):
+        """
+        stats()
+        Returns the counters (bytes read, frames in, out and dropped, parse errors, connects and reconnects),
+        the number of frames queued and the latency of every stage frames went through: receive (first to
+        last byte off the interface), parse and queue (waiting on the frameQueue), plus any stages the
+        application records into the same metrics.  Latencies are in seconds, the percentiles cover the last
+        minute.
+        """
+        return self.metrics.snapshot()
+
+
+################################################################################
+class TCamPool:
+    """
+    TCamPool - Runs any number of network connected cameras from a single manager thread.
+
+    Every camera added to the pool is a regular TCam object with the whole API, but instead of starting a
+    manager thread of its own it has its socket serviced by the pool's thread, which waits on the sockets of
+    all of the cameras in one selector.  frames() iterates over the frames from every camera, tagged with the
+    id of the camera each one came from.
+
+        pool = TCamPool()
+        for ip in addresses:
+            pool.add_camera(ip).connect(ip)
+        for cameraId, frame in pool.frames():
+            ...
+        pool.shutdown()
+    """
+
+    def __init__(self, timeout=1, responseTimeout=10):
+        self.timeout = timeout
+        self.responseTimeout = responseTimeout
+        self.cameras = {}
+        self.selector = selectors.DefaultSelector()
+        self.wakeupReader, self.wakeupWriter = make_wakeup_pair()
+        self.selector.register(self.wakeupReader, selectors.EVENT_READ, self.process_wakeup)
+        self.woken = deque()
+        self.readyQueue = Queue()
+        self.readyLock = Lock()
+        self.ready = set()
+        self.running = True
+        self.thread = Thread(target=self.run, name="TCamPool", daemon=True)
+        self.thread.start()
+
+    def add_camera(self, cameraId=None, frame_policy="unbounded", max_frames=8, metrics=None):
+        """
+        add_camera()
+
+        Add a camera to the pool and return its TCam object, ready for connect().  cameraId is what frames()
+        tags the camera's frames with, it defaults to the number of cameras added before this one.  Since
+        every camera shares the pool's thread, a "block" frame_policy on one camera holds up all of them.
+        """
+        if cameraId is None:
+            cameraId = len(self.cameras)
+        if cameraId in self.cameras:
+            raise ValueError(f"There already is a camera with id {cameraId} in the pool")
+        cam = TCam(
+            timeout=self.timeout,
+            responseTimeout=self.responseTimeout,
+            pool=self,
+            cameraId=cameraId,
+            frame_policy=frame_policy,
+            max_frames=max_frames,
+            metrics=metrics,
+        )
+        self.cameras[cameraId] = cam
+        return cam
+
+    def remove_camera(self, cameraId):
+        """
+        remove_camera()
+
+        Shut down a camera and take it out of the pool.
+        """
+        self.cameras.pop(cameraId).shutdown()
+
+    def shutdown(self):
+        """
+        shutdown()
+
+        Shut down every camera in the pool and stop the pool's thread.
+        """
+        for cameraId in list(self.cameras):
+            self.remove_camera(cameraId)
+        self.running = False
+        self.wakeup()
+        self.thread.join()
+        self.readyQueue.put(None)
+
+    def wakeup(self, manager=None):
+        """
+        wakeup()
+
+        Have the pool's thread look at the cmdQueue of the given camera's manager.  Safe to call from any
+        thread.
+        """
+        if manager is not None:
+            self.woken.append(manager)
+        try:
+            self.wakeupWriter.send(b"\x00")
+        except OSError:
+            # a full socketpair already has a wakeup pending, a closed one means the thread is gone
+            pass
+
+    def run(self):
+        try:
+            while self.running:
+                for key, mask in self.selector.select():
+                    key.data(mask)
+        finally:
+            self.selector.close()
+            self.wakeupReader.close()
+            self.wakeupWriter.close()
+
+    def process_wakeup(self, mask=selectors.EVENT_READ):
+        """
+        process_wakeup()
+
+        Send the commands queued for every camera that asked for a wakeup, and finish stopping the ones that
+        were stopped.
+        """
+        drain_wakeup(self.wakeupReader)
+        while self.woken:
+            manager = self.woken.popleft()
+            if manager.running:
+                manager.process_commands()
+            elif not manager.stopped.is_set():
+                if manager.connected:
+                    manager.close_interface()
+                manager.stopped.set()
+
+    def frame_ready(self, cameraId):
+        """
+        frame_ready()
+
+        Called by a camera's manager when it puts a frame on its frameQueue.  Each camera is in line for
+        frames() at most once, however many frames it has waiting.
+        """
+        with self.readyLock:
+            if cameraId in self.ready:
+                return
+            self.ready.add(cameraId)
+        self.readyQueue.put(cameraId)
+
+    def frames(self, timeout=None):
+        """
+        frames()
+
+        Generator of (cameraId, frame) tuples for the frames coming from all of the cameras, taking turns
+        between the cameras that have frames waiting.  Ends when the pool is shut down, or after timeout
+        seconds without a frame if a timeout is given.
+        """
+        while True:
+            try:
+                cameraId = self.readyQueue.get(timeout=timeout)
+            except Empty:
+                return
+            if cameraId is None:
+                return
+            with self.readyLock:
+                self.ready.discard(cameraId)
+            cam = self.cameras.get(cameraId)
+            if cam is None:
+                continue
+            frame = cam.get_frame()
+            if cam.frame_count():
+                # more waiting, go to the back of the line
+                self.frame_ready(cameraId)
+            if frame is not None:
+                yield cameraId, frame
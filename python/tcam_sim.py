@@ -0,0 +1,447 @@
+"""
+  tCam Python Package - camera simulator
+
+  A TCP server that stands in for a tCam-Mini on the network.  It speaks the STX/ETX delimited json
+  protocol TCam uses: it answers get_status, get_config, set_config, get_image, stream_on, stream_off,
+  run_ffc, set_time, get_lep_cci, set_lep_cci, set_spotmeter and get_wifi, and streams image packets of
+  synthetic or recorded frames.  Frame rate, jitter, fragmentation of the byte stream and corruption of
+  image packets can all be set, so the driver and the bridge can be load and latency tested without a camera:
+
+      python tcam_sim.py --fps 30 --jitter 0.005 --fragment 1460
+
+      sim = TCamSimulator(port=0, fps=30)
+      sim.start()
+      cam = TCam()
+      cam.connect(*sim.address)
+
+  numpy is required.
+"""
+import json
+import time
+import base64
+import random
+import socket
+import argparse
+import threading
+
+import numpy as np
+
+from tcam import TCamPacketFramer
+from thermal_frame import FRAME_ROWS, FRAME_COLS, TELEMETRY_WORDS
+
+
+# A tCam-Mini streams at the Lepton's 8.7 frames per second
+DEFAULT_FPS = 8.7
+
+# Lepton CCI commands are a module/command id plus 0 to get, 1 to set or 2 to run
+CCI_TYPE_MASK = 0x3
+CCI_RAD_SPOTMETER_ROI = 0x4ECC
+CCI_STATUS_OK = 6  # boot mode and boot status set, not busy
+
+
+def kelvin100(celsius):
+    return int(round((celsius + 273.15) * 100))
+
+
+class SyntheticSource:
+    """
+    SyntheticSource - Makes up frames: a room temperature background with a gradient and sensor noise, and
+    a warm body moving around on it.  Telemetry says TLinear is on at 0.01 K resolution, so the radiometric
+    values are Kelvin * 100 just like a real camera's.
+    """
+
+    def __init__(self, seed=None, background=22.0, body=34.0):
+        self.rng = np.random.default_rng(seed)
+        rows, cols = np.mgrid[0:FRAME_ROWS, 0:FRAME_COLS]
+        self.rows = rows
+        self.cols = cols
+        self.scene = (background + 2.0 * rows / FRAME_ROWS) * 100 + 27315
+        self.body = (body - background) * 100
+        self.count = 0
+
+    def next_frame(self):
+        """
+        next_frame()
+
+        The (radiometric, telemetry) of the next frame as uint16 arrays.
+        """
+        t = self.count / DEFAULT_FPS
+        self.count += 1
+        r = FRAME_ROWS / 2 + FRAME_ROWS / 4 * np.sin(t / 3)
+        c = FRAME_COLS / 2 + FRAME_COLS / 3 * np.cos(t / 5)
+        blob = np.exp(-((self.rows - r) ** 2 + (self.cols - c) ** 2) / (2 * 12.0 ** 2))
+        a = self.scene + self.body * blob + self.rng.normal(0, 5, self.scene.shape)
+        radiometric = np.clip(a, 0, 65535).astype(np.uint16)
+
+        telemetry = np.zeros(TELEMETRY_WORDS, dtype=np.uint16)
+        telemetry[20] = self.count & 0xFFFF  # frame counter, low word first
+        telemetry[21] = self.count >> 16
+        telemetry[24] = kelvin100(30.5 + 0.2 * np.sin(t / 60))  # FPA
+        telemetry[26] = kelvin100(29.0)  # housing
+        telemetry[80 + 19] = 8192  # emissivity 1.0
+        telemetry[160 + 5] = 2  # gain mode auto
+        telemetry[160 + 6] = 0  # effective gain mode high
+        telemetry[160 + 48] = 1  # TLinear enabled
+        telemetry[160 + 49] = 1  # TLinear resolution 0.01
+        return radiometric, telemetry
+
+
+class RecordingSource:
+    """
+    RecordingSource - Replays the frames of a recording made with RecordingWriter, over and over.
+    """
+
+    def __init__(self, path):
+        from recording import RecordingReader
+
+        self.reader = RecordingReader(path)
+        if len(self.reader) == 0:
+            raise ValueError(f"{path} has no frames")
+        self.count = 0
+
+    def next_frame(self):
+        _, radiometric, telemetry = self.reader.frame(self.count % len(self.reader))
+        self.count += 1
+        return radiometric, telemetry
+
+
+class SimulatedCamera:
+    """
+    SimulatedCamera - The state of the simulated camera, shared by every connection to it, and the
+    responses to the commands.
+    """
+
+    def __init__(self, source, name="tCam-Mini-SIM"):
+        self.source = source
+        self.name = name
+        self.lock = threading.Lock()
+        self.config = {"agc_enabled": 0, "emissivity": 98, "gain_mode": 2}
+        # CCI registers by command id, as lists of words
+        self.cci = {CCI_RAD_SPOTMETER_ROI: [59, 79, 60, 80]}
+        self.clock_offset = 0.0
+        self.sequence = 0
+
+    def timestamp(self):
+        t = time.time() + self.clock_offset
+        lt = time.localtime(t)
+        return (f"{lt.tm_hour}:{lt.tm_min:02d}:{lt.tm_sec:02d}.{int(t % 1 * 1000):03d}",
+                f"{lt.tm_mon}/{lt.tm_mday}/{lt.tm_year % 100:02d}")
+
+    def image(self):
+        """
+        image()
+
+        The json of an image packet with the next frame of the source.
+        """
+        with self.lock:
+            radiometric, telemetry = self.source.next_frame()
+            self.sequence += 1
+            sequence = self.sequence
+            r1, c1, r2, c2 = self.cci[CCI_RAD_SPOTMETER_ROI]
+        telemetry = telemetry.copy()
+        spot = radiometric[r1:r2 + 1, c1:c2 + 1]
+        if spot.size:
+            telemetry[160 + 50] = int(spot.mean())
+            telemetry[160 + 51] = int(spot.max())
+            telemetry[160 + 52] = int(spot.min())
+            telemetry[160 + 53] = spot.size
+        telemetry[160 + 54:160 + 58] = (r1, c1, r2, c2)
+        clock, date = self.timestamp()
+        return {
+            "metadata": {
+                "Camera": self.name,
+                "Model": 262402,
+                "Version": "3.0",
+                "Sequence": sequence,
+                "Time": clock,
+                "Date": date,
+            },
+            "radiometric": base64.b64encode(radiometric.astype("<u2", copy=False).tobytes()).decode(),
+            "telemetry": base64.b64encode(telemetry.astype("<u2", copy=False).tobytes()).decode(),
+        }
+
+    def cam_info(self, ok, text):
+        return {"cam_info": {"info_value": 1 if ok else 0, "info_string": text}}
+
+    def respond(self, cmd, args):
+        """
+        respond()
+
+        The response to a command other than the streaming ones, or None for commands without a response.
+        """
+        if cmd == "get_status":
+            clock, date = self.timestamp()
+            return {"status": {"Camera": self.name, "Model": 262402, "Version": "3.0", "Time": clock,
+                               "Date": date}}
+        if cmd == "get_config":
+            with self.lock:
+                return {"config": dict(self.config)}
+        if cmd == "set_config":
+            with self.lock:
+                self.config.update({k: v for k, v in args.items() if k in self.config})
+            return self.cam_info(True, "set_config success")
+        if cmd == "get_image":
+            return self.image()
+        if cmd == "run_ffc":
+            return self.cam_info(True, "run_ffc success")
+        if cmd == "set_time":
+            try:
+                t = time.mktime((args["year"] + 1970, args["mon"], args["day"], args["hour"], args["min"],
+                                 args["sec"], 0, 0, -1))
+            except (KeyError, TypeError, ValueError, OverflowError):
+                return self.cam_info(False, "set_time failed")
+            self.clock_offset = t - time.time()
+            return self.cam_info(True, "set_time success")
+        if cmd == "set_spotmeter":
+            try:
+                roi = [int(args[k]) for k in ("r1", "c1", "r2", "c2")]
+            except (KeyError, TypeError, ValueError):
+                return self.cam_info(False, "set_spotmeter failed")
+            with self.lock:
+                self.cci[CCI_RAD_SPOTMETER_ROI] = roi
+            return self.cam_info(True, "set_spotmeter success")
+        if cmd == "get_lep_cci":
+            command = int(args.get("command", 0))
+            length = int(args.get("length", 0))
+            with self.lock:
+                words = self.cci.get(command & ~CCI_TYPE_MASK, [])
+            words = (list(words) + [0] * length)[:length]
+            data = np.array(words, dtype="<u2").tobytes()
+            return {"cci_reg": {"command": command, "length": length, "status": CCI_STATUS_OK,
+                                "data": base64.b64encode(data).decode()}}
+        if cmd == "set_lep_cci":
+            command = int(args.get("command", 0))
+            words = np.frombuffer(base64.b64decode(args.get("data", "")), dtype="<u2").tolist()
+            with self.lock:
+                self.cci[command & ~CCI_TYPE_MASK] = words
+            return {"cci_reg": {"command": command, "length": len(words), "status": CCI_STATUS_OK}}
+        if cmd == "get_wifi":
+            return {"wifi": {"ap_ssid": self.name, "sta_ssid": "", "flags": 0, "ap_ip_addr": "192.168.4.1",
+                             "sta_ip_addr": "", "sta_netmask": "", "cur_ip_addr": "127.0.0.1"}}
+        if cmd == "set_wifi":
+            return None
+        return self.cam_info(False, f"unknown command {cmd}")
+
+
+class SimulatorConnection:
+    """
+    SimulatorConnection - One client of the simulator.  Commands are read and answered on one thread,
+    frames are streamed from another.
+    """
+
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.sendLock = threading.Lock()
+        self.streamStop = threading.Event()
+        self.streamThread = None
+        self.rng = random.Random(server.seed)
+
+    def run(self):
+        framer = TCamPacketFramer()
+        try:
+            while True:
+                data = self.sock.recv(4096)
+                if not data:
+                    break
+                framer.feed(data)
+                for pkt in framer.packets():
+                    try:
+                        msg = json.loads(bytes(pkt))
+                    except ValueError:
+                        continue
+                    self.handle(msg)
+        except OSError:
+            pass
+        finally:
+            self.stop_stream()
+            self.sock.close()
+            self.server.forget(self)
+
+    def handle(self, msg):
+        cmd = msg.get("cmd")
+        args = msg.get("args") or {}
+        if cmd == "stream_on":
+            self.start_stream(args.get("delay_msec", 0), args.get("num_frames", 0))
+            self.send(self.server.camera.cam_info(True, "stream_on success"))
+        elif cmd == "stream_off":
+            self.stop_stream()
+            self.send(self.server.camera.cam_info(True, "stream_off success"))
+        else:
+            rsp = self.server.camera.respond(cmd, args)
+            if rsp is not None:
+                self.send(rsp, corruptible=cmd == "get_image")
+
+    def send(self, msg, corruptible=False):
+        """
+        send()
+
+        Send a response, fragmented the way the server is set up to.  A corruptible one, an image, is also
+        damaged as often as the server is set up to.
+        """
+        packet = bytearray(b"\x02" + json.dumps(msg).encode() + b"\x03")
+        server = self.server
+        if corruptible and server.corrupt and self.rng.random() < server.corrupt:
+            # never into a delimiter, the damage stays inside the one packet
+            i = self.rng.randrange(1, len(packet) - 1)
+            packet[i] = self.rng.choice([b for b in range(0x20, 0x7F) if b != packet[i]])
+            server.corrupted += 1
+        with self.sendLock:
+            if not server.fragment:
+                self.sock.sendall(packet)
+                return
+            pos = 0
+            while pos < len(packet):
+                size = self.rng.randint(1, server.fragment)
+                self.sock.sendall(packet[pos:pos + size])
+                pos += size
+
+    def start_stream(self, delay_msec, num_frames):
+        self.stop_stream()
+        self.streamStop.clear()
+        self.streamThread = threading.Thread(target=self.stream, args=(delay_msec, num_frames), daemon=True)
+        self.streamThread.start()
+
+    def stop_stream(self):
+        self.streamStop.set()
+        if self.streamThread is not None and self.streamThread is not threading.current_thread():
+            self.streamThread.join()
+        self.streamThread = None
+
+    def stream(self, delay_msec, num_frames):
+        server = self.server
+        interval = max(delay_msec / 1000, 1 / server.fps)
+        sent = 0
+        due = time.monotonic()
+        try:
+            while not self.streamStop.is_set() and (num_frames == 0 or sent < num_frames):
+                self.send(server.camera.image(), corruptible=True)
+                sent += 1
+                server.framesSent += 1
+                server.lastFrameSent = time.monotonic()
+                # jitter moves each frame around its slot, it doesn't make the stream drift
+                due += interval
+                wait = due + self.rng.uniform(-server.jitter, server.jitter) - time.monotonic()
+                if wait > 0:
+                    self.streamStop.wait(wait)
+                else:
+                    # too slow to keep up, don't try to catch up in a burst
+                    due = max(due, time.monotonic() - interval)
+        except OSError:
+            pass
+
+
+class TCamSimulator:
+    """
+    TCamSimulator - A TCP server pretending to be a tCam-Mini.
+
+    source makes the frames, SyntheticSource by default or RecordingSource to replay a recording.  fps is
+    the streaming rate, jitter the most a frame is sent early or late in seconds, fragment the largest
+    piece a packet is sent in (0 to send it whole) and corrupt the probability an image packet gets a
+    damaged byte.  Responses to the other commands are never damaged, so tests can still drive the camera.
+
+    Use port 0 to have the OS pick a free port; address then holds the port actually used.
+    """
+
+    def __init__(self, host="127.0.0.1", port=5001, fps=DEFAULT_FPS, source=None, jitter=0.0, fragment=0,
+                 corrupt=0.0, seed=None):
+        self.camera = SimulatedCamera(source if source is not None else SyntheticSource(seed))
+        self.fps = fps
+        self.jitter = jitter
+        self.fragment = fragment
+        self.corrupt = corrupt
+        self.seed = seed
+        self.framesSent = 0
+        self.lastFrameSent = None  # monotonic time the last streamed frame went out, for latency measurements
+        self.corrupted = 0
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.sock = socket.create_server((host, port))
+        self.address = self.sock.getsockname()[:2]
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """
+        start()
+
+        Accept connections on a background thread.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                # the server socket was closed
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = SimulatorConnection(self, sock)
+            with self.lock:
+                self.connections.add(conn)
+            threading.Thread(target=conn.run, daemon=True).start()
+
+    def forget(self, conn):
+        with self.lock:
+            self.connections.discard(conn)
+
+    def stop(self):
+        """
+        stop()
+
+        Stop accepting connections and drop every client.
+        """
+        try:
+            # wakes up accept(), closing the socket alone doesn't
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            conn.streamStop.set()
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.thread is not None:
+            self.thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.prog = "tcam_sim"
+    parser.description = f"{parser.prog} - a simulated tCam-Mini for testing without a camera\n"
+    parser.usage = "tcam_sim.py [--host=<address>] [--port=<port>] [--fps=<rate>] [--recording=<file>] ..."
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("-p", "--port", type=int, default=5001, help="Port to listen on")
+    parser.add_argument("-f", "--fps", type=float, default=DEFAULT_FPS, help="Frames per second when streaming")
+    parser.add_argument("-r", "--recording", help="Replay a recording instead of making frames up")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Most a frame is sent early or late, in seconds")
+    parser.add_argument("--fragment", type=int, default=0, help="Send packets in random pieces up to this many bytes")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Probability of damaging an image packet")
+    parser.add_argument("--seed", type=int, help="Seed for repeatable frames, jitter and damage")
+
+    args = parser.parse_args()
+
+    source = RecordingSource(args.recording) if args.recording else SyntheticSource(args.seed)
+    sim = TCamSimulator(args.host, args.port, args.fps, source, args.jitter, args.fragment, args.corrupt,
+                        args.seed)
+    print(f"Simulated tCam-Mini listening on {sim.address[0]}:{sim.address[1]}")
+    try:
+        sim.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
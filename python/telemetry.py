@@ -0,0 +1,133 @@
+"""
+  tCam Python Package - Lepton telemetry
+
+  The 240 telemetry words of a frame (rows A, B and C of 80 words each) described by a NumPy structured
+  dtype, so the fields can be read by name instead of by word offset.  RAW_DTYPE lays the fields out over
+  the words as they are, and words() views telemetry data through it without copying, whether it is the
+  telemetry of a single frame or a (frames, 240) array like RecordingReader.telemetry, which stays a view of
+  the memory mapped file.  decode() turns the raw fields into physical units for every frame in one
+  vectorized pass.
+
+      from telemetry import decode
+      t = decode(img.telemetry)
+      t["fpa_temp"], t["frame_counter"]
+
+      t = decode(RecordingReader("stream.rec").telemetry)
+      t["housing_temp"].max()
+
+  See the Lepton Engineering Datasheet for the complete list of telemetry words.  numpy is required.
+"""
+import numpy as np
+
+from thermal_frame import RESOLUTIONS, TELEMETRY_WORDS
+
+ROW_A = 0
+ROW_B = 80
+ROW_C = 160
+
+# (name, first word, format) of the fields that are decoded.  32-bit values are stored low word first.
+FIELDS = (
+    ("revision", ROW_A + 0, "<u2"),
+    ("time_counter", ROW_A + 1, "<u4"),  # milliseconds since the Lepton was started
+    ("status", ROW_A + 3, "<u4"),
+    ("frame_counter", ROW_A + 20, "<u4"),
+    ("frame_mean", ROW_A + 22, "<u2"),
+    ("fpa_temp_counts", ROW_A + 23, "<u2"),
+    ("fpa_temp", ROW_A + 24, "<u2"),  # Kelvin x 100
+    ("housing_temp_counts", ROW_A + 25, "<u2"),
+    ("housing_temp", ROW_A + 26, "<u2"),  # Kelvin x 100
+    ("emissivity", ROW_B + 19, "<u2"),  # scaled by 8192
+    ("gain_mode", ROW_C + 5, "<u2"),
+    ("effective_gain_mode", ROW_C + 6, "<u2"),
+    ("tlinear_enabled", ROW_C + 48, "<u2"),
+    ("tlinear_resolution", ROW_C + 49, "<u2"),  # 0 = 0.1, 1 = 0.01
+    ("spotmeter_mean", ROW_C + 50, "<u2"),  # Kelvin scaled by the TLinear resolution
+    ("spotmeter_max", ROW_C + 51, "<u2"),
+    ("spotmeter_min", ROW_C + 52, "<u2"),
+    ("spotmeter_population", ROW_C + 53, "<u2"),
+    ("spotmeter_roi", ROW_C + 54, ("<u2", (4,))),  # start row, start column, end row, end column
+)
+
+RAW_DTYPE = np.dtype({
+    "names": [name for name, _, _ in FIELDS],
+    "formats": [fmt for _, _, fmt in FIELDS],
+    "offsets": [2 * word for _, word, _ in FIELDS],
+    "itemsize": 2 * TELEMETRY_WORDS,
+})
+
+DTYPE = np.dtype([
+    ("frame_counter", "<u4"),
+    ("time_counter", "<u4"),
+    ("fpa_temp", "<f4"),  # degrees C
+    ("housing_temp", "<f4"),  # degrees C
+    ("emissivity", "<f4"),
+    ("gain_mode", "u1"),  # index into GAIN_MODES
+    ("effective_gain_mode", "u1"),
+    ("tlinear_enabled", "?"),
+    ("tlinear_resolution", "<f4"),  # Kelvin per count of the radiometric data
+    ("spotmeter_mean", "<f4"),  # degrees C
+    ("spotmeter_max", "<f4"),
+    ("spotmeter_min", "<f4"),
+    ("spotmeter_population", "<u2"),
+    ("spotmeter_roi", "<u2", (4,)),
+])
+
+GAIN_MODES = ("high", "low", "auto")
+
+
+def words(telemetry):
+    """
+    words()
+
+    The telemetry words of one frame, or of a stack of frames, viewed as RAW_DTYPE records: a 0-d array for
+    one frame or an array of shape (frames,).  Only copies if the words of a frame aren't next to each
+    other in memory.
+    """
+    a = np.asarray(telemetry)
+    if a.dtype != np.dtype("<u2"):
+        a = a.astype("<u2")
+    if a.shape[-1:] != (TELEMETRY_WORDS,):
+        raise ValueError(f"telemetry must have {TELEMETRY_WORDS} words per frame, not shape {a.shape}")
+    if a.strides[-1] != 2:
+        a = np.ascontiguousarray(a)
+    return a.view(RAW_DTYPE)[..., 0]
+
+
+def resolution(tlinear_resolution):
+    """
+    resolution()
+
+    Kelvin per count of the radiometric data for the TLinear resolution word(s).
+    """
+    return np.where(np.asarray(tlinear_resolution) == 0, RESOLUTIONS[0], RESOLUTIONS[1])
+
+
+def decode(telemetry, out=None):
+    """
+    decode()
+
+    Decode the telemetry of one frame or a stack of frames into DTYPE records, with temperatures in
+    degrees C.  Returns a record (use it like a dict) for a single frame and an array of shape (frames,)
+    for a stack, so t["fpa_temp"] is a number for one frame and an array over all of them for a stack.
+    out can be a DTYPE array of the right shape to decode into.
+    """
+    raw = words(telemetry)
+    if out is None:
+        out = np.empty(raw.shape, dtype=DTYPE)
+    elif out.dtype != DTYPE or out.shape != raw.shape:
+        raise ValueError(f"out must be a {raw.shape} array of telemetry.DTYPE")
+
+    for name in ("frame_counter", "time_counter", "gain_mode", "effective_gain_mode", "spotmeter_population",
+                 "spotmeter_roi"):
+        out[name] = raw[name]
+    out["tlinear_enabled"] = raw["tlinear_enabled"] != 0
+    out["fpa_temp"] = raw["fpa_temp"] * 0.01 - 273.15
+    out["housing_temp"] = raw["housing_temp"] * 0.01 - 273.15
+    out["emissivity"] = raw["emissivity"] / 8192
+
+    res = resolution(raw["tlinear_resolution"])
+    out["tlinear_resolution"] = res
+    for name in ("spotmeter_mean", "spotmeter_max", "spotmeter_min"):
+        out[name] = raw[name] * res - 273.15
+
+    return out[()] if out.ndim == 0 else out
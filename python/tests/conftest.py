@@ -0,0 +1,42 @@
+"""
+  tCam Python Package - test fixtures
+
+  The tests drive the package against tcam_sim.TCamSimulator, a simulated tCam-Mini on a free local port,
+  so they need numpy but no camera.  Run them from the python directory with
+
+      python -m pytest tests
+"""
+import os
+import sys
+import socket
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tcam import TCam
+from tcam_sim import TCamSimulator
+
+
+@pytest.fixture
+def sim():
+    with TCamSimulator(port=0, fps=30, seed=0) as sim:
+        yield sim
+
+
+@pytest.fixture
+def camera(sim):
+    cam = TCam(timeout=1, responseTimeout=5)
+    assert cam.connect(*sim.address) == {"status": "connected"}
+    yield cam
+    cam.shutdown()
+
+
+@pytest.fixture
+def deaf_listener():
+    """A listening socket that accepts connections and never reads from or answers them"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    yield listener
+    listener.close()
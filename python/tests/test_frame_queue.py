@@ -0,0 +1,72 @@
+import time
+from queue import Full
+
+import pytest
+
+from metrics import Metrics
+from tcam import TCam, TCamFrameQueue
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get())
+    return items
+
+
+def test_unbounded_keeps_everything():
+    queue = TCamFrameQueue("unbounded", maxsize=2)
+    for n in range(10):
+        queue.put(n)
+    assert drain(queue) == list(range(10))
+    assert queue.dropped == 0
+
+
+def test_drop_oldest_keeps_the_newest():
+    metrics = Metrics()
+    queue = TCamFrameQueue("drop_oldest", maxsize=3, metrics=metrics)
+    for n in range(10):
+        queue.put(n)
+    assert drain(queue) == [7, 8, 9]
+    assert queue.dropped == 7
+    assert metrics.counters["frames_dropped"] == 7
+
+
+def test_latest_keeps_one():
+    queue = TCamFrameQueue("latest")
+    for n in range(5):
+        queue.put(n)
+    assert drain(queue) == [4]
+    assert queue.dropped == 4
+
+
+def test_block_waits_for_room():
+    queue = TCamFrameQueue("block", maxsize=2)
+    queue.put(1)
+    queue.put(2)
+    with pytest.raises(Full):
+        queue.put(3, timeout=0.05)
+    assert drain(queue) == [1, 2]
+    assert queue.dropped == 0
+
+
+def test_bad_policy():
+    with pytest.raises(ValueError):
+        TCamFrameQueue("newest")
+    with pytest.raises(ValueError):
+        TCamFrameQueue("drop_oldest", maxsize=0)
+
+
+def test_slow_consumer_only_sees_the_latest_frame(sim):
+    cam = TCam(timeout=1, responseTimeout=5, frame_policy="latest")
+    try:
+        assert cam.connect(*sim.address) == {"status": "connected"}
+        cam.start_stream()
+        deadline = time.monotonic() + 10
+        while sim.framesSent < 10 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        cam.stop_stream()
+        assert cam.frame_count() == 1
+        assert cam.dropped_frames() >= sim.framesSent - 2
+    finally:
+        cam.shutdown()
@@ -0,0 +1,62 @@
+import time
+
+from tcam import TCam, TCamPacketFramer
+from tcam_sim import TCamSimulator
+from thermal_frame import ThermalFrame
+
+
+def packets(framer, data):
+    framer.feed(data)
+    return [bytes(p) for p in framer.packets()]
+
+
+def test_packets_split_across_reads():
+    framer = TCamPacketFramer()
+    assert packets(framer, b'\x02{"a":') == []
+    assert packets(framer, b'1}\x03\x02{"b":2}\x03\x02{') == [b'{"a":1}', b'{"b":2}']
+    assert packets(framer, b'"c":3}\x03') == [b'{"c":3}']
+    assert framer.pending() == 0
+
+
+def test_garbage_in_front_of_a_packet_is_skipped():
+    framer = TCamPacketFramer()
+    assert packets(framer, b'tail of a lost packet}\x03\x02{"a":1}\x03') == [b'tail of a lost packet}', b'{"a":1}']
+    assert packets(framer, b'noise\x02{"b":2}\x03') == [b'{"b":2}']
+
+
+def test_truncated_packet_does_not_swallow_the_next_one():
+    framer = TCamPacketFramer()
+    assert packets(framer, b'\x02{"y"\x02{"z":1}\x03') == [b'{"z":1}']
+    assert packets(framer, b'\x02{"trunc') == []
+    assert packets(framer, b'ated"\x02{"next":2}\x03') == [b'{"next":2}']
+
+
+def test_consumer_stopping_early_keeps_the_rest():
+    framer = TCamPacketFramer()
+    framer.feed(b'\x02{"a":1}\x03\x02{"b":2}\x03')
+    for packet in framer.packets():
+        assert bytes(packet) == b'{"a":1}'
+        break
+    assert [bytes(p) for p in framer.packets()] == [b'{"b":2}']
+
+
+def test_stream_survives_fragmented_and_corrupted_packets():
+    with TCamSimulator(port=0, fps=30, fragment=1500, corrupt=0.3, seed=1) as sim:
+        cam = TCam(timeout=1, responseTimeout=5)
+        try:
+            assert cam.connect(*sim.address) == {"status": "connected"}
+            cam.start_stream()
+            deadline = time.monotonic() + 10
+            while sim.framesSent < 40 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            cam.stop_stream()
+            # the commands still get their answers in between the damaged frames
+            assert "status" in cam.get_status()
+            frames = 0
+            while cam.frame_count():
+                frames += isinstance(cam.get_frame(), ThermalFrame)
+            assert sim.corrupted > 0
+            # every frame that wasn't damaged came through, damaged ones may still parse
+            assert frames >= sim.framesSent - sim.corrupted
+        finally:
+            cam.shutdown()
@@ -0,0 +1,62 @@
+import socket
+import struct
+import time
+
+from tcam import TCamPool
+
+
+def take_frames(pool, count, timeout=5):
+    cameras = set()
+    for n, (cameraId, frame) in enumerate(pool.frames(timeout=timeout), 1):
+        cameras.add(cameraId)
+        if n == count:
+            break
+    return n, cameras
+
+
+def test_frames_come_from_every_camera(sim):
+    pool = TCamPool(timeout=1, responseTimeout=5)
+    try:
+        cams = [pool.add_camera(name) for name in ("a", "b")]
+        for cam in cams:
+            assert cam.connect(*sim.address) == {"status": "connected"}
+            cam.start_stream()
+        assert take_frames(pool, 20) == (20, {"a", "b"})
+    finally:
+        pool.shutdown()
+
+
+def test_failing_camera_does_not_stop_the_others(sim, deaf_listener):
+    pool = TCamPool(timeout=1, responseTimeout=5)
+    try:
+        good, bad = pool.add_camera("good"), pool.add_camera("bad")
+        assert good.connect(*sim.address) == {"status": "connected"}
+        assert bad.connect(*deaf_listener.getsockname()) == {"status": "connected"}
+        peer, _ = deaf_listener.accept()
+        good.start_stream()
+
+        # the bad camera never reads, so its commands pile up instead of blocking the pool's thread
+        for _ in range(2000):
+            bad.queue_cmd({"cmd": "set_config", "args": {"padding": "x" * 2000}})
+        started = time.monotonic()
+        assert take_frames(pool, 10) == (10, {"good"})
+        assert time.monotonic() - started < 3
+
+        # a reset connection closes only the bad camera's socket
+        peer.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        peer.close()
+        bad.queue_cmd({"cmd": "get_status"})
+        deadline = time.monotonic() + 5
+        while bad.managerThread.connected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not bad.managerThread.connected
+        responses = []
+        while not bad.responseQueue.empty():
+            responses.append(bad.responseQueue.get())
+        assert {"status": "disconnected"} in responses
+
+        assert pool.thread.is_alive()
+        assert take_frames(pool, 10) == (10, {"good"})
+        assert "status" in good.get_status()
+    finally:
+        pool.shutdown()
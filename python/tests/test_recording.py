@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from recording import HEADER_SIZE, RECORD_DTYPE, RecordingReader, RecordingWriter
+
+
+@pytest.fixture
+def frames(camera):
+    return [camera.get_image() for _ in range(3)]
+
+
+def test_round_trip(tmp_path, frames):
+    path = tmp_path / "stream.rec"
+    with RecordingWriter(path) as rec:
+        for n, frame in enumerate(frames):
+            assert rec.write(frame, timestamp=100.0 + n) == n
+
+    with RecordingReader(path) as rec:
+        assert len(rec) == len(frames)
+        for n, ((t, radiometric, telemetry), frame) in enumerate(zip(rec, frames)):
+            assert t == 100.0 + n
+            assert np.array_equal(radiometric, frame.radiometric)
+            assert np.array_equal(telemetry, frame.telemetry)
+        assert rec.index_at(101.5) == 1
+        assert rec.frame_at(102.0)[0] == 102.0
+        assert rec.between(101.0, 103.0) == slice(1, 3)
+        with pytest.raises(IndexError):
+            rec.frame_at(99.0)
+
+
+def test_appending_keeps_times_in_order(tmp_path, frames):
+    path = tmp_path / "stream.rec"
+    with RecordingWriter(path) as rec:
+        rec.write(frames[0], timestamp=100.0)
+    with RecordingWriter(path) as rec:
+        assert len(rec) == 1
+        with pytest.raises(ValueError):
+            rec.write(frames[1], timestamp=99.0)
+        assert rec.write(frames[1], timestamp=100.0) == 1
+
+
+def test_reopen_after_truncation(tmp_path, frames):
+    path = tmp_path / "stream.rec"
+    with RecordingWriter(path) as rec:
+        for n, frame in enumerate(frames[:2]):
+            rec.write(frame, timestamp=100.0 + n)
+    # a crash in the middle of writing the third record
+    with open(path, "ab") as f:
+        f.write(b"\0" * (RECORD_DTYPE.itemsize // 2))
+
+    with RecordingReader(path) as rec:
+        assert len(rec) == 2
+
+    with RecordingWriter(path) as rec:
+        assert len(rec) == 2
+        assert rec.write(frames[2], timestamp=102.0) == 2
+    assert path.stat().st_size == HEADER_SIZE + 3 * RECORD_DTYPE.itemsize
+
+    with RecordingReader(path) as rec:
+        assert list(rec.times) == [100.0, 101.0, 102.0]
+        assert np.array_equal(rec.radiometric[2], frames[2].radiometric)
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a recording" * 10)
+    with pytest.raises(ValueError):
+        RecordingReader(path)
+    with pytest.raises(ValueError):
+        RecordingWriter(path)
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from queue import Empty
+
+import pytest
+
+from tcam import TCam, TCamResponseRouter
+
+STATUS = {"status": {"Camera": "tCam-Mini-SIM"}}
+
+
+def test_requests_on_a_key_are_answered_in_order():
+    router = TCamResponseRouter()
+    first, second = router.expect("status"), router.expect("status")
+    other = router.expect("config")
+    assert router.resolve({"config": {}})
+    assert router.resolve(STATUS)
+    assert other.result(0) == {"config": {}}
+    assert first.result(0) == STATUS
+    assert not second.done()
+
+
+def test_expired_request_is_passed_over():
+    router = TCamResponseRouter()
+    late = router.expect("status", timeout=0.05)
+    time.sleep(0.1)
+    waiting = router.expect("status")
+    with pytest.raises(FutureTimeoutError):
+        late.result(0)
+    # the response that was too late for the first request answers the next one
+    assert router.resolve(STATUS)
+    assert waiting.result(0) == STATUS
+
+
+def test_late_response_without_a_waiter_is_not_claimed():
+    router = TCamResponseRouter()
+    late = router.expect("status", timeout=0.05)
+    time.sleep(0.1)
+    assert not router.resolve(STATUS)
+    with pytest.raises(FutureTimeoutError):
+        late.result(0)
+    assert not router.pending
+
+
+def test_disconnect_answers_every_request():
+    router = TCamResponseRouter()
+    futures = [router.expect("status"), router.expect("config")]
+    assert router.resolve({"status": "disconnected"})
+    assert [f.result(0) for f in futures] == [{"status": "disconnected"}] * 2
+
+
+def test_command_times_out_when_the_camera_does_not_answer(deaf_listener):
+    cam = TCam(timeout=1, responseTimeout=5)
+    try:
+        assert cam.connect(*deaf_listener.getsockname()) == {"status": "connected"}
+        started = time.monotonic()
+        with pytest.raises(Empty):
+            cam.get_status(timeout=0.2)
+        assert time.monotonic() - started < 2
+        future = cam.submit_cmd({"cmd": "get_status"}, timeout=0.2)
+        with pytest.raises(FutureTimeoutError):
+            future.result(2)
+    finally:
+        cam.shutdown()
+
+
+def test_concurrent_commands_get_their_own_responses(camera):
+    futures = [camera.submit_cmd({"cmd": cmd}) for cmd in ("get_status", "get_config", "get_status")]
+    results = [f.result(5) for f in futures]
+    assert [next(iter(r)) for r in results] == ["status", "config", "status"]
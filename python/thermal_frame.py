@@ -0,0 +1,300 @@
+"""
+  tCam Python Package - image frames
+
+  ThermalFrame wraps the image response from the camera and decodes its radiometric and telemetry data on
+  demand.
+"""
+import re
+import json
+import math
+import binascii
+import threading
+
+# numpy is only needed once somebody asks for the pixels
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Lepton 3.5 image and telemetry dimensions
+FRAME_ROWS = 120
+FRAME_COLS = 160
+TELEMETRY_WORDS = 3 * 80
+
+# Telemetry row C word 49 holds the TLinear resolution: Kelvin per count of the radiometric data
+TLINEAR_ENABLE_WORD = 160 + 48
+TLINEAR_RESOLUTION_WORD = 160 + 49
+RESOLUTIONS = (0.1, 0.01)
+DEFAULT_RESOLUTION = 0.01  # what the tCam sets the Lepton to
+
+TEMPERATURE_UNITS = ("C", "F", "K")
+
+
+# Start of the value of one of the base64 fields of an image packet
+IMAGE_FIELD = re.compile(rb'"(radiometric|telemetry)"\s*:\s*"')
+
+
+class ThermalFrame(dict):
+    """
+    ThermalFrame - An image response from the camera.
+
+    It is still the dict built from the json response, so frame["radiometric"], "radiometric" in frame and
+    json.dumps(frame) all work the way they always have.  On top of that the radiometric and telemetry
+    attributes hold the base64 data decoded into read-only numpy arrays of uint16 values.  The data is only
+    decoded the first time an attribute is used and the array is kept, so code that only looks at the
+    metadata never pays for decoding and code that needs the pixels decodes them once, without any copies
+    past the base64 decode itself.
+    """
+
+    __slots__ = ("_radiometric", "_telemetry", "_integrals", "_extrema", "timestamps")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._radiometric = None
+        self._telemetry = None
+        self._integrals = None
+        self._extrema = None
+        # time.monotonic() of every stage the frame has been through, by stage name, see metrics.py
+        self.timestamps = {}
+
+    def __repr__(self):
+        return f"ThermalFrame(metadata={self.metadata!r})"
+
+    @property
+    def metadata(self):
+        return self.get("metadata", {})
+
+    @property
+    def radiometric(self):
+        """
+        The radiometric data as a read-only (120, 160) array of uint16 values.
+        """
+        if self._radiometric is None:
+            self._radiometric = decode_words(self["radiometric"]).reshape(FRAME_ROWS, FRAME_COLS)
+        return self._radiometric
+
+    @property
+    def telemetry(self):
+        """
+        The telemetry data as a read-only array of the 240 uint16 words of telemetry rows A, B and C.
+        """
+        if self._telemetry is None:
+            self._telemetry = decode_words(self["telemetry"])
+        return self._telemetry
+
+    @property
+    def integrals(self):
+        """
+        Integral images of the radiometric data and of its squares, as a (2, 121, 161) int64 array.  Entry
+        [k, r, c] is the sum over rows < r and columns < c, so the sum over any rectangle takes four lookups.
+        Built the first time a statistic is asked for and kept with the frame.
+        """
+        if self._integrals is None:
+            a = self.radiometric.astype(np.int64)
+            integrals = np.zeros((2, FRAME_ROWS + 1, FRAME_COLS + 1), dtype=np.int64)
+            np.cumsum(a, axis=0, out=integrals[0, 1:, 1:])
+            np.cumsum(integrals[0, 1:, 1:], axis=1, out=integrals[0, 1:, 1:])
+            np.cumsum(a * a, axis=0, out=integrals[1, 1:, 1:])
+            np.cumsum(integrals[1, 1:, 1:], axis=1, out=integrals[1, 1:, 1:])
+            integrals.flags.writeable = False
+            self._integrals = integrals
+        return self._integrals
+
+    @property
+    def extrema(self):
+        """
+        A sparse table of the minimum and maximum of the radiometric data, as a (2, 7, 8, 120, 160) uint16
+        array.  Entry [0, i, j, r, c] is the minimum over the 2**i rows from r and the 2**j columns from c and
+        [1, i, j, r, c] the maximum, so any rectangle is covered by four overlapping entries.  Built the first
+        time a statistic is asked for and kept with the frame.
+        """
+        if self._extrema is None:
+            levelRows, levelCols = FRAME_ROWS.bit_length(), FRAME_COLS.bit_length()
+            # entries past the last whole block of a level are never looked at and stay uninitialized
+            extrema = np.empty((2, levelRows, levelCols, FRAME_ROWS, FRAME_COLS), dtype=np.uint16)
+            extrema[:, 0, 0] = self.radiometric
+            for j in range(1, levelCols):
+                half, cols = 1 << (j - 1), FRAME_COLS - (1 << j) + 1
+                prev, cur = extrema[:, 0, j - 1], extrema[:, 0, j]
+                np.minimum(prev[0, :, :cols], prev[0, :, half:half + cols], out=cur[0, :, :cols])
+                np.maximum(prev[1, :, :cols], prev[1, :, half:half + cols], out=cur[1, :, :cols])
+            for i in range(1, levelRows):
+                half, rows = 1 << (i - 1), FRAME_ROWS - (1 << i) + 1
+                prev, cur = extrema[:, i - 1], extrema[:, i]
+                np.minimum(prev[0, :, :rows], prev[0, :, half:half + rows], out=cur[0, :, :rows])
+                np.maximum(prev[1, :, :rows], prev[1, :, half:half + rows], out=cur[1, :, :rows])
+            extrema.flags.writeable = False
+            self._extrema = extrema
+        return self._extrema
+
+    @property
+    def resolution(self):
+        """
+        Kelvin per count of the radiometric data, 0.1 or 0.01, from the TLinear resolution in the telemetry.
+        None if the telemetry says TLinear is disabled, the radiometric data then isn't a temperature at all.
+        A frame without telemetry is taken to be at DEFAULT_RESOLUTION.
+        """
+        if "telemetry" not in self:
+            return DEFAULT_RESOLUTION
+        if self.telemetry[TLINEAR_ENABLE_WORD] == 0:
+            return None
+        return RESOLUTIONS[0] if self.telemetry[TLINEAR_RESOLUTION_WORD] == 0 else RESOLUTIONS[1]
+
+    def temperatures(self, unit="C", out=None):
+        """
+        temperatures()
+
+        The whole frame as a (120, 160) float32 array of temperatures in unit, "C", "F" or "K", at the
+        frame's TLinear resolution.  out can be a (120, 160) float32 array to write into, so a consumer
+        converting every frame allocates nothing.  Raises ValueError if TLinear is disabled.
+        """
+        resolution = self.resolution
+        if resolution is None:
+            raise ValueError("TLinear is disabled, the radiometric data of this frame isn't a temperature")
+        return to_temperature(self.radiometric, resolution, unit, out)
+
+    def temperature(self, x, y):
+        """
+        temperature()
+
+        The raw radiometric value of the pixel in column x, row y.  With TLinear enabled that is the
+        temperature in Kelvin divided by the frame's resolution, see temperatures() for converted values.
+        """
+        check_roi(x, y, x, y)
+        return int(self.radiometric[y, x])
+
+    def roi_stats(self, x0, y0, x1, y1):
+        """
+        roi_stats()
+
+        Statistics of the raw radiometric values in the rectangle of columns x0 to x1 and rows y0 to y1,
+        inclusive: a dict of count, min, max, mean and std (population standard deviation).  The mean and
+        std come from the integral images and the min and max from the sparse table of extrema, both built
+        once per frame, after which a query is a handful of lookups whatever the size of the rectangle.
+        """
+        check_roi(x0, y0, x1, y1)
+        n = (x1 - x0 + 1) * (y1 - y0 + 1)
+        ii = self.integrals
+        corners = ii[:, y1 + 1, x1 + 1] - ii[:, y0, x1 + 1] - ii[:, y1 + 1, x0] + ii[:, y0, x0]
+        total, squares = int(corners[0]), int(corners[1])
+        # the largest power of two blocks that fit, one from each corner, overlap to cover the rectangle
+        i, j = (y1 - y0 + 1).bit_length() - 1, (x1 - x0 + 1).bit_length() - 1
+        ya, xa = y1 - (1 << i) + 1, x1 - (1 << j) + 1
+        blocks = self.extrema[:, i, j, [y0, y0, ya, ya], [x0, xa, x0, xa]]
+        return {
+            "count": n,
+            "min": int(blocks[0].min()),
+            "max": int(blocks[1].max()),
+            "mean": total / n,
+            # exact in integers, the float formula cancels badly for a uniform scene
+            "std": math.sqrt((n * squares - total * total) / (n * n)),
+        }
+
+
+_luts = {}
+_luts_lock = threading.Lock()
+
+
+def temperature_lut(resolution=DEFAULT_RESOLUTION, unit="C"):
+    """
+    temperature_lut()
+
+    A read-only 65536 entry float32 table of the temperature in unit of every radiometric value at a TLinear
+    resolution.  Every entry is computed in double precision and rounded once.  Tables are built on first
+    use and shared.
+    """
+    key = (resolution, unit)
+    lut = _luts.get(key)
+    if lut is None:
+        if unit not in TEMPERATURE_UNITS:
+            raise ValueError(f"unit must be one of {', '.join(TEMPERATURE_UNITS)}, not {unit!r}")
+        if np is None:
+            raise ImportError("numpy is needed to convert radiometric data to temperatures")
+        kelvin = np.arange(65536, dtype=np.float64) * resolution
+        if unit == "C":
+            values = kelvin - 273.15
+        elif unit == "F":
+            values = (kelvin - 273.15) * 1.8 + 32
+        else:
+            values = kelvin
+        lut = values.astype(np.float32)
+        lut.flags.writeable = False
+        with _luts_lock:
+            lut = _luts.setdefault(key, lut)
+    return lut
+
+
+def to_temperature(radiometric, resolution=DEFAULT_RESOLUTION, unit="C", out=None):
+    """
+    to_temperature()
+
+    Convert radiometric values, any shape of uint16 array, to float32 temperatures in unit through
+    temperature_lut().  out can be a float32 array of the same shape to write into.
+    """
+    lut = temperature_lut(resolution, unit)
+    if out is not None and (out.dtype != np.float32 or out.shape != np.shape(radiometric)):
+        raise ValueError(f"out must be a float32 array of shape {np.shape(radiometric)}")
+    # uint16 values are always inside the table, clip skips the bounds check and the buffering it needs
+    return np.take(lut, radiometric, out=out, mode="clip")
+
+
+def check_roi(x0, y0, x1, y1):
+    """
+    check_roi()
+
+    Raise ValueError unless columns x0 to x1 and rows y0 to y1 are a rectangle inside the frame.
+    """
+    if not (0 <= x0 <= x1 < FRAME_COLS and 0 <= y0 <= y1 < FRAME_ROWS):
+        raise ValueError(f"({x0}, {y0}) to ({x1}, {y1}) is not inside the {FRAME_COLS}x{FRAME_ROWS} frame")
+
+
+def decode_words(b64):
+    """
+    decode_words()
+
+    Decode base64 data into a read-only numpy array of little-endian uint16 values.  The array is a view of
+    the decoded bytes, nothing is copied.
+    """
+    if np is None:
+        raise ImportError("numpy is needed to decode radiometric and telemetry data")
+    return np.frombuffer(binascii.a2b_base64(b64), dtype="<u2")
+
+
+def parse_image_packet(data):
+    """
+    parse_image_packet()
+
+    Fast path for deserializing an image packet.  Nearly all of an image packet is the base64 radiometric
+    string, which json.loads() would scan character by character.  Here the radiometric and telemetry
+    strings are found in the raw bytes and copied out as they are (base64 never needs escaping), and only the
+    small remainder of the packet goes through json.loads().  Returns a ThermalFrame, or None if data isn't
+    an image packet or isn't laid out the way this expects, in which case json.loads() has to be used.
+    """
+    fields = {}
+    rest = []
+    pos = 0
+    m = IMAGE_FIELD.search(data)
+    while m is not None:
+        begin = m.end()
+        end = data.find(b'"', begin)
+        if end == -1 or data.find(b"\\", begin, end) != -1:
+            return None
+        try:
+            fields[m.group(1).decode()] = data[begin:end].decode("ascii")
+        except UnicodeDecodeError:
+            return None
+        # keep the key with an empty string so the order of the keys doesn't change
+        rest.append(data[pos:begin])
+        pos = end
+        m = IMAGE_FIELD.search(data, end + 1)
+    if "radiometric" not in fields:
+        return None
+    rest.append(data[pos:])
+
+    obj = json.loads(b"".join(rest))
+    if not isinstance(obj, dict) or any(obj.get(name) != "" for name in fields):
+        # a field name turned up somewhere other than the top level object
+        return None
+    obj.update(fields)
+    return ThermalFrame(obj)
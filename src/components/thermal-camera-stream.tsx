@@ -1,7 +1,9 @@
 "use client"
 
+import { useState } from "react"
 import { Camera, Download, Trash2 } from "lucide-react"
 import { PaletteSelector } from "./palette-selector"
+import { ThermalCanvasStream } from "./thermal-canvas-stream"
 import { useImageCapture } from "@/hooks/useImageCapture"
 import { Button } from "@/components/ui/button"
 import { Badge } from "@/components/ui/badge"
@@ -9,6 +11,9 @@ import { Badge } from "@/components/ui/badge"
 export function ThermalCameraStream({ src }: { src: string }) {
   // Extract base URL for palette API calls
   const baseUrl = src.replace('/mjpeg', '')
+  // "mjpeg" shows the JPEGs the bridge encodes, "canvas" renders its raw WebSocket frames in the browser
+  const [renderer, setRenderer] = useState<"mjpeg" | "canvas">("mjpeg")
+  const [palette, setPalette] = useState("fusion")
   
   const {
     status: captureStatus,
@@ -52,6 +57,22 @@ export function ThermalCameraStream({ src }: { src: string }) {
         <div className="mb-4 text-center">
           <h3 className="text-xl font-semibold mb-1">თერმული კამერის პირდაპირი ტრანსლაცია</h3>
           <p className="text-sm text-gray-500">URL: {src}</p>
+          <div className="mt-2 flex justify-center gap-2">
+            <Button
+              size="sm"
+              variant={renderer === "mjpeg" ? "default" : "outline"}
+              onClick={() => setRenderer("mjpeg")}
+            >
+              MJPEG
+            </Button>
+            <Button
+              size="sm"
+              variant={renderer === "canvas" ? "default" : "outline"}
+              onClick={() => setRenderer("canvas")}
+            >
+              WebSocket
+            </Button>
+          </div>
         </div>
         <div className="flex justify-center">
           <div 
@@ -64,24 +85,28 @@ export function ThermalCameraStream({ src }: { src: string }) {
               padding: "4px"
             }}
           >
-            <img 
-              src={src} 
-              className="thermal-preview"
-              style={{ 
-                width: "100%", 
-                height: "auto",
-                minHeight: "300px",
-                maxHeight: "400px",
-                imageRendering: "auto",
-                objectFit: "contain",
-                display: "block"
-              }} 
-              onError={(e) => {
-                console.error("Image load error:", e);
-                console.error("Failed URL:", src);
-              }}
-              onLoad={() => console.log("Image loaded successfully:", src)}
-            />
+            {renderer === "canvas" ? (
+              <ThermalCanvasStream bridgeUrl={baseUrl} palette={palette} />
+            ) : (
+              <img 
+                src={src} 
+                className="thermal-preview"
+                style={{ 
+                  width: "100%", 
+                  height: "auto",
+                  minHeight: "300px",
+                  maxHeight: "400px",
+                  imageRendering: "auto",
+                  objectFit: "contain",
+                  display: "block"
+                }} 
+                onError={(e) => {
+                  console.error("Image load error:", e);
+                  console.error("Failed URL:", src);
+                }}
+                onLoad={() => console.log("Image loaded successfully:", src)}
+              />
+            )}
           </div>
         </div>
       </div>
@@ -147,6 +172,7 @@ export function ThermalCameraStream({ src }: { src: string }) {
         bridgeUrl={baseUrl}
         onPaletteChange={(palette) => {
           console.log("Palette changed to:", palette)
+          setPalette(palette)
         }}
       />
     </div>
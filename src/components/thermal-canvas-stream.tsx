@@ -0,0 +1,97 @@
+"use client"
+
+import { useEffect, useRef, useState } from "react"
+import { decodeFrame, fetchPalette, renderFrame, type ThermalFrame } from "@/lib/thermal-frames"
+
+interface ThermalCanvasStreamProps {
+  bridgeUrl: string
+  palette?: string
+}
+
+/**
+ * Thermal stream rendered in the browser from the bridge's raw WebSocket frames, instead of server
+ * encoded MJPEG.  The palette is applied here, so every viewer can pick their own at no cost to the bridge.
+ */
+export function ThermalCanvasStream({ bridgeUrl, palette = "ironblack" }: ThermalCanvasStreamProps) {
+  const canvasRef = useRef<HTMLCanvasElement>(null)
+  const paletteRef = useRef<Uint8Array | undefined>(undefined)
+  const [connected, setConnected] = useState(false)
+  // bumped to reconnect after the socket closes
+  const [session, setSession] = useState(0)
+
+  useEffect(() => {
+    let cancelled = false
+    fetchPalette(bridgeUrl, palette)
+      .then((lut) => {
+        if (!cancelled) paletteRef.current = lut
+      })
+      .catch((error) => {
+        console.error("Failed to fetch palette:", error)
+        paletteRef.current = undefined
+      })
+    return () => {
+      cancelled = true
+    }
+  }, [bridgeUrl, palette])
+
+  useEffect(() => {
+    const ws = new WebSocket(`${bridgeUrl.replace(/^http/, "ws")}/ws?encoding=delta`)
+    ws.binaryType = "arraybuffer"
+    let previous: ThermalFrame | undefined
+    // decode in arrival order, deltas depend on the frame before them
+    let decoding = Promise.resolve()
+    let closing = false
+    let retry: ReturnType<typeof setTimeout> | undefined
+
+    ws.onopen = () => setConnected(true)
+    ws.onclose = () => {
+      setConnected(false)
+      if (!closing) retry = setTimeout(() => setSession((s) => s + 1), 2000)
+    }
+    ws.onmessage = (event) => {
+      decoding = decoding.then(async () => {
+        try {
+          const frame = await decodeFrame(event.data as ArrayBuffer, previous)
+          previous = frame
+          const canvas = canvasRef.current
+          const ctx = canvas?.getContext("2d")
+          if (!canvas || !ctx) return
+          if (canvas.width !== frame.cols || canvas.height !== frame.rows) {
+            canvas.width = frame.cols
+            canvas.height = frame.rows
+          }
+          const image = ctx.createImageData(frame.cols, frame.rows)
+          renderFrame(frame, image, paletteRef.current)
+          ctx.putImageData(image, 0, 0)
+        } catch (error) {
+          // the bridge keeps sending deltas against a frame we don't have, start over with a keyframe
+          console.error("Frame decode error:", error)
+          ws.close()
+        }
+      })
+    }
+    return () => {
+      closing = true
+      clearTimeout(retry)
+      ws.close()
+    }
+  }, [bridgeUrl, session])
+
+  return (
+    <div className="flex flex-col items-center gap-2">
+      <canvas
+        ref={canvasRef}
+        className="thermal-preview"
+        style={{
+          width: "100%",
+          height: "auto",
+          maxHeight: "400px",
+          imageRendering: "auto",
+          objectFit: "contain",
+          backgroundColor: "#000",
+        }}
+      />
+      {!connected && <p className="text-sm text-gray-500">Connecting to {bridgeUrl}…</p>}
+    </div>
+  )
+}
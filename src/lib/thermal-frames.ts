@@ -0,0 +1,105 @@
+/**
+ * Decoder and renderer for the bridge's WebSocket frame stream (/ws).
+ *
+ * Every message is a 24 byte little-endian header followed by the radiometric data of one frame, raw,
+ * zlib compressed or as a zlib compressed delta from the previous frame.  See
+ * python/bridge_app/ws_frames.py for the format.
+ */
+
+export const ENCODING_RAW = 0
+export const ENCODING_ZLIB = 1
+export const ENCODING_DELTA = 2
+
+const HEADER_SIZE = 24
+
+export interface ThermalFrame {
+  seq: number
+  timestamp: number // seconds since the epoch
+  rows: number
+  cols: number
+  min: number
+  max: number
+  data: Uint16Array // rows * cols raw radiometric values
+}
+
+async function inflate(payload: Uint8Array): Promise<Uint8Array> {
+  const stream = new Blob([payload as BlobPart]).stream().pipeThrough(new DecompressionStream("deflate"))
+  return new Uint8Array(await new Response(stream).arrayBuffer())
+}
+
+/**
+ * Decode a message.  previous is the frame decoded from the message before it, needed for deltas.
+ */
+export async function decodeFrame(buffer: ArrayBuffer, previous?: ThermalFrame): Promise<ThermalFrame> {
+  const view = new DataView(buffer)
+  const encoding = view.getUint8(1)
+  const rows = view.getUint16(2, true)
+  const cols = view.getUint16(4, true)
+  const frame: ThermalFrame = {
+    seq: view.getUint32(12, true),
+    timestamp: view.getFloat64(16, true),
+    rows,
+    cols,
+    min: view.getUint16(6, true),
+    max: view.getUint16(8, true),
+    data: new Uint16Array(rows * cols),
+  }
+  const payload = new Uint8Array(buffer, HEADER_SIZE)
+  const n = rows * cols
+
+  if (encoding === ENCODING_RAW) {
+    const bytes = payload
+    for (let i = 0; i < n; i++) {
+      frame.data[i] = bytes[2 * i] | (bytes[2 * i + 1] << 8)
+    }
+    return frame
+  }
+
+  // the values come as byte planes, all the low bytes then all the high bytes
+  const planes = await inflate(payload)
+  for (let i = 0; i < n; i++) {
+    frame.data[i] = planes[i] | (planes[n + i] << 8)
+  }
+  if (encoding === ENCODING_DELTA) {
+    if (!previous || previous.seq !== frame.seq - 1) {
+      throw new Error(`delta for frame ${frame.seq} without frame ${frame.seq - 1}`)
+    }
+    // uint16 arithmetic wraps the same way it does on the bridge
+    for (let i = 0; i < n; i++) {
+      frame.data[i] = frame.data[i] + previous.data[i]
+    }
+  }
+  return frame
+}
+
+/**
+ * Fetch a palette from the bridge as 256 r, g, b bytes.
+ */
+export async function fetchPalette(bridgeUrl: string, name: string): Promise<Uint8Array> {
+  const response = await fetch(`${bridgeUrl}/palettes/${name}`)
+  if (!response.ok) {
+    throw new Error(`Failed to fetch palette ${name}: ${response.status}`)
+  }
+  return new Uint8Array(await response.arrayBuffer())
+}
+
+/**
+ * Render a frame into image data with a linear stretch of its min to max and a palette, or gray levels
+ * without one.
+ */
+export function renderFrame(frame: ThermalFrame, image: ImageData, palette?: Uint8Array) {
+  const span = Math.max(frame.max - frame.min, 1)
+  const out = image.data
+  for (let i = 0; i < frame.data.length; i++) {
+    const g = Math.min(255, (((frame.data[i] - frame.min) * 255) / span) | 0)
+    const o = i * 4
+    if (palette) {
+      out[o] = palette[g * 3]
+      out[o + 1] = palette[g * 3 + 1]
+      out[o + 2] = palette[g * 3 + 2]
+    } else {
+      out[o] = out[o + 1] = out[o + 2] = g
+    }
+    out[o + 3] = 255
+  }
+}
@@ -4,8 +4,6 @@ Stable thermal bridge - single image mode only
 """
 import sys
 import time
-import base64
-import array
 import io
 import threading
 from pathlib import Path
@@ -15,6 +13,7 @@ python_dir = Path(__file__).parent / "python"
 sys.path.insert(0, str(python_dir))
 
 from tcam import TCam
+from palettes import apply
 from flask import Flask, Response, jsonify
 from PIL import Image
 import numpy as np
@@ -22,19 +21,21 @@ import numpy as np
 app = Flask(__name__)
 latest_jpeg = {"bytes": None}
 stop_flag = False
+PALETTE = "gray"  # any name from palettes.palettes
 
-def radiometric_to_jpeg(img_json):
+def radiometric_to_jpeg(frame):
     """Convert radiometric data to JPEG"""
     try:
-        dec = base64.b64decode(img_json["radiometric"])
-        ra = array.array("H", dec)
-        a = np.frombuffer(ra, dtype=np.uint16).reshape(120, 160)
+        a = frame.radiometric.astype(np.int32)
         mn = int(a.min())
         mx = int(a.max())
         if mx == mn:
             mx = mn + 1
-        g = ((a - mn) * 255 / (mx - mn)).astype(np.uint8)
-        img = Image.fromarray(g, mode="L")
+        g = ((a - mn) * 255 // (mx - mn)).astype(np.uint8)
+        if PALETTE == "gray":
+            img = Image.fromarray(g, mode="L")
+        else:
+            img = Image.fromarray(apply(g, PALETTE), mode="RGB")
         buf = io.BytesIO()
         img.save(buf, format="JPEG", quality=85)
         return buf.getvalue()